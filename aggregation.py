@@ -0,0 +1,123 @@
+"""Server-side aggregation for large scatter plots.
+
+Shipping every row of a scatter to the browser makes the figure JSON grow
+with the dataset. These helpers pre-group points before plotting:
+
+* ``store_points`` collapses McDonald's reviews to one point per store;
+* ``density_scatter`` bins any x/y scatter onto a grid once it has more
+  than ``AGGREGATE_THRESHOLD`` rows (marker size = rows per bin, colour =
+  mean of the colour column);
+* ``scatter_trace`` switches to WebGL (``Scattergl``) above
+  ``SCATTERGL_THRESHOLD`` points.
+
+``payload_size`` reports the serialized size of a figure.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+
+AGGREGATE_THRESHOLD = int(os.environ.get('AGGREGATE_THRESHOLD', 20_000))
+SCATTERGL_THRESHOLD = int(os.environ.get('SCATTERGL_THRESHOLD', 5_000))
+DENSITY_BINS = int(os.environ.get('DENSITY_BINS', 60))
+
+
+def payload_size(fig):
+    """Size in bytes of the figure's JSON (go.Figure or plain dict)."""
+    return len(pio.to_json(fig, validate=False).encode())
+
+
+def report_payload(fig, label, n_rows):
+    size = payload_size(fig)
+    traces = fig['data'] if isinstance(fig, dict) else fig.data
+    n_points = sum(len(trace['x']) for trace in traces if trace['x'] is not None)
+    print(f"{label}: {n_rows} rows -> {n_points} points, {size / 1024:.0f} KB")
+    return size
+
+
+def scatter_type(n_points):
+    """'scattergl' once there are many points, else 'scatter'."""
+    return 'scattergl' if n_points > SCATTERGL_THRESHOLD else 'scatter'
+
+
+def scatter_trace(x, y, **kwargs):
+    """go.Scatter, or go.Scattergl once there are many points."""
+    trace_cls = go.Scattergl if scatter_type(len(x)) == 'scattergl' else go.Scatter
+    return trace_cls(x=x, y=y, **kwargs)
+
+
+def store_points(df, store='store_address', lon='longitude', lat='latitude', rating='rating'):
+    """One row per store: position, mean rating and number of reviews."""
+    return (df.groupby(store, observed=True)
+              .agg(longitude=(lon, 'first'), latitude=(lat, 'first'),
+                   rating=(rating, 'mean'), review_count=(rating, 'size'))
+              .reset_index())
+
+
+def store_map_figure(df, title='Store Locations by Rating'):
+    """McDonald's store map built from per-store aggregates."""
+    fig = store_map_from_points(store_points(df), title)
+    report_payload(fig, title, len(df))
+    return fig
+
+
+def store_map_trace(stores):
+    """Scatter trace (plain dict) from a frame with store_address, longitude,
+    latitude, rating and review_count columns."""
+    sizes = 8 + 22 * np.sqrt(stores['review_count'] / max(stores['review_count'].max(), 1))
+    return {
+        'type': scatter_type(len(stores)), 'mode': 'markers',
+        'x': stores['longitude'].tolist(), 'y': stores['latitude'].tolist(),
+        'marker': {'color': stores['rating'].tolist(), 'colorscale': 'Plasma', 'showscale': True,
+                   'colorbar': {'title': {'text': 'Avg rating'}}, 'size': sizes.tolist(), 'sizemode': 'diameter'},
+        'text': stores['store_address'].astype(str).tolist(),
+        'customdata': stores['review_count'].tolist(),
+        'hovertemplate': '%{text}<br>Avg rating: %{marker.color:.2f}<br>Reviews: %{customdata}<extra></extra>',
+    }
+
+
+def store_map_from_points(stores, title='Store Locations by Rating'):
+    """Store map figure from per-store aggregates (see ``store_map_trace``)."""
+    fig = go.Figure(data=[store_map_trace(stores)])
+    fig.update_layout(title=title, xaxis_title='longitude', yaxis_title='latitude')
+    return fig
+
+
+def density_bins(df, x, y, color=None, bins=DENSITY_BINS):
+    """Bin x/y onto a ``bins`` x ``bins`` grid.
+
+    Returns one row per non-empty cell with the cell's mean x/y, the row
+    count and, if given, the mean of ``color``.
+    """
+    data = df[[x, y] + ([color] if color else [])].dropna()
+    x_bin = pd.cut(data[x], bins=bins, labels=False, include_lowest=True)
+    y_bin = pd.cut(data[y], bins=bins, labels=False, include_lowest=True)
+    aggs = {x: (x, 'mean'), y: (y, 'mean'), 'count': (x, 'size')}
+    if color:
+        aggs[color] = (color, 'mean')
+    return data.groupby([x_bin.rename('_xb'), y_bin.rename('_yb')]).agg(**aggs).reset_index(drop=True)
+
+
+def density_scatter(df, x, y, color=None, text=None, threshold=None, marker=None):
+    """Scatter trace of ``df[x]`` vs ``df[y]``, binned above ``threshold`` rows.
+
+    ``color`` names a column used for marker colour; ``marker`` holds any
+    other marker properties (colorscale, a fixed colour, ...).
+    """
+    threshold = AGGREGATE_THRESHOLD if threshold is None else threshold
+    marker = dict(marker or {})
+    if len(df) <= threshold:
+        if color:
+            marker['color'] = df[color]
+        return scatter_trace(df[x], df[y], mode='markers', marker=marker,
+                             text=df[text] if text else None)
+    cells = density_bins(df, x, y, color)
+    marker.update(size=4 + 16 * np.sqrt(cells['count'] / cells['count'].max()), sizemode='diameter')
+    if color:
+        marker['color'] = cells[color]
+    return scatter_trace(cells[x], cells[y], mode='markers', marker=marker,
+                         customdata=cells['count'],
+                         hovertemplate='%{x:.1f}, %{y:.2f}<br>%{customdata} rows<extra></extra>')
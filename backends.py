@@ -0,0 +1,242 @@
+"""Storage and query engines for ``GroupCube`` rollups.
+
+The figure builders only talk to ``GroupCube.query``; the backend decides
+where the rollups live and what runs the group-bys:
+
+* ``pandas`` (default) - rollups are DataFrames in the process, queried
+  with a boolean mask and ``groupby``.
+* ``duckdb`` (``DASHBOARD_BACKEND=duckdb``, needs the ``duckdb`` package) -
+  rollups are aggregated by DuckDB's multi-threaded hash aggregation and
+  written as Parquet files under ``<CACHE_DIR>/duckdb/``, named by a hash
+  of their contents; queries are SQL over those files. A cube then only
+  holds file paths, so it is cheap to send from a warm-up worker and
+  serving processes do not keep the rollups in memory; DuckDB scans the
+  files on demand and spills to disk for aggregations larger than memory.
+  ``DASHBOARD_DUCKDB_THREADS`` caps its threads per query. Files no
+  loaded dataset uses are deleted once they are older than
+  ``DASHBOARD_DUCKDB_KEEP_SECONDS`` (other processes may still read them
+  until then).
+
+Without ``duckdb`` installed, ``DASHBOARD_BACKEND=duckdb`` falls back to pandas.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR
+
+try:
+    import duckdb
+    HAVE_DUCKDB = True
+except ImportError:
+    HAVE_DUCKDB = False
+
+BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+DUCKDB_THREADS = int(os.environ.get('DASHBOARD_DUCKDB_THREADS', 0))  # 0: DuckDB's default (all cores)
+DUCKDB_KEEP_SECONDS = float(os.environ.get('DASHBOARD_DUCKDB_KEEP_SECONDS', 3600))
+
+_INTEGER_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT',
+                  'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT')
+
+
+def _filter_values(value):
+    return list(value) if isinstance(value, (list, set, frozenset)) else [value]
+
+
+class PandasBackend:
+    """Rollups as in-memory DataFrames."""
+
+    name = 'pandas'
+
+    def rollup(self, df, dims, measures):
+        aggs = {'count': (dims[0], 'size')}
+        for m in measures:
+            aggs[f'sum_{m}'] = (m, 'sum')
+        return df.groupby(list(dims), observed=True).agg(**aggs).reset_index()
+
+    def store(self, frame):
+        return frame
+
+    def prune(self, keep):
+        pass
+
+    def load(self, table):
+        return table
+
+    def columns(self, table):
+        return list(table.columns)
+
+    def distinct(self, table, dim):
+        return sorted(table[dim].dropna().unique().tolist())
+
+    def _mask(self, frame, filters):
+        mask = np.ones(len(frame), dtype=bool)
+        for dim, value in (filters or {}).items():
+            if value is None or dim not in frame.columns:
+                continue
+            if isinstance(value, tuple):
+                lo, hi = value
+                col = frame[dim]
+                if lo is not None:
+                    mask &= (col >= lo).to_numpy()
+                if hi is not None:
+                    mask &= (col <= hi).to_numpy()
+            else:
+                values = _filter_values(value)
+                if values:
+                    mask &= frame[dim].isin(values).to_numpy()
+        return mask
+
+    def aggregate(self, table, by, filters, value_cols):
+        frame = table[self._mask(table, filters)]
+        if by:
+            return frame.groupby(by, observed=True)[value_cols].sum().reset_index()
+        return pd.DataFrame({c: [frame[c].sum()] for c in value_cols})  # keeps integer columns integral
+
+
+class DuckDBBackend:
+    """Rollups as Parquet files, aggregated and queried by DuckDB."""
+
+    name = 'duckdb'
+
+    def __init__(self, directory=None, threads=None, keep_seconds=None):
+        self.directory = directory or os.path.join(CACHE_DIR, 'duckdb')
+        self.threads = DUCKDB_THREADS if threads is None else threads
+        self.keep_seconds = DUCKDB_KEEP_SECONDS if keep_seconds is None else keep_seconds
+        self._local = threading.local()  # DuckDB connections must not be shared between threads
+        self._schemas = {}
+
+    def _connection(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = self._local.con = duckdb.connect(config={'threads': self.threads} if self.threads else {})
+        return con
+
+    @staticmethod
+    def _quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    @staticmethod
+    def _source(path):
+        return "read_parquet('" + path.replace("'", "''") + "')"
+
+    def _sum(self, column, integer, alias):
+        # sum() of an integer column is a HUGEINT, which arrives as float; keep it integral like pandas
+        total = f'coalesce(sum({self._quote(column)}), 0)'
+        return f'{f"CAST({total} AS BIGINT)" if integer else total} AS {self._quote(alias)}'
+
+    def rollup(self, df, dims, measures):
+        con = self._connection()
+        keys = ', '.join(self._quote(d) for d in dims)
+        sums = ''.join(', ' + self._sum(m, pd.api.types.is_integer_dtype(df[m]), 'sum_' + m) for m in measures)
+        # pandas' groupby drops groups with a missing key; so does this
+        not_null = ' AND '.join(f'{self._quote(d)} IS NOT NULL' for d in dims)
+        con.register('_rows', df)
+        try:
+            return con.execute(f'SELECT {keys}, count(*) AS "count"{sums} FROM _rows WHERE {not_null} '
+                               f'GROUP BY {keys} ORDER BY {keys}').df()
+        finally:
+            con.unregister('_rows')
+
+    def store(self, frame):
+        digest = hashlib.sha1(repr(list(zip(frame.columns, frame.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        path = os.path.join(self.directory, f'{digest.hexdigest()}.parquet')
+        try:
+            os.utime(path)  # same contents, same file: rebuilding unchanged data only renews it
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            frame.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        return path
+
+    def prune(self, keep):
+        """Delete rollup files (and stray tmp files) not in ``keep`` and older than ``keep_seconds``."""
+        cutoff = time.time() - self.keep_seconds
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not entry.name.endswith(('.parquet', '.tmp')) or entry.path in keep:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    self._schemas.pop(entry.path, None)
+            except FileNotFoundError:
+                pass  # removed by another process
+
+    def load(self, table):
+        return pd.read_parquet(table)
+
+    def _schema(self, table):
+        schema = self._schemas.get(table)
+        if schema is None:
+            rows = self._connection().execute(f'DESCRIBE SELECT * FROM {self._source(table)}').fetchall()
+            schema = self._schemas[table] = {row[0]: row[1] for row in rows}
+        return schema
+
+    def columns(self, table):
+        return list(self._schema(table))
+
+    def distinct(self, table, dim):
+        col = self._quote(dim)
+        rows = self._connection().execute(f'SELECT DISTINCT {col} FROM {self._source(table)} '
+                                          f'WHERE {col} IS NOT NULL ORDER BY {col}').fetchall()
+        return [row[0] for row in rows]
+
+    def _param(self, value, column_type):
+        # Dash sends dates as strings; compare them as timestamps like pandas does
+        if isinstance(value, str) and column_type.startswith(('TIMESTAMP', 'DATE')):
+            return pd.Timestamp(value).to_pydatetime()
+        return value
+
+    def aggregate(self, table, by, filters, value_cols):
+        schema = self._schema(table)
+        where, params = [], []
+        for dim, value in (filters or {}).items():
+            if value is None or dim not in schema:
+                continue
+            col = self._quote(dim)
+            if isinstance(value, tuple):
+                for bound, op in zip(value, ('>=', '<=')):
+                    if bound is not None:
+                        where.append(f'{col} {op} ?')
+                        params.append(self._param(bound, schema[dim]))
+            else:
+                values = _filter_values(value)
+                if values:
+                    where.append(f"{col} IN ({', '.join(['?'] * len(values))})")
+                    params += [self._param(v, schema[dim]) for v in values]
+        keys = ', '.join(self._quote(d) for d in by)
+        sums = ', '.join(self._sum(c, schema[c].startswith(_INTEGER_TYPES), c) for c in value_cols)
+        sql = f'SELECT {keys + ", " if by else ""}{sums} FROM {self._source(table)}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if by:
+            sql += f' GROUP BY {keys} ORDER BY {keys}'
+        return self._connection().execute(sql, params).df()
+
+
+_backends = {'pandas': PandasBackend()}
+
+
+def get(name=None):
+    """The backend called ``name`` (default ``DASHBOARD_BACKEND``)."""
+    name = name or BACKEND
+    if name not in _backends:
+        if name != 'duckdb':
+            raise ValueError(f'unknown query backend {name!r}')
+        if not HAVE_DUCKDB:
+            print("duckdb is not installed, using the pandas backend")
+            _backends[name] = _backends['pandas']
+        else:
+            _backends[name] = DuckDBBackend()
+    return _backends[name]
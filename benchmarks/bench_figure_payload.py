@@ -0,0 +1,90 @@
+"""Dataset-switch latency and bytes on the wire, before/after the figure store.
+
+"inline" is the old ``render_dashboard`` response with every figure embedded
+in its ``dcc.Graph`` (re-serialized by Dash on each switch); "store" is the
+current callback response ("revisit", figures already cached by the
+browser) plus the pre-serialized figure JSON it points to ("first"), both
+requested through the Flask test client. Sizes are given raw and
+gzip-compressed (what the browser receives with compression enabled).
+
+    python benchmarks/bench_figure_payload.py [--repeat 20]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dash import dcc, html
+from dash._utils import to_json
+
+import combined_dashboard
+from datasets import DATASETS, warm_up
+
+
+def best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+def inline_response(key):
+    result = DATASETS[key].get()
+    graphs = [dcc.Graph(id={'type': 'cube-graph', 'index': i}, figure=fig) for i, fig in enumerate(result.figs)]
+    return to_json({'response': {'dashboard-output': {'children': html.Div(graphs)}}}).encode()
+
+
+def switch_request(client, key):
+    return client.post('/_dash-update-component', json={
+        'output': 'dashboard-output.children',
+        'outputs': {'id': 'dashboard-output', 'property': 'children'},
+        'inputs': [{'id': 'server-selection', 'property': 'data', 'value': key}],
+        'changedPropIds': ['server-selection.data'],
+        'state': [],
+    })
+
+
+def figure_url(response):
+    text = json.dumps(response.get_json())  # Dash escapes '/' in responses
+    start = text.find('/figures/')
+    return text[start:text.find('"', start)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    warm_up(background=False)
+    client = combined_dashboard.app.server.test_client()
+    client.get('/')
+
+    print(f"{'dataset':<10}{'path':<16}{'best ms':>10}{'raw KB':>10}{'gzip KB':>10}")
+    for key in DATASETS:
+        body = inline_response(key)
+        ms = best_ms(lambda: gzip.compress(inline_response(key)), args.repeat)
+        print(f"{key:<10}{'inline':<16}{ms:>10.2f}{len(body) / 1024:>10.1f}{len(gzip.compress(body)) / 1024:>10.1f}")
+
+        response = switch_request(client, key)
+        url = figure_url(response)
+        figures = client.get(url).data
+        figures_gz = client.get(url, headers={'Accept-Encoding': 'gzip'}).data
+        assert len(json.loads(figures)) == len(DATASETS[key].get().figs)
+        # Revisits: the browser already holds the immutable figure JSON
+        ms = best_ms(lambda: switch_request(client, key), args.repeat)
+        raw, gz = len(response.data), len(gzip.compress(response.data))
+        print(f"{key:<10}{'store revisit':<16}{ms:>10.2f}{raw / 1024:>10.1f}{gz / 1024:>10.1f}")
+        ms = best_ms(lambda: client.get(figure_url(switch_request(client, key)),
+                                        headers={'Accept-Encoding': 'gzip'}), args.repeat)
+        raw, gz = raw + len(figures), gz + len(figures_gz)
+        print(f"{key:<10}{'store first':<16}{ms:>10.2f}{raw / 1024:>10.1f}{gz / 1024:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Speed comparison for ``pipelines.parse_review_time``.
+
+Times the vectorized parser against the old per-row ``Series.apply``
+implementation on the real ``review_time`` column resampled to ``--rows``
+rows (tests/test_pipelines.py checks that they agree).
+
+    python benchmarks/bench_review_time.py [--rows 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from data_cache import read_excel_cached
+from pipelines import parse_review_time
+
+
+def legacy_parse_review_time(text):
+    text = str(text).lower()
+    if 'day' in text: return 0.1
+    elif 'week' in text: return 0.5
+    elif 'month' in text:
+        num = ''.join([s for s in text if s.isdigit()])
+        return int(num) if num else 1
+    elif 'year' in text:
+        num = ''.join([s for s in text if s.isdigit()])
+        return int(num)*12 if num else 12
+    return np.nan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    real = read_excel_cached("McDonald_s_Reviews.xlsx")['review_time']
+    values = real.sample(args.rows, replace=True, random_state=0).reset_index(drop=True)
+    t0 = time.perf_counter()
+    values.apply(legacy_parse_review_time)
+    t_apply = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    parse_review_time(values)
+    t_vec = time.perf_counter() - t0
+    print(f"{args.rows:,} rows: apply {t_apply * 1000:.0f} ms, vectorized {t_vec * 1000:.0f} ms "
+          f"({t_apply / t_vec:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Exact vs sketch top-N and distinct counts over a high-cardinality column.
+
+A synthetic username column of ``--rows`` rows is drawn from a Zipf
+distribution (exponent ``--zipf``) over ``--users`` users and consumed in
+batches of ``--batch-rows``, as streaming.py and twitter_feed.py do:
+
+- ``exact`` - per-batch ``value_counts`` folded into a Counter, then a
+  top-10 and ``len`` for the distinct count
+- ``sketch`` - ``TopK`` and ``HyperLogLog`` (sketches.py) updated per batch
+
+Reports wall time, the size of the kept state, top-10 recall, the largest
+count error against the guaranteed bound and the distinct-count error.
+
+    python benchmarks/bench_sketches.py [--rows 5000000] [--users 1000000] [--topk-error 0.001]
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+from collections import Counter
+from operator import itemgetter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from sketches import HyperLogLog, TopK
+
+
+def usernames(n_rows, n_users, exponent, seed=0):
+    ranks = np.random.default_rng(seed).zipf(exponent, n_rows) % n_users
+    return pd.Series(pd.Categorical.from_codes(ranks, [f'user{i}' for i in range(n_users)]))
+
+
+def batches(values, batch_rows):
+    for start in range(0, len(values), batch_rows):
+        yield values.iloc[start:start + batch_rows]
+
+
+def exact(values, batch_rows):
+    counts = Counter()
+    for batch in batches(values, batch_rows):
+        counts.update(batch.astype(str).value_counts().to_dict())
+    top = heapq.nlargest(10, counts.items(), key=itemgetter(1))
+    # dict of str -> int: ~100 bytes per entry plus the strings
+    state = sys.getsizeof(counts) + sum(sys.getsizeof(k) + 28 for k in counts)
+    return dict(top), len(counts), state
+
+
+def sketch(values, batch_rows, topk_error, hll_error):
+    top, distinct = TopK(error=topk_error), HyperLogLog(error=hll_error)
+    for batch in batches(values, batch_rows):
+        names = batch.astype(str)
+        top.update(names)
+        distinct.update(names)
+    state = top.counts.memory_usage(deep=True) + distinct.registers.nbytes
+    return top, distinct, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--zipf', type=float, default=1.2, help='Zipf exponent (>1; larger is more skewed)')
+    parser.add_argument('--batch-rows', type=int, default=50_000)
+    parser.add_argument('--topk-error', type=float, default=0.001, help='TopK error as a fraction of rows')
+    parser.add_argument('--hll-error', type=float, default=0.01, help='HyperLogLog relative standard error')
+    args = parser.parse_args()
+
+    values = usernames(args.rows, args.users, args.zipf)
+    print(f"{args.rows} rows, {args.users} possible users, zipf {args.zipf}")
+
+    t0 = time.perf_counter()
+    true_top, true_distinct, exact_state = exact(values, args.batch_rows)
+    exact_seconds = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    top, distinct, sketch_state = sketch(values, args.batch_rows, args.topk_error, args.hll_error)
+    sketch_seconds = time.perf_counter() - t0
+
+    print(f"{'path':<8}{'seconds':>9}{'state MB':>10}")
+    print(f"{'exact':<8}{exact_seconds:>9.2f}{exact_state / 1e6:>10.2f}")
+    print(f"{'sketch':<8}{sketch_seconds:>9.2f}{sketch_state / 1e6:>10.2f}")
+
+    found = top.top(10)
+    full = values.astype(str).value_counts()
+    recall = len(set(found['value']) & set(true_top)) / len(true_top)
+    worst = int((full.reindex(found['value']).to_numpy() - found['count'].to_numpy()).max())
+    estimate = distinct.estimate()
+    print(f"top-10 recall {recall:.0%}; largest count error {worst} "
+          f"(bound {top.error}, n/(capacity+1) = {args.rows / (top.capacity + 1):.0f})")
+    print(f"distinct users {true_distinct}, estimate {estimate:.0f} "
+          f"({(estimate - true_distinct) / true_distinct:+.2%}, standard error {distinct.relative_error:.2%})")
+
+
+if __name__ == '__main__':
+    main()
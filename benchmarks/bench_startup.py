@@ -0,0 +1,53 @@
+"""Startup wall time: datasets loaded one after another vs in a process pool.
+
+Each mode runs ``datasets.warm_up(background=False)`` in a fresh process,
+optionally against an empty data cache (``--cold``) so Excel parsing is
+included. The pool cannot beat the serial path on a single core.
+
+    python benchmarks/bench_startup.py [--cold] [--context spawn|fork|forkserver]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(parallel):
+    from datasets import DATASETS, warm_up
+
+    t0 = time.perf_counter()
+    warm_up(background=False, parallel=parallel)
+    elapsed = time.perf_counter() - t0
+    loaded = sum(bool(ds.get().figs) for ds in DATASETS.values())
+    print(f"{'pool' if parallel else 'serial':<10}{elapsed:>10.1f}{loaded:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cold', action='store_true', help='start from an empty data cache')
+    parser.add_argument('--context', default='spawn', choices=['spawn', 'fork', 'forkserver'])
+    parser.add_argument('--mode', choices=['serial', 'pool'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode == 'pool')
+        return
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'mode':<10}{'seconds':>10}{'datasets':>10}")
+    for mode in ('serial', 'pool'):
+        env = dict(os.environ, DASHBOARD_MP_CONTEXT=args.context)
+        if args.cold:
+            env['DASHBOARD_CACHE_DIR'] = tempfile.mkdtemp(prefix='dashboard_cache_')
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode], cwd=ROOT, env=env,
+                       check=True)
+
+
+if __name__ == '__main__':
+    main()
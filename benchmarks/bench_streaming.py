@@ -0,0 +1,63 @@
+"""Peak memory of full-frame vs streaming (chunked) ingestion.
+
+A synthetic McDonald's export of ``--rows`` rows is written as CSV, then
+aggregated in a fresh process either by reading it whole (``pd.read_csv``
++ ``clean_mcdonalds`` + ``build_mcd_cube``) or through
+``streaming.stream_aggregate``. Reports wall time and peak RSS per mode.
+
+    python benchmarks/bench_streaming.py [--rows 1000000] [--chunk-rows 50000]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(mode, path, chunk_rows):
+    import pandas as pd
+
+    from cube_figures import build_mcd_cube
+    from pipelines import clean_mcdonalds
+    from streaming import stream_aggregate
+
+    t0 = time.perf_counter()
+    if mode == 'full':
+        cube = build_mcd_cube(clean_mcdonalds(pd.read_csv(path)))
+    else:
+        cube, _ = stream_aggregate(path, clean_mcdonalds, build_mcd_cube, chunk_rows=chunk_rows)
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10}{cube.n_rows:>10}{elapsed:>10.1f}{peak_mb:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=50_000)
+    parser.add_argument('--mode', choices=['full', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.path, args.chunk_rows)
+        return
+
+    from synthetic import synthetic_csv
+
+    path = synthetic_csv('mcd', args.rows, os.path.join(tempfile.gettempdir(), 'dashboard_bench'))
+    print(f"{os.path.getsize(path) / 1e6:.0f} MB CSV")
+    print(f"{'mode':<10}{'rows':>10}{'seconds':>10}{'peak MB':>12}")
+    for mode in ('full', 'stream'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, '--path', path,
+                        '--chunk-rows', str(args.chunk_rows)], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Stage-by-stage benchmark of the dataset pipelines on synthetic data.
+
+For every dataset and row count (default 10k, 100k and 1M rows resampled
+from the real workbooks, see ``synthetic.py``) this times:
+
+- ``read_excel`` - ``pd.read_excel`` of a synthetic workbook (only up to
+  ``--excel-max-rows``; writing a 1M-row .xlsx alone takes many minutes)
+- ``read_cached`` - the same workbook through the Arrow data cache, warm
+- ``clean``, ``cube``, ``tokens`` and one ``figure: <title>`` stage per chart
+  (the figure stages include the cube queries behind them)
+- ``wordcloud`` - rendering the word cloud from the token counts
+- ``serialize`` - the unfiltered figures as figure_store serializes them
+- ``filter_callback`` - a filtered re-draw plus the JSON encoding Dash
+  applies to the callback response
+
+Each stage reports the best of ``--repeat`` runs. Results are written to
+``benchmarks/results/<time>-<commit>.json`` and compared with the previous
+result file of a matching run (same backend, machine, CPU count and
+``--repeat``; or ``--compare``); stages more than ``--threshold`` times
+slower are flagged, and ``--check`` exits non-zero when any are.
+``--backend duckdb`` runs the cube stages on the DuckDB query backend
+(see backends.py).
+
+    python benchmarks/bench_suite.py [--rows 10000 100000] [--datasets mcd movies] [--check]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+import backends
+import figure_store
+import profiling
+import wordclouds
+from cube_figures import (MCD_FILTERS, MOVIES_FILTERS, TWITTER_FILTERS, build_mcd_cube, build_movies_cube,
+                          build_twitter_cube, mcd_figures, movies_figures, twitter_figures)
+from data_cache import read_excel_cached
+from pipelines import clean_mcdonalds, clean_movies, clean_twitter
+from synthetic import synthetic_frame, synthetic_xlsx
+from token_index import TokenIndex, count_tokens
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'dashboard_bench')
+# A baseline must agree on these, or the comparison measures the setup rather than the code
+COMPARABLE_META = ('backend', 'machine', 'cpus', 'repeat')
+
+# dataset -> (clean, build cube, figures, text column, filter specs, word cloud size)
+PIPELINES = {
+    'mcd': (clean_mcdonalds, build_mcd_cube, mcd_figures, 'review', MCD_FILTERS, (1600, 700)),
+    'twitter': (clean_twitter, build_twitter_cube, twitter_figures, 'Text', TWITTER_FILTERS, (1500, 1000)),
+    'movies': (clean_movies, build_movies_cube, movies_figures, None, MOVIES_FILTERS, None),
+}
+
+
+def best_of(repeat, fn, *args):
+    """(fastest wall time, result of the last call)."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def figure_stages(repeat, figures, cube, timings):
+    # The figure builders lap once per chart, so a profiling run splits them up
+    for _ in range(repeat):
+        with profiling.run('figures', record_it=False) as run:
+            figs = figures(cube)
+        for stage in run.stages:
+            timings[stage['stage']] = min(timings.get(stage['stage'], float('inf')), stage['seconds'])
+    return figs
+
+
+def sample_filters(cube, specs):
+    """Keep only the first value of the last multi-select filter, as a user would."""
+    dim = [spec['dim'] for spec in specs if spec['kind'] == 'multi'][-1]
+    return {dim: list(cube.values(dim)[:1])}
+
+
+def bench(dataset, n_rows, repeat, excel_max_rows):
+    clean, build, figures, text_column, specs, cloud_size = PIPELINES[dataset]
+    timings = {}
+
+    if n_rows <= excel_max_rows:
+        path = synthetic_xlsx(dataset, n_rows, DATA_DIR)
+        timings['read_excel'], raw = best_of(1, pd.read_excel, path)
+        read_excel_cached(path)  # convert once, then time the warm cache
+        timings['read_cached'], _ = best_of(repeat, read_excel_cached, path)
+    else:
+        raw = synthetic_frame(dataset, n_rows)
+
+    timings['clean'], df = best_of(repeat, clean, raw)
+    del raw
+    timings['cube'], cube = best_of(repeat, build, df)
+    if text_column:
+        timings['tokens'], counts = best_of(repeat, count_tokens, df[text_column])
+    del df
+    figs = figure_stages(repeat, figures, cube, timings)
+    if text_column:
+        frequencies = TokenIndex(counts).frequencies()
+        timings['wordcloud'], _ = best_of(repeat, lambda: wordclouds.render_wordcloud(
+            frequencies=frequencies, width=cloud_size[0], height=cloud_size[1]))
+    timings['serialize'], _ = best_of(repeat, lambda: [figure_store.serialize(fig) for fig in figs])
+    filters = sample_filters(cube, specs)
+    timings['filter_callback'], _ = best_of(repeat, lambda: to_json_plotly(figures(cube, filters)))
+    return {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+
+def commit():
+    def git(*args):
+        out = subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() if out.returncode == 0 else ''
+    sha = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return sha + ('-dirty' if git('status', '--porcelain', '--untracked-files=no') else '')
+
+
+def latest_result(meta, exclude=None):
+    """Newest result file whose run matches ``meta`` on ``COMPARABLE_META``."""
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')), reverse=True):
+        if path == exclude:
+            continue
+        try:
+            with open(path) as fh:
+                other = json.load(fh).get('meta', {})
+        except (OSError, ValueError):
+            continue
+        if all(other.get(key) == meta[key] for key in COMPARABLE_META):
+            return path
+    return None
+
+
+def compare(results, baseline, threshold):
+    """Print every stage next to ``baseline``; returns the number of regressions."""
+    regressions = 0
+    print(f"{'dataset':<9}{'rows':>9}  {'stage':<44}{'seconds':>9}{'before':>9}{'ratio':>7}")
+    for dataset, by_rows in results.items():
+        for rows, stages in by_rows.items():
+            before = baseline.get(dataset, {}).get(rows, {})
+            for stage, seconds in stages.items():
+                old = before.get(stage)
+                ratio = seconds / old if old else None
+                # ignore slowdowns of a few milliseconds, which are mostly noise
+                slower = ratio is not None and ratio > threshold and seconds - old > 0.01
+                regressions += slower
+                old_text = f'{old:9.3f}' if old is not None else f"{'-':>9}"
+                ratio_text = f'{ratio:7.2f}' if ratio is not None else f"{'-':>7}"
+                print(f"{dataset:<9}{rows:>9}  {stage[:44]:<44}{seconds:9.3f}{old_text}{ratio_text}"
+                      f"{'  SLOWER' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--datasets', nargs='+', choices=sorted(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--excel-max-rows', type=int, default=100_000,
+                        help='skip the Excel stages above this many rows')
+    parser.add_argument('--compare', help='result file to compare with (default: the previous one)')
+    parser.add_argument('--threshold', type=float, default=1.25, help='flag stages this many times slower')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 when a stage regressed')
+    parser.add_argument('--no-save', action='store_true', help='do not write a result file')
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'], default=backends.BACKEND,
+                        help='query backend of the cubes')
+    args = parser.parse_args()
+    backends.BACKEND = args.backend
+
+    results = {}
+    for dataset in args.datasets:
+        for n_rows in args.rows:
+            print(f"--- {dataset}, {n_rows} rows ---")
+            results.setdefault(dataset, {})[str(n_rows)] = bench(dataset, n_rows, args.repeat, args.excel_max_rows)
+
+    path = None
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    meta = {'commit': commit(), 'date': stamp, 'python': platform.python_version(),
+            'pandas': pd.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'repeat': args.repeat, 'backend': args.backend}
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{meta['commit']}.json")
+        with open(path, 'w') as fh:
+            json.dump({'meta': meta, 'results': results}, fh, indent=1)
+        print(f"Saved {os.path.relpath(path, ROOT)}")
+
+    baseline_path = args.compare or latest_result(meta, exclude=path)
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)['results']
+        print(f"Compared with {os.path.relpath(baseline_path, ROOT)}")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{regressions} stage(s) more than {args.threshold}x slower")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Compare the old matplotlib word cloud path with ``wordclouds.render_wordcloud``.
+
+Both paths start from the same generated WordCloud; only the step from
+bitmap to encoded image bytes is measured: best wall time and tracemalloc
+peak (Python/numpy allocations; Pillow's own C buffers are not traced).
+
+    python benchmarks/bench_wordcloud.py [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from wordcloud import WordCloud
+
+from data_cache import read_excel_cached
+
+
+def encode_matplotlib(wc, figsize):
+    buf = BytesIO()
+    plt.figure(figsize=figsize)
+    plt.imshow(wc, interpolation='bilinear')
+    plt.axis('off')
+    plt.tight_layout()
+    plt.savefig(buf, format='png')
+    plt.close()
+    return buf.getvalue()
+
+
+def encode_direct(wc, fmt='PNG', **save_kwargs):
+    buf = BytesIO()
+    wc.to_image().save(buf, format=fmt, **save_kwargs)
+    return buf.getvalue()
+
+
+def measure(fn, repeat):
+    times = []
+    peak = 0
+    data = b''
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        data = fn()
+        times.append(time.perf_counter() - t0)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(times), peak, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("McDonald's", "McDonald_s_Reviews.xlsx", 'review', (1600, 700), (16, 8)),
+        ("Twitter", "twitter_dataset_1.xlsx", 'Text', (1500, 1000), (10, 5)),
+    ]
+    print(f"{'dataset':<12}{'path':<22}{'best ms':>10}{'peak MB':>10}{'KB':>8}")
+    for name, path, column, (width, height), figsize in cases:
+        df = read_excel_cached(path)
+        df.columns = df.columns.str.strip()
+        text = ' '.join(df[column].dropna().astype(str))
+        wc = WordCloud(width=width, height=height, background_color='white').generate(text)
+        paths = [
+            ('matplotlib png', lambda: encode_matplotlib(wc, figsize)),
+            ('to_image png l6', lambda: encode_direct(wc, 'PNG', compress_level=6)),
+            ('to_image png l1', lambda: encode_direct(wc, 'PNG', compress_level=1)),
+            ('to_image webp q80', lambda: encode_direct(wc, 'WEBP', quality=80, method=4)),
+        ]
+        for label, fn in paths:
+            best, peak, size = measure(fn, args.repeat)
+            print(f"{name:<12}{label:<22}{best * 1000:>10.1f}{peak / 1e6:>10.1f}{size / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Latency percentiles and throughput of one dashboard instance as concurrency ramps up.
+
+Simulated users keep switching the ``dashboard-selector`` dropdown: each
+POSTs the same ``_dash-update-component`` payload the browser sends for
+``render_dashboard`` and, with ``--fetch-figures``, then GETs the figure
+JSON the page loads next (once per dataset, as the browser caches it).
+That is the worst case: client-switched datasets (see datasets.py) only
+reach the server on their first view per page.
+Concurrency steps through ``--clients`` for ``--seconds`` each; every step
+reports p50/p95/p99 latency, requests/sec, errors and the peak RSS and PSS
+of the server's process tree.
+
+By default a single-worker gunicorn server (gunicorn.conf.py, server:server)
+is started on a local port; ``--server dev`` uses the Flask dev server and
+``--url`` targets an instance that is already running (pass ``--pid`` for its
+memory). ``--slo-ms`` reports the highest concurrency whose p95 met it, and
+``--json`` writes the table for capacity planning.
+
+    python benchmarks/capacity.py [--clients 1 2 4 8 16 32] [--seconds 10] [--think-ms 0] [--slo-ms 250]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from urllib.error import HTTPError, URLError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import DATASET_KEYS, ROOT, pss_mb, switch_body, wait_ready
+
+FIGURE_URL = re.compile(r'/figures/[^"\\]+\.json')
+
+
+def rss_mb(pid):
+    """Summed RSS (MB) of ``pid`` and its children."""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as fh:
+            pids += [int(p) for p in fh.read().split()]
+    except OSError:
+        return float('nan')
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as fh:
+                total_kb += sum(int(line.split()[1]) for line in fh if line.startswith('VmRSS:'))
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+def start_server(kind, port, workers):
+    env = dict(os.environ, DASHBOARD_WATCH='0')
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(workers),
+               '-b', f'127.0.0.1:{port}', 'server:server']
+    else:
+        cmd = [sys.executable, '-c', 'from datasets import warm_up; warm_up(background=False); '
+               f'from combined_dashboard import app; app.run(port={port}, threaded=True)']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class User(threading.Thread):
+    """One simulated user; records the latency (seconds) of every request it makes."""
+
+    def __init__(self, base, stop, fetch_figures, think, seed):
+        super().__init__(daemon=True)
+        self.base = base
+        self.stop = stop
+        self.fetch_figures = fetch_figures
+        self.think = think
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.errors = 0
+        self.seen_figures = set()
+
+    def request(self, url, body=None):
+        # Figure JSON is served pre-compressed; callback responses are parsed, so left plain
+        headers = {'Content-Type': 'application/json'} if body else {'Accept-Encoding': 'gzip'}
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers), timeout=60) as resp:
+                data = resp.read()
+        except (HTTPError, URLError, ConnectionError, TimeoutError):
+            self.errors += 1
+            return None
+        self.latencies.append(time.perf_counter() - t0)
+        return data
+
+    def run(self):
+        while not self.stop.is_set():
+            key = self.rng.choice(DATASET_KEYS)
+            data = self.request(self.base + '/_dash-update-component', switch_body(key))
+            if data is not None and self.fetch_figures:
+                match = FIGURE_URL.search(data.decode('utf-8', 'replace').replace('\\u002f', '/'))
+                if match and match.group(0) not in self.seen_figures:
+                    self.seen_figures.add(match.group(0))
+                    self.request(self.base + match.group(0))
+            if self.think:
+                self.stop.wait(self.rng.expovariate(1 / self.think))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def step(base, clients, seconds, fetch_figures, think, pid):
+    stop = threading.Event()
+    users = [User(base, stop, fetch_figures, think, seed=i) for i in range(clients)]
+    for user in users:
+        user.start()
+    peak_rss = peak_pss = 0.0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        if pid:
+            peak_rss = max(peak_rss, rss_mb(pid))
+            peak_pss = max(peak_pss, pss_mb(pid))
+        time.sleep(min(0.5, max(0.0, deadline - time.time())))
+    stop.set()
+    for user in users:
+        user.join()
+    latencies = sorted(l for user in users for l in user.latencies)
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': sum(user.errors for user in users),
+        'rps': len(latencies) / seconds,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else float('nan'),
+        'rss_mb': peak_rss if pid else None,
+        'pss_mb': peak_pss if pid else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--seconds', type=float, default=10, help='duration of each step')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before the first step')
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between a user\'s switches')
+    parser.add_argument('--fetch-figures', action='store_true', help='also GET each new figure JSON')
+    parser.add_argument('--server', choices=['gunicorn', 'dev'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--url', help='target a running instance instead of starting one')
+    parser.add_argument('--pid', type=int, help='server pid for memory readings with --url')
+    parser.add_argument('--slo-ms', type=float, help='p95 latency target')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    proc = None
+    if args.url:
+        base, pid = args.url.rstrip('/'), args.pid
+    else:
+        base = f'http://127.0.0.1:{args.port}'
+        proc = start_server(args.server, args.port, args.workers)
+        pid = proc.pid
+    think = args.think_ms / 1000
+    results = []
+    try:
+        if proc is not None:
+            wait_ready(base, proc)
+        step(base, max(args.clients), args.warmup, args.fetch_figures, think, None)
+        print(f"{'clients':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MB':>9}{'PSS MB':>9}")
+        for clients in args.clients:
+            r = step(base, clients, args.seconds, args.fetch_figures, think, pid)
+            results.append(r)
+            rss = f"{r['rss_mb']:>9.0f}{r['pss_mb']:>9.0f}" if pid else f"{'-':>9}{'-':>9}"
+            print(f"{clients:>8}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                  f"{r['errors']:>8}{rss}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.slo_ms is not None:
+        ok = [r['clients'] for r in results if r['p95_ms'] <= args.slo_ms and not r['errors']]
+        print(f"p95 <= {args.slo_ms:g} ms up to {max(ok)} concurrent users" if ok
+              else f"p95 exceeded {args.slo_ms:g} ms at every step")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'server': args.url or f'{args.server} x{args.workers}', 'seconds': args.seconds,
+                       'think_ms': args.think_ms, 'fetch_figures': args.fetch_figures, 'steps': results}, fh,
+                      indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Requests/sec of the combined dashboard under gunicorn, by worker count.
+
+For each worker count a gunicorn server (gunicorn.conf.py, server:server)
+is started on a local port and hit by ``--clients`` concurrent clients
+that keep switching datasets through the ``render_dashboard`` callback for
+``--seconds`` seconds. Memory is the summed PSS of the master and its
+workers (Linux only), which counts copy-on-write shared pages once.
+
+    python benchmarks/load_test.py [--workers 1 2 4] [--clients 16] [--seconds 10] [--no-preload]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from urllib.error import URLError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_KEYS = ['mcd', 'twitter', 'movies']
+
+
+def switch_body(key):
+    return json.dumps({
+        'output': 'dashboard-output.children',
+        'outputs': {'id': 'dashboard-output', 'property': 'children'},
+        'inputs': [{'id': 'server-selection', 'property': 'data', 'value': key}],
+        'changedPropIds': ['server-selection.data'],
+        'state': [],
+    }).encode()
+
+
+def post(url, body):
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        resp.read()
+
+
+def wait_ready(base, proc, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(base + '/', timeout=5).read()
+            return
+        except (URLError, ConnectionError, TimeoutError):
+            time.sleep(0.5)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def pss_mb(pid):
+    """Summed PSS (MB) of ``pid`` and its children."""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as fh:
+            pids += [int(p) for p in fh.read().split()]
+    except OSError:
+        return float('nan')
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/smaps_rollup') as fh:
+                total_kb += sum(int(line.split()[1]) for line in fh if line.startswith('Pss:'))
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+def hammer(url, clients, seconds):
+    bodies = [switch_body(key) for key in DATASET_KEYS]
+    counts = [0] * clients
+    errors = [0] * clients
+    stop = time.time() + seconds
+
+    def client(i):
+        n = i
+        while time.time() < stop:
+            try:
+                post(url, bodies[n % len(bodies)])
+                counts[i] += 1
+            except (URLError, ConnectionError, TimeoutError):
+                errors[i] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--no-preload', action='store_true')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DASHBOARD_PRELOAD='0' if args.no_preload else '1')
+    base = f'http://127.0.0.1:{args.port}'
+    print(f"{'workers':>8}{'req/s':>10}{'errors':>8}{'PSS MB':>10}")
+    for n in args.workers:
+        proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(n),
+                                 '-b', f'127.0.0.1:{args.port}', 'server:server'],
+                                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(base, proc)
+            # Every worker loads its datasets on first use without preloading
+            hammer(base + '/_dash-update-component', args.clients, 2)
+            done, errors = hammer(base + '/_dash-update-component', args.clients, args.seconds)
+            print(f"{n:>8}{done / args.seconds:>10.1f}{errors:>8}{pss_mb(proc.pid):>10.0f}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Synthetic datasets for the benchmarks.
+
+Rows are drawn with replacement from the real workbooks, so column types,
+value distributions and review vocabulary match the dashboards' inputs at
+any row count.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_cache import read_excel_cached
+
+SOURCES = {
+    'mcd': os.path.join(ROOT, 'McDonald_s_Reviews.xlsx'),
+    'twitter': os.path.join(ROOT, 'twitter_dataset_1.xlsx'),
+    'movies': os.path.join(ROOT, 'n_movies_coloured.xlsx'),
+}
+
+
+def synthetic_frame(dataset, n_rows, seed=0):
+    """``n_rows`` raw rows resampled from the workbook of ``dataset``."""
+    df = read_excel_cached(SOURCES[dataset])
+    return df.sample(n=n_rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def synthetic_csv(dataset, n_rows, directory, seed=0):
+    """Write ``synthetic_frame`` to ``directory`` once and return its path."""
+    path = os.path.join(directory, f'{dataset}_{n_rows}.csv')
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        synthetic_frame(dataset, n_rows, seed).to_csv(path, index=False)
+    return path
+
+
+def synthetic_xlsx(dataset, n_rows, directory, seed=0):
+    """Like ``synthetic_csv`` but an Excel workbook (slow to write past ~100k rows)."""
+    path = os.path.join(directory, f'{dataset}_{n_rows}.xlsx')
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        synthetic_frame(dataset, n_rows, seed).to_excel(path, index=False)
+    return path
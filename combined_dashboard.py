@@ -1,406 +1,524 @@
-import pandas as pd
+import os
 
-import numpy as np
+from dash import Dash, html, dcc, Output, Input, State, ALL, MATCH, ctx, clientside_callback, no_update
 
-import base64
+from dash.exceptions import PreventUpdate
 
-from io import BytesIO
+import dash_bootstrap_components as dbc
 
-from wordcloud import WordCloud
+from datasets import DATASETS, warm_up
 
-import matplotlib
+from watcher import watch
 
-matplotlib.use('Agg')  # Use non-interactive backend
+import figure_store
 
-import matplotlib.pyplot as plt
+import metrics
 
-import plotly.express as px
+import profiling
 
-import plotly.graph_objs as go
+import spatial
 
-from dash import Dash, html, dcc, Output, Input
+from cube_figures import mcd_store_index
 
-import dash_bootstrap_components as dbc
+import wordclouds
 
 # Initialize app
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=figure_store.COMPRESS_RESPONSES)
 
 app.title = "Combined Dashboard"
 
-# Initialize global variables
+server = app.server  # WSGI entry point, see server.py
 
-df_mcd, df_tw, df_mv = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+def publish_dataset(key):
 
-figs_mcd, figs_tw, figs_mv = [], [], []
+    """Load ``key`` here and publish its figures and word cloud, for store URLs handed out by another worker."""
 
-encoded_wc_mcd, encoded_wc_tw = "", ""
+    if key not in DATASETS:
 
-# ---------------- McDonald's Data ----------------
+        return
 
-print("--- Loading and processing McDonald's data ---")
+    result = DATASETS[key].get()  # storing the result publishes its word cloud
 
-try:
+    if result.figs:
 
-    df_mcd = pd.read_excel("McDonald_s_Reviews.xlsx")
+        figure_store.publish(key, result.version, result.figs)
 
-    df_mcd.columns = df_mcd.columns.str.strip()
+wordclouds.register_routes(app.server, load=publish_dataset)
 
-    df_mcd['rating'] = df_mcd['rating'].astype(str).str.extract(r'(\d)').astype(float)
+figure_store.register_routes(app.server, load=publish_dataset)
 
-    df_mcd['rating_count'] = df_mcd['rating_count'].astype(str).str.replace(',', '').astype(float)
+profiling.register_routes(app.server)
 
-    df_mcd['sentiment'] = df_mcd['rating'].apply(lambda x: 1 if x >= 4 else (-1 if x <= 2 else 0))
+metrics.register_routes(app.server, dashboards=DATASETS, callbacks=app.callback_map)
 
-    df_mcd['sentiment_label'] = df_mcd['sentiment'].map({1: 'Positive', 0: 'Neutral', -1: 'Negative'})
+def store_index():
 
-    def parse_review_time(text):
+    result = DATASETS['mcd'].get()
 
-        text = str(text).lower()
+    return mcd_store_index(result.cube) if result.cube is not None else None
 
-        if 'day' in text: return 0.1
+spatial.register_routes(app.server, store_index)  # /api/stores/nearby
 
-        elif 'week' in text: return 0.5
+# Datasets are loaded on demand by render_dashboard (see datasets.py)
 
-        elif 'month' in text:
+EMPTY_MESSAGES = {
 
-            num = ''.join([s for s in text if s.isdigit()])
+    'mcd': "No McDonald's review graphs available.",
 
-            return int(num) if num else 1
+    'twitter': "No Twitter graphs available.",
 
-        elif 'year' in text:
+    'movies': "No movie graphs available.",
 
-            num = ''.join([s for s in text if s.isdigit()])
+}
 
-            return int(num)*12 if num else 12
+WORDCLOUD_TITLES = {
 
-        return np.nan
+    'mcd': "Word Cloud of Reviews",
 
-    df_mcd['months_ago'] = df_mcd['review_time'].apply(parse_review_time)
+    'twitter': "Word Cloud of Tweets",
 
-    critical_cols = ['rating', 'rating_count', 'latitude', 'longitude', 'months_ago', 'store_address', 'review', 'sentiment_label', 'sentiment']
+}
 
-    for col in critical_cols:
+# ---------------- Layout ----------------
 
-        if col not in df_mcd.columns:
+app.layout = dbc.Container([
 
-            print(f"Missing column: {col}")
+    dbc.Row([
 
-            df_mcd = pd.DataFrame()
+        dbc.Col(html.Img(src='/assets/3.png', style={'height': '60px'}), width="auto"),
 
-            break
+        dbc.Col(html.H2("📊 Unified Dashboard Viewer", className="text-center text-primary my-3"), width=True),
 
-    if not df_mcd.empty:
+        dbc.Col(width="auto")
 
-        df_mcd.dropna(subset=critical_cols, inplace=True)
+    ], align='center', className='mb-4'),
 
-        # Graphs
+    dbc.Row([
 
-        figs_mcd.append(px.pie(df_mcd, names='sentiment_label', title='Sentiment Distribution'))
+        dbc.Col(dcc.Dropdown(
 
-        figs_mcd.append(px.bar(df_mcd.groupby('store_address')['sentiment'].mean().reset_index(),
+            id='dashboard-selector',
 
-                               x='store_address', y='sentiment', title='Store vs Avg Sentiment'))
+            options=[{'label': ds.label, 'value': key} for key, ds in DATASETS.items()],
 
-        figs_mcd.append(px.line(df_mcd.groupby('months_ago')['rating'].mean().reset_index().sort_values('months_ago'),
+            value='mcd',
 
-                                x='months_ago', y='rating', title='Review Time vs Rating'))
+            clearable=False
 
-        top_10 = df_mcd['store_address'].value_counts().nlargest(10).reset_index()
+        ), width=6)
 
-        top_10.columns = ['store_address', 'review_count']
+    ], justify='center'),
 
-        figs_mcd.append(px.bar(top_10, x='store_address', y='review_count', title='Top 10 Stores by Reviews'))
+    # Server-driven datasets are re-rendered into dashboard-output on every switch; each
+    # client-switched one gets its own panel, rendered once and then only shown or hidden
 
-        figs_mcd.append(px.scatter(df_mcd, x='longitude', y='latitude', color='rating', title='Store Locations by Rating',
+    dcc.Store(id='server-selection'),
 
-                                   hover_data=['store_address']))
+    dcc.Store(id='client-switched', data=[key for key, ds in DATASETS.items() if ds.client_switch]),
 
-        figs_mcd.append(px.bar(df_mcd.groupby('store_address')['rating_count'].mean().reset_index().sort_values('rating_count', ascending=False).head(10),
+    dbc.Row([
 
-                               x='store_address', y='rating_count', title='Top 10 by Avg Rating Count'))
+        dbc.Col([
 
-        # Word Cloud
+            html.Div(dcc.Loading(id='dashboard-output'), id='server-panel'),
 
-        text = ' '.join(df_mcd['review'].dropna().astype(str))
+            *[html.Div([
 
-        if text.strip():
+                dcc.Store(id={'type': 'panel-request', 'dataset': key}),
 
-            wc = WordCloud(width=1600, height=700, background_color='white').generate(text)
+                dcc.Loading(id={'type': 'panel-content', 'dataset': key})
 
-            buf = BytesIO()
+            ], id={'type': 'dataset-panel', 'dataset': key}, style={'display': 'none'})
 
-            plt.figure(figsize=(16, 8))
+              for key, ds in DATASETS.items() if ds.client_switch]
 
-            plt.imshow(wc, interpolation='bilinear')
+        ])
 
-            plt.axis('off')
+    ])
 
-            plt.tight_layout()
+], fluid=True)
 
-            plt.savefig(buf, format='png')
+# ---------------- Filters ----------------
 
-            plt.close()
+def build_filter_controls(dataset, cube):
 
-            encoded_wc_mcd = base64.b64encode(buf.getvalue()).decode()
+    """One control per entry of the dataset's filter spec, with options taken from the cube."""
 
-except Exception as e:
+    cols = []
 
-    print(f"Error in McDonald's Data: {e}")
+    for spec in dataset.filters:
 
-# ---------------- Twitter Data ----------------
+        dim, label, kind = spec['dim'], spec['label'], spec['kind']
 
-print("\n--- Loading and processing Twitter data ---")
+        values = cube.values(dim)
 
-try:
+        if not values:
 
-    df_tw = pd.read_excel("twitter_dataset_1.xlsx")
+            continue
 
-    df_tw['Timestamp'] = pd.to_datetime(df_tw['Timestamp'], errors='coerce')
+        if kind == 'range':
 
-    df_tw.dropna(subset=['Timestamp'], inplace=True)
+            lo, hi = float(min(values)), float(max(values))
 
-    df_tw['Hour'] = df_tw['Timestamp'].dt.hour
+            control = dcc.RangeSlider(id={'type': 'cube-filter', 'dataset': dataset.key, 'dim': dim}, min=lo, max=hi, value=[lo, hi],
 
-    df_tw['Sentiment_Label'] = df_tw['sentiment'].map({1: 'Positive', -1: 'Negative', 0: 'Neutral'})
+                                      allowCross=False, tooltip={'placement': 'bottom'})
 
-    tw_cols = ['Timestamp', 'sentiment', 'Likes', 'Retweets', 'Username', 'sentiment_score', 'Text', 'Hour', 'Sentiment_Label']
+        elif kind == 'date':
 
-    for col in tw_cols:
+            start, end = str(min(values).date()), str(max(values).date())
 
-        if col not in df_tw.columns:
+            control = dcc.DatePickerRange(id={'type': 'cube-date', 'dataset': dataset.key, 'dim': dim}, min_date_allowed=start,
 
-            print(f"Missing column: {col}")
+                                          max_date_allowed=end, start_date=start, end_date=end)
 
-            df_tw = pd.DataFrame()
+        else:
 
-            break
+            control = dcc.Dropdown(id={'type': 'cube-filter', 'dataset': dataset.key, 'dim': dim}, options=[str(v) for v in values],
 
-    if not df_tw.empty:
+                                   multi=True, placeholder=f"All ({len(values)})")
 
-        df_tw.dropna(subset=tw_cols, inplace=True)
+        cols.append(dbc.Col([html.Label(label, className='fw-bold'), control], md=4))
 
-        figs_tw.append(px.pie(df_tw, names='Sentiment_Label', title='Tweet Sentiment Distribution'))
+    return dbc.Row(cols, className='my-3')
 
-        figs_tw.append(px.line(df_tw.groupby(df_tw['Timestamp'].dt.date).size().reset_index(name='Tweet Count'),
+def filters_from_controls(dataset, values, value_ids, starts, ends, date_ids):
 
-                               x='Timestamp', y='Tweet Count', title='Tweets Over Time'))
+    """Translate control values into GroupCube.query filters; full ranges mean 'no filter'."""
 
-        figs_tw.append(px.bar(df_tw.groupby('Sentiment_Label')['Likes'].mean().reset_index(),
+    kinds = {spec['dim']: spec['kind'] for spec in dataset.filters}
 
-                              x='Sentiment_Label', y='Likes', title='Avg Likes by Sentiment'))
+    filters = {}
 
-        figs_tw.append(px.bar(df_tw.groupby('Sentiment_Label')['Retweets'].mean().reset_index(),
+    for value, cid in zip(values, value_ids):
 
-                              x='Sentiment_Label', y='Retweets', title='Avg Retweets by Sentiment'))
+        dim = cid['id']['dim']
 
-        figs_tw.append(px.bar(x=df_tw['Username'].value_counts().head(10).index,
+        if kinds.get(dim) == 'range' and value:
 
-                              y=df_tw['Username'].value_counts().head(10).values,
+            filters[dim] = (value[0], value[1])
 
-                              title='Top 10 Active Users'))
+        elif value:
 
-        figs_tw.append(px.histogram(df_tw, x='sentiment_score', nbins=30, title='Sentiment Score Distribution'))
+            filters[dim] = list(value)
 
-        figs_tw.append(px.bar(df_tw.groupby('Hour').size().reset_index(name='Tweet Count'),
+    for start, end, cid in zip(starts, ends, date_ids):
 
-                              x='Hour', y='Tweet Count', title='Hourly Tweet Activity'))
+        filters[cid['id']['dim']] = (start, end)
 
-        text = ' '.join(df_tw['Text'].dropna().astype(str))
+    return filters
 
-        if text.strip():
+# ---------------- Callbacks ----------------
 
-            wc = WordCloud(width=1500, height=1000, background_color='white').generate(text)
+def dataset_content(selected):
 
-            buf = BytesIO()
+    content = []
 
-            plt.figure(figsize=(10, 5))
+    if selected not in DATASETS:
 
-            plt.imshow(wc, interpolation='bilinear')
+        return html.Div(content)
 
-            plt.axis("off")
+    dataset = DATASETS[selected]
 
-            plt.tight_layout()
+    result = dataset.get()
 
-            plt.savefig(buf, format='png')
+    if result.cube is not None and dataset.filters:
 
-            plt.close()
+        content.append(build_filter_controls(dataset, result.cube))
 
-            encoded_wc_tw = base64.b64encode(buf.getvalue()).decode()
+    if result.figs:
 
-except Exception as e:
+        # Graphs start empty; the clientside callback below fetches the pre-serialized figures
 
-    print(f"Error in Twitter Data: {e}")
+        figure_url = figure_store.publish(selected, result.version, result.figs)
 
-# ---------------- Movies Data ----------------
+        content.append(dcc.Store(id={'type': 'figure-src', 'dataset': selected}, data=figure_url))
 
-print("\n--- Loading and processing Movies data ---")
+        content.extend([dcc.Graph(id={'type': 'cube-graph', 'dataset': selected, 'index': i})
 
-try:
+                        for i in range(len(result.figs))])
 
-    df_mv = pd.read_excel("n_movies_coloured.xlsx")
+        if dataset.map_view and result.cube is not None:
 
-    df_mv['year_clean'] = df_mv['year'].astype(str).str.extract(r'(\d{4})').astype(float)
+            content.append(dcc.Store(id={'type': 'map-viewport', 'dataset': selected},
 
-    df_mv['duration_min'] = df_mv['duration'].astype(str).str.extract(r'(\d+)').astype(float)
+                                     data={'graph': dataset.map_view[0], 'bbox': None}))
 
-    df_mv['genre_main'] = df_mv['genre'].astype(str).str.split(',').str[0].replace('', np.nan)
+    else:
 
-    df_mv['sentiment_label'] = df_mv['sentiment'].map({1: 'Positive', 0: 'Neutral', -1: 'Negative'})
+        content.append(html.P(EMPTY_MESSAGES.get(selected, "No graphs available.")))
 
-    mv_cols = ['rating', 'votes', 'duration_min', 'year_clean', 'sentiment_score', 'sentiment_label', 'genre_main', 'certificate']
+    if result.wordcloud_url:
 
-    for col in mv_cols:
+        content.extend([
 
-        if col not in df_mv.columns:
+            html.H3(WORDCLOUD_TITLES.get(selected, "Word Cloud"), className='text-center mt-4'),
 
-            print(f"Missing column: {col}")
+            html.Img(src=result.wordcloud_url, style={'width': '100%'})
 
-            df_mv = pd.DataFrame()
+        ])
 
-            break
+    return html.Div(content)  # ✅ FIXED: Wrapped in Div
 
-    if not df_mv.empty:
+# Switching happens in the browser: a client-switched dataset's panel is shown (and requested
+# from the server the first time), anything else is handed to render_dashboard
 
-        df_mv.dropna(subset=mv_cols, inplace=True)
+clientside_callback(
 
-        figs_mv.append(px.pie(df_mv, names='sentiment_label', title='Sentiment Distribution'))
+    """
 
-        figs_mv.append(go.Figure(data=[go.Box(y=df_mv['rating'], name='IMDb Ratings')], layout=dict(title='Box Plot of IMDb Ratings')))
+    function(selected, clientKeys, requested) {
 
-        figs_mv.append(go.Figure(data=[go.Histogram(x=df_mv['votes'])], layout=dict(title='Distribution of Votes')))
+        var noUpdate = window.dash_clientside.no_update;
 
-        figs_mv.append(go.Figure(data=[go.Scatter(x=df_mv['year_clean'], y=df_mv['rating'], mode='markers',
+        var panels = window.dash_clientside.callback_context.states_list[1];
 
-                                                  marker=dict(color=df_mv['sentiment_score'], colorscale='Viridis', showscale=True))],
+        var isClient = clientKeys.indexOf(selected) >= 0;
 
-                                 layout=dict(title='Ratings Over Years')))
+        var styles = panels.map(function(p) {
 
-        figs_mv.append(go.Figure(data=[go.Bar(x=df_mv.groupby('genre_main')['rating'].mean().sort_values(ascending=False).index,
+            return {display: p.id.dataset === selected ? 'block' : 'none'};
 
-                                              y=df_mv.groupby('genre_main')['rating'].mean().sort_values(ascending=False).values)],
+        });
 
-                                 layout=dict(title='Avg Rating by Genre')))
+        var requests = panels.map(function(p, i) {
 
-except Exception as e:
+            return p.id.dataset === selected && !requested[i] ? true : noUpdate;
 
-    print(f"Error in Movie Data: {e}")
+        });
 
-# ---------------- Layout ----------------
+        return [isClient ? noUpdate : selected, {display: isClient ? 'none' : 'block'}, styles, requests];
 
-app.layout = dbc.Container([
+    }
 
-    dbc.Row([
+    """,
 
-        dbc.Col(html.Img(src='/assets/3.png', style={'height': '60px'}), width="auto"),
+    Output('server-selection', 'data'),
 
-        dbc.Col(html.H2("📊 Unified Dashboard Viewer", className="text-center text-primary my-3"), width=True),
+    Output('server-panel', 'style'),
 
-        dbc.Col(width="auto")
+    Output({'type': 'dataset-panel', 'dataset': ALL}, 'style'),
 
-    ], align='center', className='mb-4'),
+    Output({'type': 'panel-request', 'dataset': ALL}, 'data'),
 
-    dbc.Row([
+    Input('dashboard-selector', 'value'),
 
-        dbc.Col(dcc.Dropdown(
+    State('client-switched', 'data'),
 
-            id='dashboard-selector',
+    State({'type': 'panel-request', 'dataset': ALL}, 'data')
 
-            options=[
+)
 
-                {'label': "McDonald's Reviews", 'value': 'mcd'},
+@app.callback(
 
-                {'label': "Twitter Sentiment", 'value': 'twitter'},
+    Output('dashboard-output', 'children'),
 
-                {'label': "Movies Sentiment", 'value': 'movies'},
+    Input('server-selection', 'data'),
 
-            ],
+    prevent_initial_call=True
 
-            value='mcd',
+)
 
-            clearable=False
+def render_dashboard(selected):
 
-        ), width=6)
+    return dataset_content(selected)
 
-    ], justify='center'),
+@app.callback(
 
-    dbc.Row([
+    Output({'type': 'panel-content', 'dataset': MATCH}, 'children'),
 
-        dbc.Col(id='dashboard-output')
+    Input({'type': 'panel-request', 'dataset': MATCH}, 'data'),
 
-    ])
+    prevent_initial_call=True
 
-], fluid=True)
+)
+
+def render_panel(requested):
+
+    # Runs once per client-switched dataset and page; later switches never reach the server
+
+    if not requested:
+
+        raise PreventUpdate
+
+    return dataset_content(ctx.triggered_id['dataset'])
+
+clientside_callback(
+
+    """
+
+    function(src) {
+
+        if (!src) {
+
+            return window.dash_clientside.no_update;
+
+        }
+
+        return fetch(src).then(function(resp) { return resp.json(); });
 
-# ---------------- Callback ----------------
+    }
+
+    """,
+
+    Output({'type': 'cube-graph', 'dataset': MATCH, 'index': ALL}, 'figure'),
+
+    Input({'type': 'figure-src', 'dataset': MATCH}, 'data')
+
+)
 
 @app.callback(
 
-    Output('dashboard-output', 'children'),
+    Output({'type': 'cube-graph', 'dataset': MATCH, 'index': ALL}, 'figure', allow_duplicate=True),
+
+    Input({'type': 'cube-filter', 'dataset': MATCH, 'dim': ALL}, 'value'),
+
+    Input({'type': 'cube-date', 'dataset': MATCH, 'dim': ALL}, 'start_date'),
 
-    Input('dashboard-selector', 'value')
+    Input({'type': 'cube-date', 'dataset': MATCH, 'dim': ALL}, 'end_date'),
+
+    prevent_initial_call=True
 
 )
 
-def render_dashboard(selected):
+def apply_filters(values, starts, ends):
 
-    content = []
+    # Answered from the pre-aggregated cube, never from the raw frame
 
-    if selected == 'mcd':
+    dataset = DATASETS.get(ctx.triggered_id['dataset'])
 
-        if figs_mcd:
+    result = dataset.get() if dataset else None
 
-            content.extend([dcc.Graph(figure=fig) for fig in figs_mcd])
+    if result is None or result.cube is None or dataset.figures is None:
 
-        else:
+        raise PreventUpdate
 
-            content.append(html.P("No McDonald's review graphs available."))
+    filters = filters_from_controls(dataset, values, ctx.inputs_list[0], starts, ends, ctx.inputs_list[1])
 
-        if encoded_wc_mcd:
+    figs = dataset.figures(result.cube, filters)
 
-            content.extend([
+    if len(figs) != len(ctx.outputs_list):
 
-                html.H3("Word Cloud of Reviews", className='text-center mt-4'),
+        raise PreventUpdate  # dataset reloaded with a different set of figures
 
-                html.Img(src='data:image/png;base64,{}'.format(encoded_wc_mcd), style={'width': '100%'})
+    return figs
 
-            ])
+# Zoom/pan on a map figure: the browser turns relayout events into a viewport box, and only
+# a box that actually changed is sent to the server to redraw the stores in view
 
-    elif selected == 'twitter':
+clientside_callback(
 
-        if figs_tw:
+    """
 
-            content.extend([dcc.Graph(figure=fig) for fig in figs_tw])
+    function(relayouts, viewport) {
 
-        else:
+        var noUpdate = window.dash_clientside.no_update;
 
-            content.append(html.P("No Twitter graphs available."))
+        var graphs = window.dash_clientside.callback_context.inputs_list[0];
 
-        if encoded_wc_tw:
+        var i = graphs.findIndex(function(g) { return g.id.index === viewport.graph; });
 
-            content.extend([
+        var r = i >= 0 ? relayouts[i] : null;
 
-                html.H3("Word Cloud of Tweets", className='text-center mt-4'),
+        if (!r) {
 
-                html.Img(src='data:image/png;base64,{}'.format(encoded_wc_tw), style={'width': '100%'})
+            return noUpdate;
 
-            ])
+        }
 
-    elif selected == 'movies':
+        var bbox = null;
 
-        if figs_mv:
+        if (!r['xaxis.autorange'] && !r['yaxis.autorange']) {
 
-            content.extend([dcc.Graph(figure=fig) for fig in figs_mv])
+            var prev = viewport.bbox || [];
 
-        else:
+            var x = r['xaxis.range'] || [r['xaxis.range[0]'], r['xaxis.range[1]']];
 
-            content.append(html.P("No movie graphs available."))
+            var y = r['yaxis.range'] || [r['yaxis.range[0]'], r['yaxis.range[1]']];
 
-    return html.Div(content)  # ✅ FIXED: Wrapped in Div
+            bbox = [x[0], x[1], y[0], y[1]].map(function(v, k) { return v === undefined ? prev[k] : v; });
+
+            if (bbox.some(function(v) { return v === undefined; })) {
+
+                return noUpdate;  // one axis zoomed from the full view: the plot already shows it
+
+            }
+
+        }
+
+        if (JSON.stringify(bbox) === JSON.stringify(viewport.bbox)) {
+
+            return noUpdate;
+
+        }
+
+        return Object.assign({}, viewport, {bbox: bbox});
+
+    }
+
+    """,
+
+    Output({'type': 'map-viewport', 'dataset': MATCH}, 'data'),
+
+    Input({'type': 'cube-graph', 'dataset': MATCH, 'index': ALL}, 'relayoutData'),
+
+    State({'type': 'map-viewport', 'dataset': MATCH}, 'data'),
+
+    prevent_initial_call=True
+
+)
+
+@app.callback(
+
+    Output({'type': 'cube-graph', 'dataset': MATCH, 'index': ALL}, 'figure', allow_duplicate=True),
+
+    Input({'type': 'map-viewport', 'dataset': MATCH}, 'data'),
+
+    State({'type': 'cube-filter', 'dataset': MATCH, 'dim': ALL}, 'value'),
+
+    State({'type': 'cube-date', 'dataset': MATCH, 'dim': ALL}, 'start_date'),
+
+    State({'type': 'cube-date', 'dataset': MATCH, 'dim': ALL}, 'end_date'),
+
+    prevent_initial_call=True
+
+)
+
+def update_map(viewport, values, starts, ends):
+
+    dataset = DATASETS.get(ctx.triggered_id['dataset'])
+
+    result = dataset.get() if dataset else None
+
+    if result is None or result.cube is None or not dataset.map_view or not viewport:
+
+        raise PreventUpdate
+
+    position, render = dataset.map_view
+
+    filters = filters_from_controls(dataset, values, ctx.states_list[0], starts, ends, ctx.states_list[1])
+
+    fig = render(result.cube, filters, viewport['bbox'])
+
+    return [fig if output['id']['index'] == position else no_update for output in ctx.outputs_list]
 
 # ---------------- Run ----------------
 
 if __name__ == '__main__':
 
-    app.run(port=5050, debug=True)
- 
\ No newline at end of file
+    # Optional: preload every dataset in the background so the first switch is instant
+
+    if os.environ.get('DASHBOARD_WARMUP', '1') == '1':
+
+        warm_up()
+
+    # Rebuild a dataset in the background when its workbook changes
+
+    if os.environ.get('DASHBOARD_WATCH', '1') == '1':
+
+        watch()
+
+    # Dev server; set DASH_DEBUG=true for the debugger and reloader, use server.py in production
+
+    app.run(port=5050)
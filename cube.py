@@ -0,0 +1,123 @@
+"""Pre-aggregated group-by cube for interactive filtering.
+
+A ``GroupCube`` holds one or more rollups of a frame: row counts and
+measure sums grouped by the filter dimensions, plus (per rollup) one extra
+dimension a figure needs to group by. Built once at load time, it answers
+filtered queries by scanning a few hundred/thousand aggregated rows
+instead of the full frame. Rollups only hold additive values, so cubes
+built from separate chunks can be merged.
+
+Where rollups are stored and what computes the group-bys is up to the
+cube's backend (``backends.py``): in-memory pandas frames, or Parquet files
+queried by DuckDB.
+"""
+
+from typing import Dict, Iterable, Mapping, Optional, Sequence
+
+import pandas as pd
+
+import backends
+
+BASE = 'base'
+
+
+class GroupCube:
+    """Count/sum rollups over ``filter_dims`` (+ one extra dim per rollup).
+
+    ``rollups`` are DataFrames, handed to the ``backend`` (a name, default
+    ``DASHBOARD_BACKEND``) for storage; ``frame`` reads one back.
+    """
+
+    def __init__(self, filter_dims: Sequence[str], measures: Sequence[str],
+                 rollups: Dict[str, pd.DataFrame], attrs: Optional[dict] = None, backend: Optional[str] = None):
+        self.filter_dims = list(filter_dims)
+        self.measures = list(measures)
+        self.backend = backend or backends.BACKEND
+        self.rollups = {name: self._engine.store(frame) for name, frame in rollups.items()}
+        self.attrs = attrs or {}
+
+    @property
+    def _engine(self):
+        return backends.get(self.backend)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, filter_dims: Sequence[str], measures: Sequence[str],
+              extra_dims: Optional[Mapping[str, Sequence[str]]] = None, attrs: Optional[dict] = None,
+              backend: Optional[str] = None):
+        """Aggregate ``df``.
+
+        ``extra_dims`` maps a rollup name to the additional column(s) it is
+        grouped by, e.g. ``{'hourly': ['Hour']}``.
+        """
+        engine = backends.get(backend)
+        rollups = {BASE: engine.rollup(df, filter_dims, measures)}
+        for name, dims in (extra_dims or {}).items():
+            rollups[name] = engine.rollup(df, list(filter_dims) + list(dims), measures)
+        return cls(filter_dims, measures, rollups, attrs, backend)
+
+    def add_rollup(self, name: str, frame: pd.DataFrame) -> None:
+        """Store a rollup computed elsewhere (``count``/``sum_<m>`` over the filter dims + extra dims)."""
+        self.rollups[name] = self._engine.store(frame)
+
+    def frame(self, rollup: str = BASE) -> pd.DataFrame:
+        """One rollup as a DataFrame."""
+        return self._engine.load(self.rollups[rollup])
+
+    def to_backend(self, backend: Optional[str] = None) -> 'GroupCube':
+        """This cube with its rollups moved to ``backend`` (default ``DASHBOARD_BACKEND``)."""
+        backend = backend or backends.BACKEND
+        if backend == self.backend:
+            return self
+        rollups = {name: self.frame(name) for name in self.rollups}
+        return GroupCube(self.filter_dims, self.measures, rollups, self.attrs, backend)
+
+    def merge(self, other: 'GroupCube') -> 'GroupCube':
+        """Combine with a cube built over other rows of the same schema.
+
+        DataFrame attrs (lookup tables such as store positions) are
+        concatenated and deduplicated on their first column, attrs with a
+        ``merge`` method (sketches) are merged; for any other attr this
+        cube's value wins.
+        """
+        rollups = {}
+        for name in self.rollups:
+            frame = self.frame(name)
+            both = pd.concat([frame, other.frame(name)], ignore_index=True)
+            keys = [c for c in frame.columns if c != 'count' and not c.startswith('sum_')]
+            rollups[name] = both.groupby(keys, observed=True, sort=False).sum().reset_index()
+        attrs = dict(other.attrs)
+        for name, value in self.attrs.items():
+            theirs = other.attrs.get(name)
+            if isinstance(value, pd.DataFrame) and isinstance(theirs, pd.DataFrame):
+                value = (pd.concat([value, theirs], ignore_index=True)
+                           .drop_duplicates(subset=value.columns[0], ignore_index=True))
+            elif not isinstance(value, pd.DataFrame) and hasattr(value, 'merge') and theirs is not None:
+                value = value.merge(theirs)
+            attrs[name] = value
+        return GroupCube(self.filter_dims, self.measures, rollups, attrs, self.backend)
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.query()['count'].iloc[0])
+
+    def values(self, dim: str) -> list:
+        """Distinct values of a dimension, sorted."""
+        for table in self.rollups.values():
+            if dim in self._engine.columns(table):
+                return self._engine.distinct(table, dim)
+        raise KeyError(dim)
+
+    def query(self, by: Iterable[str] = (), filters: Optional[Mapping] = None,
+              rollup: str = BASE) -> pd.DataFrame:
+        """Filtered counts, sums and means grouped by ``by``.
+
+        ``filters`` maps a dimension to a list of allowed values or to a
+        ``(low, high)`` inclusive range; ``None``/empty means no filter.
+        Returns one row per group with ``count``, ``sum_<m>`` and
+        ``mean_<m>`` columns (a single total row when ``by`` is empty).
+        """
+        value_cols = ['count'] + [f'sum_{m}' for m in self.measures]
+        out = self._engine.aggregate(self.rollups[rollup], list(by), filters, value_cols)
+        for m in self.measures:
+            out[f'mean_{m}'] = out[f'sum_{m}'] / out['count'].where(out['count'] > 0)
+        return out
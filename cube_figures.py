@@ -0,0 +1,381 @@
+"""Combined dashboard figures built from each dataset's ``GroupCube``.
+
+Every figure is answered from cube rollups, so re-rendering with a new
+set of filters costs a scan over the aggregated rows only. Figures are
+plain dicts (``{'data': [...], 'layout': {...}}``) sharing one template:
+constructing ``go.Figure``/``plotly.express`` objects deep-copies the
+template and validates every property, which would dominate a filter
+round trip. ``*_FILTERS`` describe the filter controls of each dataset:
+``kind`` is ``'range'`` (numeric range slider), ``'date'`` (date range) or
+``'multi'`` (multi-select).
+"""
+
+import os
+import weakref
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+import profiling
+
+from aggregation import scatter_type, store_map_trace, store_points
+from cube import GroupCube
+from genre_index import GenreIndex
+from sketches import SKETCHES, GroupedSketch
+from spatial import GridIndex, cluster_points
+
+HIST_BINS = 30
+# Fixed grid steps used when cubes are built chunk by chunk (see streaming.py)
+STREAM_SCORE_STEP = 0.01
+STREAM_VOTES_STEP = 1_000
+
+_template = None
+
+
+def _default_template():
+    global _template
+    if _template is None:
+        _template = pio.templates[pio.templates.default].to_plotly_json()
+    return _template
+
+
+def _values(series):
+    return series.astype(object).tolist() if isinstance(series.dtype, pd.CategoricalDtype) else series.tolist()
+
+
+def _figure(traces, title, x_title=None, y_title=None, **layout):
+    profiling.lap(f'figure: {title}')  # time since the previous figure, i.e. its queries
+    layout = dict(layout, template=_default_template(), title={'text': title})
+    if x_title:
+        layout['xaxis'] = {'title': {'text': x_title}}
+    if y_title:
+        layout['yaxis'] = {'title': {'text': y_title}}
+    return {'data': traces, 'layout': layout}
+
+
+def _pie(labels, values, title):
+    return _figure([{'type': 'pie', 'labels': _values(labels), 'values': _values(values)}], title)
+
+
+def _bar(x, y, title, x_title=None, y_title=None, **trace):
+    return _figure([dict(trace, type='bar', x=_values(x), y=_values(y))], title, x_title, y_title)
+
+
+def _line(x, y, title, x_title=None, y_title=None):
+    return _figure([{'type': 'scatter', 'mode': 'lines', 'x': _values(x), 'y': _values(y)}], title, x_title, y_title)
+
+
+def _empty(title):
+    return _figure([], title, annotations=[{'text': 'No data for the selected filters', 'showarrow': False,
+                                            'xref': 'paper', 'yref': 'paper'}])
+
+
+def _bin_centers(values, bins=HIST_BINS):
+    """Map values onto ``bins`` equal-width bins; returns (centers, width)."""
+    lo, hi = float(values.min()), float(values.max())
+    if hi <= lo:
+        hi = lo + 1.0
+    edges = np.linspace(lo, hi, bins + 1)
+    idx = np.clip(np.searchsorted(edges, values.to_numpy(), side='right') - 1, 0, bins - 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return pd.Series(centers[idx], index=values.index), edges[1] - edges[0]
+
+
+def _grid_bins(values, step):
+    """Centers of a fixed ``step``-wide grid, identical for every chunk of a dataset."""
+    return (np.floor(values.astype(float) / step) + 0.5) * step
+
+
+def _coarsen_bins(cube, rollup, column, width_attr, bins=HIST_BINS):
+    """Regroup grid-binned ``column`` of one rollup into ``bins`` equal-width bins over its range."""
+    frame = cube.frame(rollup)
+    half = cube.attrs[width_attr] / 2
+    edges_lo, edges_hi = float(frame[column].min()) - half, float(frame[column].max()) + half
+    width = (edges_hi - edges_lo) / bins
+    idx = np.clip(((frame[column] - edges_lo) // width).astype(int), 0, bins - 1)
+    frame = frame.assign(**{column: edges_lo + (idx + 0.5) * width})
+    keys = [c for c in frame.columns if c != 'count' and not c.startswith('sum_')]
+    rollups = {name: cube.frame(name) for name in cube.rollups}
+    rollups[rollup] = frame.groupby(keys, observed=True, sort=False).sum().reset_index()
+    return GroupCube(cube.filter_dims, cube.measures, rollups, {**cube.attrs, width_attr: width}, cube.backend)
+
+
+def _weighted_box(values, counts, name):
+    """Box trace from a value -> count distribution (precomputed quartiles)."""
+    order = np.argsort(np.asarray(values))
+    v, c = np.asarray(values, dtype=float)[order], np.asarray(counts, dtype=float)[order]
+    cum = np.cumsum(c)
+    total = cum[-1]
+
+    def quantile(p):
+        return float(v[min(np.searchsorted(cum, p * total, side='left'), len(v) - 1)])
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    inside = v[(v >= q1 - 1.5 * iqr) & (v <= q3 + 1.5 * iqr)]
+    return {'type': 'box', 'name': name, 'q1': [q1], 'median': [median], 'q3': [q3],
+            'lowerfence': [float(inside.min())], 'upperfence': [float(inside.max())],
+            'mean': [float((v * c).sum() / total)]}
+
+
+# ---------------- McDonald's ----------------
+
+MCD_FILTERS = [
+    {'dim': 'months_ago', 'label': 'Review age (months)', 'kind': 'range'},
+    {'dim': 'store_address', 'label': 'Store', 'kind': 'multi'},
+    {'dim': 'sentiment_label', 'label': 'Sentiment', 'kind': 'multi'},
+]
+
+
+MCD_MAP_FIGURE = 4  # position of the store map in mcd_figures
+MAP_TITLE = 'Store Locations by Rating'
+# Above this many stores in view the map shows clusters on a MAP_CLUSTER_GRID x MAP_CLUSTER_GRID raster
+MAP_MAX_POINTS = int(os.environ.get('DASHBOARD_MAP_MAX_POINTS', 500))
+MAP_CLUSTER_GRID = 40
+
+_store_indexes = weakref.WeakKeyDictionary()
+
+
+def build_mcd_cube(df, backend=None):
+    stores = store_points(df)[['store_address', 'longitude', 'latitude']]
+    return GroupCube.build(df, ['months_ago', 'store_address', 'sentiment_label'],
+                           ['rating', 'sentiment', 'rating_count'], attrs={'stores': stores}, backend=backend)
+
+
+def mcd_figures(cube, filters=None):
+    if cube.query(filters=filters)['count'].sum() == 0:
+        return [_empty(t) for t in ('Sentiment Distribution', 'Store vs Avg Sentiment', 'Review Time vs Rating',
+                                     'Top 10 Stores by Reviews', 'Store Locations by Rating', 'Top 10 by Avg Rating Count')]
+    figs = []
+    by_sentiment = cube.query(['sentiment_label'], filters)
+    figs.append(_pie(by_sentiment['sentiment_label'], by_sentiment['count'], 'Sentiment Distribution'))
+    by_store = cube.query(['store_address'], filters)
+    figs.append(_bar(by_store['store_address'], by_store['mean_sentiment'], 'Store vs Avg Sentiment',
+                     'store_address', 'sentiment'))
+    by_time = cube.query(['months_ago'], filters).sort_values('months_ago')
+    figs.append(_line(by_time['months_ago'], by_time['mean_rating'], 'Review Time vs Rating', 'months_ago', 'rating'))
+    top_10 = by_store.nlargest(10, 'count')
+    figs.append(_bar(top_10['store_address'], top_10['count'], 'Top 10 Stores by Reviews',
+                     'store_address', 'review_count'))
+    figs.append(mcd_store_map(cube, filters))
+    top_rating_count = by_store.nlargest(10, 'mean_rating_count')
+    figs.append(_bar(top_rating_count['store_address'], top_rating_count['mean_rating_count'],
+                     'Top 10 by Avg Rating Count', 'store_address', 'rating_count'))
+    return figs
+
+
+def mcd_store_index(cube):
+    """GridIndex over the cube's stores with their unfiltered aggregates, built once per cube."""
+    index = _store_indexes.get(cube)
+    if index is None:
+        by_store = cube.query(['store_address'])[['store_address', 'count', 'mean_rating', 'mean_sentiment']]
+        stores = cube.attrs['stores'].merge(by_store, on='store_address').rename(
+            columns={'count': 'review_count', 'mean_rating': 'rating', 'mean_sentiment': 'sentiment'})
+        index = _store_indexes[cube] = GridIndex(stores)
+    return index
+
+
+def mcd_store_map(cube, filters=None, bbox=None):
+    """Store map of the stores inside ``bbox`` (lon0, lon1, lat0, lat1; None for all), clustered when crowded."""
+    index = mcd_store_index(cube)
+    stores = index.points if bbox is None else index.points.iloc[index.in_bbox(*bbox)]
+    if filters:
+        by_store = cube.query(['store_address'], filters)[['store_address', 'count', 'mean_rating']]
+        stores = stores[['store_address', 'longitude', 'latitude']].merge(
+            by_store.rename(columns={'count': 'review_count', 'mean_rating': 'rating'}), on='store_address')
+    if len(stores) > MAP_MAX_POINTS:
+        stores = cluster_points(stores, bbox or index.extent, MAP_CLUSTER_GRID)
+    # uirevision keeps the user's zoom when the figure is replaced
+    fig = _figure([store_map_trace(stores)], MAP_TITLE, 'longitude', 'latitude', uirevision='store-map')
+    if bbox is not None:
+        fig['layout']['xaxis']['range'] = [bbox[0], bbox[1]]
+        fig['layout']['yaxis']['range'] = [bbox[2], bbox[3]]
+    return fig
+
+
+# ---------------- Twitter ----------------
+
+TWITTER_FILTERS = [
+    {'dim': 'date', 'label': 'Date range', 'kind': 'date'},
+    {'dim': 'Sentiment_Label', 'label': 'Sentiment', 'kind': 'multi'},
+]
+
+
+def build_twitter_cube(df, score_step=None, sketch=None, backend=None):
+    """``score_step`` bins scores on a fixed grid so cubes of separate chunks can be merged.
+
+    With ``sketch`` (default ``DASHBOARD_SKETCHES``) top users and distinct
+    users come from a per-sentiment ``GroupedSketch`` instead of an exact
+    date x sentiment x user rollup; they follow the sentiment filter but
+    not the date range.
+    """
+    sketch = SKETCHES if sketch is None else sketch
+    df = df.assign(date=df['Timestamp'].dt.normalize())
+    if score_step:
+        df['score_bin'], width = _grid_bins(df['sentiment_score'], score_step), score_step
+    else:
+        df['score_bin'], width = _bin_centers(df['sentiment_score'])
+    extra_dims = {'hourly': ['Hour'], 'score': ['score_bin']}
+    attrs = {'score_bin_width': width}
+    if sketch:
+        attrs['user_sketch'] = GroupedSketch().update(df['Username'], df['Sentiment_Label'])
+    else:
+        extra_dims['users'] = ['Username']
+    return GroupCube.build(df, ['date', 'Sentiment_Label'], ['Likes', 'Retweets'],
+                           extra_dims=extra_dims, attrs=attrs, backend=backend)
+
+
+def finish_twitter_cube(cube):
+    """Coarsen the score grid of a chunk-built Twitter cube to ``HIST_BINS`` bins."""
+    return _coarsen_bins(cube, 'score', 'score_bin', 'score_bin_width')
+
+
+TWITTER_TITLES = ('Tweet Sentiment Distribution', 'Tweets Over Time', 'Avg Likes by Sentiment',
+                  'Avg Retweets by Sentiment', 'Top 10 Active Users', 'Sentiment Score Distribution',
+                  'Hourly Tweet Activity')
+
+
+def _twitter_figures(by_sentiment, per_day, top_users, scores, score_bin_width, hourly):
+    """Twitter figures from grouped frames (``count``/``mean_*`` columns as returned by ``GroupCube.query``).
+
+    The frames are passed as functions and fetched right before the figure
+    that uses them, so each figure's profiling lap includes its query.
+    ``top_users()`` returns the frame and a note for its title; an ``error``
+    column (sketch counts are lower bounds) is drawn as error bars.
+    """
+    figs = []
+    by_sentiment = by_sentiment()
+    figs.append(_pie(by_sentiment['Sentiment_Label'], by_sentiment['count'], 'Tweet Sentiment Distribution'))
+    per_day = per_day().sort_values('date')
+    figs.append(_line(per_day['date'].dt.strftime('%Y-%m-%d'), per_day['count'], 'Tweets Over Time',
+                      'Timestamp', 'Tweet Count'))
+    figs.append(_bar(by_sentiment['Sentiment_Label'], by_sentiment['mean_Likes'], 'Avg Likes by Sentiment',
+                     'Sentiment_Label', 'Likes'))
+    figs.append(_bar(by_sentiment['Sentiment_Label'], by_sentiment['mean_Retweets'], 'Avg Retweets by Sentiment',
+                     'Sentiment_Label', 'Retweets'))
+    top_users, users_note = top_users()
+    title = 'Top 10 Active Users' + (f' ({users_note})' if users_note else '')
+    trace = {}
+    if 'error' in top_users:
+        trace['error_y'] = {'type': 'data', 'symmetric': False, 'array': _values(top_users['error']),
+                            'arrayminus': [0] * len(top_users)}
+    figs.append(_bar(top_users['Username'], top_users['count'], title, **trace))
+    scores = scores().sort_values('score_bin')
+    hist = _bar(scores['score_bin'], scores['count'], 'Sentiment Score Distribution', 'sentiment_score', 'count',
+                width=score_bin_width)
+    hist['layout']['bargap'] = 0
+    figs.append(hist)
+    hourly = hourly().sort_values('Hour')
+    figs.append(_bar(hourly['Hour'], hourly['count'], 'Hourly Tweet Activity', 'Hour', 'Tweet Count'))
+    return figs
+
+
+def twitter_figures(cube, filters=None):
+    if cube.query(filters=filters)['count'].sum() == 0:
+        return [_empty(t) for t in TWITTER_TITLES]
+    sketch = cube.attrs.get('user_sketch')
+
+    def top_users():
+        if sketch is None:
+            return cube.query(['Username'], filters, rollup='users').nlargest(10, 'count'), None
+        labels = (filters or {}).get('Sentiment_Label')
+        dates = (filters or {}).get('date')
+        note = f'of ~{sketch.distinct(labels):,.0f}' + (', all dates' if dates and any(dates) else '')
+        return sketch.top(10, labels, name='Username'), note
+
+    return _twitter_figures(lambda: cube.query(['Sentiment_Label'], filters),
+                            lambda: cube.query(['date'], filters),
+                            top_users,
+                            lambda: cube.query(['score_bin'], filters, rollup='score'),
+                            cube.attrs['score_bin_width'],
+                            lambda: cube.query(['Hour'], filters, rollup='hourly'))
+
+
+def twitter_feed_figures(feed):
+    """Twitter figures from a ``twitter_feed.TwitterAggregates``."""
+    if feed.n_rows == 0:
+        return [_empty(t) for t in TWITTER_TITLES]
+
+    def top_users():
+        return feed.top_users(10), f'of ~{feed.distinct_users():,.0f}' if feed.sketch else None
+
+    return _twitter_figures(feed.by_sentiment, feed.per_day, top_users, feed.score_histogram,
+                            feed.score_bin_width, feed.hourly)
+
+
+# ---------------- Movies ----------------
+
+MOVIES_FILTERS = [
+    {'dim': 'genre', 'label': 'Genre', 'kind': 'multi'},  # any listed genre, see movies_filters
+    {'dim': 'certificate', 'label': 'Certificate', 'kind': 'multi'},
+    {'dim': 'sentiment_label', 'label': 'Sentiment', 'kind': 'multi'},
+]
+
+
+def build_movies_cube(df, votes_step=None, backend=None):
+    """``votes_step`` bins votes on a fixed grid so cubes of separate chunks can be merged."""
+    # IMDb ratings have one decimal, so grouping on the rounded value is exact
+    # Every listed genre, not just genre_main; the cube is split by the whole list of genres
+    genres = GenreIndex.build(df['genre'] if 'genre' in df.columns else df['genre_main'])
+    df = df.assign(rating_value=df['rating'].astype(float).round(1), genre_list=genres.row_labels())
+    if votes_step:
+        df['votes_bin'], width = _grid_bins(df['votes'], votes_step), votes_step
+    else:
+        df['votes_bin'], width = _bin_centers(df['votes'])
+    cube = GroupCube.build(df, ['genre_list', 'certificate', 'sentiment_label'],
+                           ['rating', 'votes', 'sentiment_score'],
+                           extra_dims={'ratings': ['rating_value'], 'votes': ['votes_bin'],
+                                       'years': ['year_clean', 'rating_value']},
+                           attrs={'votes_bin_width': width}, backend=backend)
+    cube.add_rollup('genres', genres.rollup(df, cube.filter_dims, cube.measures))  # a title counts once per genre
+    return cube
+
+
+def movies_filters(cube, filters):
+    """``filters`` with a ``genre`` selection turned into the genre lists that include any selected genre.
+
+    Every rollup is split by ``genre_list``, so the filter keeps the same
+    titles in every chart, including the per-genre one.
+    """
+    if not filters or not filters.get('genre'):
+        return filters
+    lists = cube.values('genre_list')
+    keep = GenreIndex.build(pd.Series(lists, dtype=object)).combo_mask(any_of=filters['genre'])
+    filters = {dim: value for dim, value in filters.items() if dim != 'genre'}
+    filters['genre_list'] = [label for label, kept in zip(lists, keep) if kept] or [None]  # [None]: no title
+    return filters
+
+
+def finish_movies_cube(cube):
+    """Coarsen the votes grid of a chunk-built movies cube to ``HIST_BINS`` bins."""
+    return _coarsen_bins(cube, 'votes', 'votes_bin', 'votes_bin_width')
+
+
+def movies_figures(cube, filters=None):
+    filters = movies_filters(cube, filters)
+    if cube.query(filters=filters)['count'].sum() == 0:
+        return [_empty(t) for t in ('Sentiment Distribution', 'Box Plot of IMDb Ratings', 'Distribution of Votes',
+                                     'Ratings Over Years', 'Avg Rating by Genre')]
+    figs = []
+    by_sentiment = cube.query(['sentiment_label'], filters)
+    figs.append(_pie(by_sentiment['sentiment_label'], by_sentiment['count'], 'Sentiment Distribution'))
+    ratings = cube.query(['rating_value'], filters, rollup='ratings')
+    figs.append(_figure([_weighted_box(ratings['rating_value'], ratings['count'], 'IMDb Ratings')],
+                        'Box Plot of IMDb Ratings'))
+    votes = cube.query(['votes_bin'], filters, rollup='votes').sort_values('votes_bin')
+    votes_fig = _bar(votes['votes_bin'], votes['count'], 'Distribution of Votes', width=cube.attrs['votes_bin_width'])
+    votes_fig['layout']['bargap'] = 0
+    figs.append(votes_fig)
+    years = cube.query(['year_clean', 'rating_value'], filters, rollup='years')
+    sizes = 6 + 10 * np.sqrt(years['count'] / years['count'].max())
+    figs.append(_figure([{'type': scatter_type(len(years)), 'mode': 'markers',
+                          'x': years['year_clean'].tolist(), 'y': years['rating_value'].tolist(),
+                          'marker': {'color': years['mean_sentiment_score'].tolist(), 'colorscale': 'Viridis',
+                                     'showscale': True, 'size': sizes.tolist()},
+                          'customdata': years['count'].tolist(),
+                          'hovertemplate': '%{x:.0f}: %{y}<br>%{customdata} titles<extra></extra>'}],
+                        'Ratings Over Years'))
+    genre_rating = cube.query(['genre'], filters, rollup='genres').sort_values('mean_rating', ascending=False)
+    figs.append(_bar(genre_rating['genre'], genre_rating['mean_rating'], 'Avg Rating by Genre'))
+    return figs
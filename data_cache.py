@@ -0,0 +1,137 @@
+"""Columnar on-disk cache for the Excel workbooks used by the dashboards.
+
+Parsing .xlsx with openpyxl dominates cold start, so each workbook is
+converted once into an uncompressed Arrow IPC (Feather v2) file that is
+memory-mapped on later reads. A small JSON sidecar records the source
+file's size, mtime and SHA-256; the workbook is only re-parsed when it
+actually changes. Entries are keyed by the workbook's absolute path and the
+``read_excel`` arguments, so two workbooks of the same name (or two sheets
+of one workbook) do not share an entry.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+try:
+    from pyarrow import feather
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '.dashboard_cache')
+CACHE_FORMAT_VERSION = 1
+
+
+def file_signature(path):
+    """Cheap identity of a file: (size, mtime in ns)."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_paths(path, cache_dir=None, read_kwargs=None):
+    """Return (data_path, meta_path) of the cache entry for a source file read with ``read_kwargs``."""
+    cache_dir = cache_dir or CACHE_DIR
+    key = json.dumps([os.path.abspath(path), read_kwargs or {}], sort_keys=True, default=repr)
+    name = f'{os.path.basename(path)}.{hashlib.sha256(key.encode()).hexdigest()[:16]}'
+    return (os.path.join(cache_dir, name + '.arrow'),
+            os.path.join(cache_dir, name + '.json'))
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, meta_path)
+
+
+def _arrow_safe(df):
+    """Stringify non-null values of mixed-type object columns.
+
+    openpyxl yields columns such as ``rating_count`` (ints and "1,240"
+    strings) or ``review`` (text and stray booleans) that Arrow cannot
+    store. Every dashboard casts these with ``astype(str)`` anyway, so
+    converting here keeps results identical while preserving nulls.
+    """
+    df = df.copy()
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object and infer_dtype(s, skipna=True).startswith('mixed'):
+            df[col] = s.where(s.isna(), s.astype(str))
+    return df
+
+
+def is_fresh(path, cache_dir=None, read_kwargs=None):
+    """True when the cache entry for ``path`` matches the source file."""
+    data_path, meta_path = cache_paths(path, cache_dir, read_kwargs)
+    meta = _read_meta(meta_path)
+    if not meta or meta.get('version') != CACHE_FORMAT_VERSION or not os.path.exists(data_path):
+        return False
+    size, mtime_ns = file_signature(path)
+    if meta['size'] == size and meta['mtime_ns'] == mtime_ns:
+        return True
+    # mtime changed (copy, checkout, touch) - fall back to the content hash
+    if meta['size'] == size and meta['sha256'] == file_sha256(path):
+        meta['mtime_ns'] = mtime_ns
+        _write_meta(meta_path, meta)
+        return True
+    return False
+
+
+def convert(path, cache_dir=None, **read_kwargs):
+    """Parse ``path`` with pandas and (re)write its columnar cache entry.
+
+    The entry is not written when the workbook changed while it was being read.
+    """
+    if not HAVE_ARROW:
+        return pd.read_excel(path, **read_kwargs)
+    signature, sha256 = file_signature(path), file_sha256(path)
+    df = pd.read_excel(path, **read_kwargs)
+    if file_signature(path) != signature:
+        print(f"{path} changed while it was read, not caching it")
+        return df
+    data_path, meta_path = cache_paths(path, cache_dir, read_kwargs)
+    os.makedirs(os.path.dirname(data_path) or '.', exist_ok=True)
+    df = _arrow_safe(df)
+    tmp = f'{data_path}.{os.getpid()}.tmp'  # workers may re-convert concurrently
+    df.to_feather(tmp, compression='uncompressed')
+    os.replace(tmp, data_path)
+    size, mtime_ns = signature
+    _write_meta(meta_path, {'version': CACHE_FORMAT_VERSION, 'source': os.path.abspath(path),
+                            'size': size, 'mtime_ns': mtime_ns, 'sha256': sha256})
+    return df
+
+
+def read_excel_cached(path, cache_dir=None, **read_kwargs):
+    """Drop-in replacement for ``pd.read_excel`` backed by the columnar cache.
+
+    Without pyarrow installed this simply calls ``pd.read_excel``.
+    """
+    if not HAVE_ARROW:
+        return pd.read_excel(path, **read_kwargs)
+    if is_fresh(path, cache_dir, read_kwargs):
+        data_path, _ = cache_paths(path, cache_dir, read_kwargs)
+        try:
+            return feather.read_table(data_path, memory_map=True).to_pandas()
+        except Exception as e:
+            print(f"Cache for {path} unreadable ({e}), re-converting")
+    return convert(path, cache_dir, **read_kwargs)
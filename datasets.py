@@ -0,0 +1,386 @@
+"""On-demand dataset pipelines for the combined dashboard.
+
+Each dataset (read, clean, figures, word cloud) is wrapped in a
+``LazyDataset`` that runs its loader the first time it is asked for and
+caches the result, so startup cost no longer depends on how many
+datasets are registered. Workbooks too large for memory are aggregated
+chunk by chunk instead (``streaming.py``); the result then has no ``df``.
+``LazyDataset.reload`` rebuilds a dataset (e.g. when ``watcher.py`` sees
+its workbook change) and swaps the new result in once it is complete.
+``warm_up(parallel=True)`` runs the loaders in a process pool.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Optional
+
+import backends
+import profiling
+from aggregation import report_payload
+from cube import GroupCube
+from cube_figures import (MCD_FILTERS, MCD_MAP_FIGURE, MOVIES_FILTERS, STREAM_SCORE_STEP, STREAM_VOTES_STEP,
+                          TWITTER_FILTERS, build_mcd_cube, build_movies_cube, build_twitter_cube, finish_movies_cube,
+                          finish_twitter_cube, mcd_figures, mcd_store_map, movies_figures, twitter_feed_figures,
+                          twitter_figures)
+from data_cache import read_excel_cached
+import wordclouds
+from token_index import token_index_for
+from pipelines import clean_mcdonalds, clean_movies, clean_twitter
+from pipelines import mcdonalds as mcd_pipeline, twitter as twitter_pipeline
+from sentiment import TextScorer, add_text_sentiment
+from streaming import should_stream, stream_aggregate
+from twitter_feed import FeedFollower, TwitterAggregates
+
+MCD_PATH = "McDonald_s_Reviews.xlsx"
+TWITTER_PATH = "twitter_dataset_1.xlsx"
+MOVIES_PATH = "n_movies_coloured.xlsx"
+TWITTER_FEED_PATH = os.environ.get('TWITTER_FEED', '')  # CSV/JSONL file new tweets are appended to
+# A process pool only pays off with spare cores; spawning workers costs a few seconds of imports
+PARALLEL = os.environ.get('DASHBOARD_PARALLEL', '1' if (os.cpu_count() or 1) > 1 else '0') == '1'
+MP_CONTEXT = os.environ.get('DASHBOARD_MP_CONTEXT', 'spawn')  # spawn is safe with the server's threads
+# Datasets switched in the browser: '1' (all that allow it), '0' (none) or comma-separated keys
+CLIENT_SWITCH = os.environ.get('DASHBOARD_CLIENT_SWITCH', '1')
+# Threads do not survive fork, so a result's follower is started by the first get() of each serving
+# process; server.py turns this off while it preloads datasets in the gunicorn master
+START_THREADS = True
+
+
+@dataclass
+class DatasetResult:
+    figs: list = field(default_factory=list)  # unfiltered figures
+    cube: Optional[GroupCube] = None  # answers filtered figure queries
+    wordcloud_url: str = ""  # served by wordclouds.py, empty when unavailable
+    wordcloud_image: bytes = b""  # encoded image, published under the dataset key when the result is stored
+    wordcloud_mimetype: str = ""
+    timings: Optional[dict] = None  # profiling report of the load, when it ran in a worker process
+    version: int = 0  # the dataset's version once stored; key caches of this result on it
+    follower: Optional[FeedFollower] = None  # keeps the dataset current once started (see LazyDataset.get)
+
+
+class LazyDataset:
+    """Runs ``loader`` once, on first access, and caches its result.
+
+    ``filters`` describes the dataset's filter controls and ``figures``
+    rebuilds its figures from the result's cube for a set of filters.
+    ``sources`` lists the files the loader reads. ``version`` is bumped
+    whenever a new result is stored and recorded on the result, so caches
+    derived from a result (e.g. serialized figures) are keyed on
+    ``result.version`` - a reload between reading the dataset's version
+    and its result cannot pair them up wrongly. ``process_safe=False``
+    keeps the loader out of the process pool (e.g. when its result holds a
+    follower, which ``get`` starts in the process serving it).
+    With ``client_switch`` the dashboard renders the dataset once per page
+    and switches to it in the browser afterwards; otherwise every switch
+    re-renders it on the server (e.g. for results that keep changing).
+    ``map_view`` is ``(figure position, render(cube, filters, bbox))`` for
+    a map figure that is redrawn for the visible area on zoom and pan.
+    """
+
+    def __init__(self, key, label, loader, filters=(), figures=None, sources=(), process_safe=True,
+                 client_switch=True, map_view=None):
+        self.key = key
+        self.label = label
+        self.loader = loader
+        self.filters = list(filters)
+        self.figures = figures
+        self.sources = list(sources)
+        self.process_safe = process_safe
+        self.client_switch = client_switch
+        self.map_view = map_view
+        self._result = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._result is not None
+
+    def get(self):
+        result = self._result
+        if result is None:
+            with self._lock:
+                if self._result is None:
+                    with profiling.run(self.key):
+                        self._set(self.loader())
+                result = self._result
+        follower = result.follower
+        if follower is not None and START_THREADS and not follower.started:
+            with self._lock:
+                if not follower.started:
+                    follower.start()
+        return result
+
+    def _set(self, result):
+        # Callers hold self._lock
+        if result.timings:
+            profiling.record(result.timings)
+            result.timings = None
+        if result.wordcloud_image:
+            result.wordcloud_url = wordclouds.publish(self.key, result.wordcloud_image, result.wordcloud_mimetype)
+        result.version = self.version + 1
+        self._result = result
+        self.version = result.version
+        prune_rollup_files()
+
+    def swap(self, result):
+        """Atomically replace the served result and bump ``version``."""
+        with self._lock:
+            self._set(result)
+
+    def reload(self):
+        """Run the loader again and swap in its result.
+
+        The current result keeps being served while the new one is built;
+        callers holding the old result keep a consistent snapshot. A
+        result without figures (the loaders' failure value, e.g. for a
+        half-written workbook) does not replace a working one. Returns
+        True when the result was swapped.
+        """
+        with self._reload_lock:
+            with profiling.run(self.key):
+                result = self.loader()
+            current = self._result
+            if current is not None and current.figs and not result.figs:
+                print(f"Reload of {self.label} produced no figures, keeping version {self.version}")
+                return False
+            self.swap(result)
+        print(f"Reloaded {self.label} (version {self.version})")
+        return True
+
+
+def scored(clean, text_column, scorer):
+    """``clean`` preceded by filling in missing sentiment columns from the text, for streamed chunks.
+
+    ``scorer`` is a ``TextScorer`` shared by the chunks; it writes its cache once, when the stream ends.
+    """
+    return lambda chunk: clean(add_text_sentiment(chunk, text_column, scorer.name, scorer))
+
+
+# ---------------- McDonald's Data ----------------
+
+def load_mcdonalds():
+    print("--- Loading and processing McDonald's data ---")
+    result = DatasetResult()
+    try:
+        if should_stream(MCD_PATH):
+            result.cube, tokens = stream_aggregate(MCD_PATH, clean_mcdonalds, build_mcd_cube, text_column='review')
+            profiling.lap('stream')
+        else:
+            raw = read_excel_cached(MCD_PATH)
+            profiling.lap('read')
+            df_mcd = clean_mcdonalds(raw)
+            del raw
+            profiling.lap('clean')
+            if not df_mcd.empty:
+                result.cube = build_mcd_cube(df_mcd)
+                profiling.lap('cube')
+                tokens = token_index_for('mcd_review', df_mcd['review'],
+                                         row_filter={'required': mcd_pipeline.REQUIRED_COLUMNS})
+                profiling.lap('tokens')
+        if result.cube is None:
+            return result
+        result.figs = mcd_figures(result.cube)
+        report_payload(result.figs[4], 'Store Locations by Rating', result.cube.n_rows)
+
+        # Word Cloud
+        result.wordcloud_image, result.wordcloud_mimetype = wordclouds.render_wordcloud(
+            frequencies=tokens.frequencies(), width=1600, height=700)
+        profiling.lap('wordcloud')
+    except Exception as e:
+        print(f"Error in McDonald's Data: {e}")
+        profiling.fail(e)
+    return result
+
+
+# ---------------- Twitter Data ----------------
+
+def load_twitter():
+    print("--- Loading and processing Twitter data ---")
+    result = DatasetResult()
+    try:
+        if should_stream(TWITTER_PATH):
+            with TextScorer('twitter_text') as scorer:
+                clean = scored(clean_twitter, 'Text', scorer)
+                result.cube, tokens = stream_aggregate(TWITTER_PATH, clean,
+                                                       partial(build_twitter_cube, score_step=STREAM_SCORE_STEP),
+                                                       finish=finish_twitter_cube, text_column='Text')
+            profiling.lap('stream')
+        else:
+            raw = read_excel_cached(TWITTER_PATH)
+            profiling.lap('read')
+            raw = add_text_sentiment(raw, 'Text', 'twitter_text')
+            profiling.lap('sentiment')
+            df_tw = clean_twitter(raw)
+            del raw
+            profiling.lap('clean')
+            if not df_tw.empty:
+                result.cube = build_twitter_cube(df_tw)
+                profiling.lap('cube')
+                tokens = token_index_for('twitter_text', df_tw['Text'],
+                                         row_filter={'required': twitter_pipeline.REQUIRED_COLUMNS,
+                                                     'fill_missing': True})
+                profiling.lap('tokens')
+        if result.cube is None:
+            return result
+        result.figs = twitter_figures(result.cube)
+
+        result.wordcloud_image, result.wordcloud_mimetype = wordclouds.render_wordcloud(
+            frequencies=tokens.frequencies(), width=1500, height=1000)
+        profiling.lap('wordcloud')
+    except Exception as e:
+        print(f"Error in Twitter Data: {e}")
+        profiling.fail(e)
+    return result
+
+
+def load_twitter_feed():
+    """Twitter workbook plus every tweet appended to ``TWITTER_FEED``, updated incrementally."""
+    print("--- Loading Twitter feed ---")
+    result = DatasetResult()
+    try:
+        feed = TwitterAggregates()
+        feed.add(read_excel_cached(TWITTER_PATH))
+
+        def publish(aggregates):
+            DATASETS['twitter_feed'].swap(DatasetResult(figs=twitter_feed_figures(aggregates)))
+
+        follower = FeedFollower(TWITTER_FEED_PATH, feed, on_update=publish)
+        follower.poll()
+        result.figs = twitter_feed_figures(feed)
+        result.follower = follower  # started by the first get() of a serving process
+    except Exception as e:
+        print(f"Error in Twitter feed: {e}")
+        profiling.fail(e)
+    return result
+
+
+# ---------------- Movies Data ----------------
+
+def load_movies():
+    print("--- Loading and processing Movies data ---")
+    result = DatasetResult()
+    try:
+        if should_stream(MOVIES_PATH):
+            result.cube, _ = stream_aggregate(MOVIES_PATH, clean_movies,
+                                              partial(build_movies_cube, votes_step=STREAM_VOTES_STEP),
+                                              finish=finish_movies_cube)
+            profiling.lap('stream')
+        else:
+            raw = read_excel_cached(MOVIES_PATH)
+            profiling.lap('read')
+            df_mv = clean_movies(raw)
+            del raw
+            profiling.lap('clean')
+            if not df_mv.empty:
+                result.cube = build_movies_cube(df_mv)
+                profiling.lap('cube')
+        if result.cube is None:
+            return result
+        result.figs = movies_figures(result.cube)
+        report_payload(result.figs[3], 'Ratings Over Years', result.cube.n_rows)
+    except Exception as e:
+        print(f"Error in Movie Data: {e}")
+        profiling.fail(e)
+    return result
+
+
+# ---------------- Registry ----------------
+
+DATASETS = {
+    'mcd': LazyDataset('mcd', "McDonald's Reviews", load_mcdonalds, MCD_FILTERS, mcd_figures, [MCD_PATH],
+                       map_view=(MCD_MAP_FIGURE, mcd_store_map)),
+    'twitter': LazyDataset('twitter', "Twitter Sentiment", load_twitter, TWITTER_FILTERS, twitter_figures,
+                           [TWITTER_PATH]),
+    'movies': LazyDataset('movies', "Movies Sentiment", load_movies, MOVIES_FILTERS, movies_figures, [MOVIES_PATH]),
+}
+
+if TWITTER_FEED_PATH:
+    DATASETS['twitter_feed'] = LazyDataset('twitter_feed', "Twitter Live Feed", load_twitter_feed,
+                                           process_safe=False, client_switch=False)
+
+if CLIENT_SWITCH != '1':
+    for _key, _dataset in DATASETS.items():
+        _dataset.client_switch = _dataset.client_switch and _key in CLIENT_SWITCH.split(',')
+
+
+def prune_rollup_files():
+    """Let the query backend delete stored rollups that no loaded dataset's cube uses any more."""
+    keep = set()
+    for dataset in DATASETS.values():
+        result = dataset._result
+        if result is not None and result.cube is not None:
+            keep.update(table for table in result.cube.rollups.values() if isinstance(table, str))  # file paths
+    backends.get().prune(keep)
+
+
+def _load_in_worker(key):
+    with profiling.run(key, record_it=False) as run:
+        result = DATASETS[key].loader()
+    result.timings = run.as_dict()
+    return result
+
+
+def load_parallel(keys, max_workers=None):
+    """Run the loaders of ``keys`` concurrently in a process pool.
+
+    Each dataset's lock is held until its result arrives, so requests for
+    it wait instead of loading it a second time. A dataset whose worker
+    fails is left unloaded and loads in-process on first use.
+    """
+    pending = {}
+    for key in keys:
+        dataset = DATASETS[key]
+        dataset._lock.acquire()
+        if dataset.loaded:
+            dataset._lock.release()
+        else:
+            pending[key] = dataset
+    if not pending:
+        return
+    try:
+        context = multiprocessing.get_context(MP_CONTEXT)
+        with ProcessPoolExecutor(max_workers=max_workers or len(pending), mp_context=context) as pool:
+            futures = {pool.submit(_load_in_worker, key): key for key in pending}
+            for future in as_completed(futures):
+                dataset = pending.pop(futures[future])
+                try:
+                    dataset._set(future.result())
+                except Exception as e:
+                    print(f"Error loading {dataset.label} in worker: {e}")
+                finally:
+                    dataset._lock.release()
+    finally:
+        for dataset in pending.values():
+            dataset._lock.release()
+
+
+def warm_up(keys=None, background=True, parallel=None):
+    """Load datasets ahead of the first request.
+
+    With ``background=True`` the loaders run in a daemon thread and the
+    returned thread is already started; a request for a dataset that is
+    still loading simply waits on that dataset's lock. With ``parallel``
+    (default ``DASHBOARD_PARALLEL``) the process-safe loaders run
+    concurrently in a process pool, the rest one after another.
+    """
+    keys = list(keys) if keys is not None else list(DATASETS)
+    parallel = PARALLEL if parallel is None else parallel
+
+    def run():
+        pooled = [key for key in keys if DATASETS[key].process_safe] if parallel else []
+        if len(pooled) > 1:
+            load_parallel(pooled)
+        for key in keys:
+            DATASETS[key].get()
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name='dataset-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,124 @@
+"""Serialized figure cache and route for the combined dashboard.
+
+Returning figures from ``render_dashboard`` makes Dash re-serialize every
+figure on every dataset switch. Instead, each dataset's unfiltered figures
+are serialized once per dataset version (with orjson when it is
+installed), pre-compressed with gzip (and brotli when available) and
+served from a content-hashed URL such as ``/figures/mcd.3f2a9c1b7d04e5a6.json``.
+The layout only carries that URL; a clientside callback fetches it and
+fills in the graphs, and the browser can cache it forever.
+
+``COMPRESS_RESPONSES`` is passed to ``Dash(compress=...)`` so callback
+responses (e.g. filtered figures) are gzip-compressed too; it needs
+``flask-compress`` and is off without it.
+"""
+
+import gzip
+import hashlib
+import importlib.util
+import os
+import threading
+
+import plotly.io as pio
+from flask import Response, abort, redirect, request
+
+try:
+    import brotli
+    HAVE_BROTLI = True
+except ImportError:
+    HAVE_BROTLI = False
+
+HAVE_FLASK_COMPRESS = importlib.util.find_spec('flask_compress') is not None
+COMPRESS_RESPONSES = HAVE_FLASK_COMPRESS and os.environ.get('DASHBOARD_COMPRESS', '1') == '1'
+
+ROUTE_PREFIX = '/figures'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+JSON_ENGINE = os.environ.get('FIGURE_JSON_ENGINE', 'auto')  # 'auto' uses orjson when installed
+GZIP_LEVEL = int(os.environ.get('FIGURE_GZIP_LEVEL', 6))
+
+_entries = {}  # key -> _Entry
+_previous = {}  # key -> entry replaced by the last publish, still served for in-flight pages
+_lock = threading.Lock()
+
+
+class _Entry:
+    def __init__(self, version, parts):
+        self.version = version
+        self.parts = parts  # one serialized figure per item
+        self.body = b'[' + b','.join(parts) + b']'
+        self.digest = hashlib.sha256(self.body).hexdigest()[:16]
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=GZIP_LEVEL)}
+        if HAVE_BROTLI:
+            self.encoded['br'] = brotli.compress(self.body)
+
+
+def serialize(fig):
+    """JSON bytes of one figure (go.Figure or plain dict)."""
+    return pio.to_json(fig, validate=False, engine=JSON_ENGINE).encode()
+
+
+def publish(key, version, figs):
+    """URL of ``figs`` (a JSON array), serializing them only when ``version`` changed."""
+    entry = _entries.get(key)
+    if entry is None or entry.version != version:
+        entry = _Entry(version, [serialize(fig) for fig in figs])
+        with _lock:
+            current = _entries.get(key)
+            if current is not None and current.digest != entry.digest:
+                _previous[key] = current
+            _entries[key] = entry
+    return f'{ROUTE_PREFIX}/{key}.{entry.digest}.json'
+
+
+def url_for(key):
+    """Current URL of a published figure set, or '' if there is none."""
+    entry = _entries.get(key)
+    return f'{ROUTE_PREFIX}/{key}.{entry.digest}.json' if entry else ''
+
+
+def _encoding(entry):
+    accepted = request.headers.get('Accept-Encoding', '')
+    for name in ('br', 'gzip'):
+        if name in entry.encoded and name in accepted:
+            return name
+    return None
+
+
+def serve(filename, load=None):
+    try:
+        key, digest, _ext = filename.rsplit('.', 2)
+    except ValueError:
+        abort(404)
+    entry = _entries.get(key)
+    if entry is None and load is not None:
+        load(key)  # published by another process (e.g. a lazily loading gunicorn worker)
+        entry = _entries.get(key)
+    if entry is None:
+        abort(404)
+    if digest != entry.digest and key in _previous and digest == _previous[key].digest:
+        entry = _previous[key]
+    if digest != entry.digest:
+        # Stale link from an old layout - point at the current figures
+        return redirect(url_for(key), code=302)
+    etag = f'"{entry.digest}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        resp = Response(status=304)
+    else:
+        encoding = _encoding(entry)
+        resp = Response(entry.encoded[encoding] if encoding else entry.body, mimetype='application/json')
+        if encoding:
+            resp.headers['Content-Encoding'] = encoding
+    resp.headers['ETag'] = etag
+    resp.headers['Cache-Control'] = CACHE_CONTROL
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
+
+
+def register_routes(server, load=None):
+    """Attach the figure route to a Flask app (``dash_app.server``).
+
+    ``load(name)`` publishes ``name`` in this process when it has nothing
+    under that name yet, so a URL handed out by another worker still resolves.
+    """
+    server.add_url_rule(f'{ROUTE_PREFIX}/<path:filename>', 'figure_json',
+                        lambda filename: serve(filename, load))
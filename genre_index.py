@@ -0,0 +1,191 @@
+"""Multi-genre index for the movies dataset.
+
+A title lists several genres (``"Action, Comedy, Drama"``) but
+``genre_main`` keeps only the first. ``GenreIndex`` records every
+membership without exploding the frame to one row per (title, genre):
+
+* the genre lists are factorized into ``combos`` - the distinct lists, a
+  few hundred even for large catalogues, named by ``labels`` (``"Action,
+  Comedy"``) - with ``combo_of_row`` giving each row's combo and the boolean
+  ``membership`` matrix (combo x genre) the genres of each combo;
+* ``indptr``/``row_ids`` hold the row ids of every genre in CSR layout
+  (built on first use).
+
+Per-genre counts and sums are one ``bincount`` over the rows' combos
+followed by a small matrix product with ``membership``; masks for genre
+intersections (``all_of``) and unions (``any_of``) are a lookup of the
+combo. ``rollup`` produces a ``GroupCube`` rollup with a ``genre``
+dimension, and ``quantiles`` sorts the CSR segments for box plots.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pipelines.common import as_text
+
+
+class GenreIndex:
+    """Genre memberships of the rows of a frame, from its comma-separated genre column."""
+
+    def __init__(self, genres, membership, combo_of_row, labels=None):
+        self.genres = genres
+        self.membership = membership
+        self.combo_of_row = combo_of_row
+        self.labels = labels
+        self._csr = None
+
+    @classmethod
+    def build(cls, genre_lists, sep=','):
+        # Split each distinct list once, not every row
+        combo_of_row, combos = pd.factorize(as_text(genre_lists).fillna(''), sort=False)
+        split = [[g.strip() for g in combo.split(sep) if g.strip()] for combo in combos]
+        # Spellings of one list ("Action,Comedy" / "Action, Comedy") share a combo
+        combo_of_combo, labels = pd.factorize(pd.Series([', '.join(names) for names in split], dtype=object),
+                                              sort=False)
+        genres = np.array(sorted({g for names in split for g in names}), dtype=object)
+        position = {g: i for i, g in enumerate(genres)}
+        membership = np.zeros((len(labels), len(genres)), dtype=bool)
+        for c, names in zip(combo_of_combo, split):
+            membership[c, [position[g] for g in names]] = True
+        return cls(genres, membership, combo_of_combo[combo_of_row].astype(np.int32), np.asarray(labels, dtype=object))
+
+    @property
+    def n_rows(self):
+        return len(self.combo_of_row)
+
+    def __len__(self):
+        return len(self.genres)
+
+    @property
+    def indptr(self):
+        return self._build_csr()[0]
+
+    @property
+    def row_ids(self):
+        return self._build_csr()[1]
+
+    def _build_csr(self):
+        if self._csr is None:
+            # Genres of each combo (combo-major), repeated for every row of that combo
+            combo_of_entry, genre_of_combo_entry = np.nonzero(self.membership)
+            if len(self.genres) < 2 ** 15:
+                genre_of_combo_entry = genre_of_combo_entry.astype(np.int16)  # stable argsort is a radix sort
+            combo_start = np.zeros(len(self.membership) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(combo_of_entry, minlength=len(self.membership)), out=combo_start[1:])
+            per_row = np.diff(combo_start)[self.combo_of_row]
+            entry_start = np.cumsum(per_row) - per_row
+            offset = np.arange(int(per_row.sum()), dtype=np.int64) - np.repeat(entry_start, per_row)
+            genre_of_entry = genre_of_combo_entry[np.repeat(combo_start[self.combo_of_row], per_row) + offset]
+            # Entries are in row order, so a stable sort by genre keeps each genre's rows sorted
+            order = np.argsort(genre_of_entry, kind='stable')
+            row_ids = np.repeat(np.arange(self.n_rows, dtype=np.int32), per_row)[order]
+            indptr = np.zeros(len(self.genres) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(genre_of_entry, minlength=len(self.genres)), out=indptr[1:])
+            self._csr = (indptr, row_ids)
+        return self._csr
+
+    def rows_of(self, genre):
+        """Sorted row ids of the titles listing ``genre``."""
+        g = int(np.searchsorted(self.genres, genre))
+        if g == len(self.genres) or self.genres[g] != genre:
+            return np.empty(0, dtype=np.int32)
+        return self.row_ids[self.indptr[g]:self.indptr[g + 1]]
+
+    def _positions(self, names):
+        """Positions of the known genres among ``names``, and whether all were known."""
+        names = list(dict.fromkeys(names))
+        pos = np.searchsorted(self.genres, names)
+        known = [p for p, name in zip(pos, names) if p < len(self.genres) and self.genres[p] == name]
+        return np.array(known, dtype=np.int64), len(known) == len(names)
+
+    def combo_mask(self, all_of=(), any_of=()):
+        """Combos listing every genre of ``all_of`` and at least one of ``any_of`` (if given)."""
+        combos = np.ones(len(self.membership), dtype=bool)
+        if all_of:
+            pos, known = self._positions(all_of)
+            combos &= self.membership[:, pos].all(axis=1) & known
+        if any_of:
+            pos, _ = self._positions(any_of)
+            combos &= self.membership[:, pos].any(axis=1)
+        return combos
+
+    def mask(self, all_of=(), any_of=()):
+        """Rows listing every genre of ``all_of`` and at least one of ``any_of`` (if given)."""
+        return self.combo_mask(all_of, any_of)[self.combo_of_row]
+
+    def row_labels(self):
+        """Each row's normalized genre list as a categorical, e.g. a cube dimension."""
+        return pd.Categorical.from_codes(self.combo_of_row, self.labels)
+
+    def _combo_sums(self, keep, weights=None):
+        return np.bincount(self.combo_of_row[keep], weights=None if weights is None else weights[keep],
+                           minlength=len(self.membership))
+
+    def stats(self, frame, columns, mask=None):
+        """Per-genre ``count``, ``sum_<c>`` and ``mean_<c>`` of ``columns`` (rows aligned with the index).
+
+        ``mask`` restricts the rows, e.g. to ``mask(all_of=[...])`` for a genre intersection.
+        """
+        keep = np.ones(self.n_rows, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        member = self.membership.T.astype(np.float64)  # genres x combos
+        out = pd.DataFrame({'genre': self.genres, 'count': (member @ self._combo_sums(keep)).astype(np.int64)})
+        for c in columns:
+            values = frame[c].to_numpy(dtype=np.float64)
+            ok = keep & ~np.isnan(values)
+            n = member @ self._combo_sums(ok)
+            out[f'sum_{c}'] = member @ self._combo_sums(ok, values)
+            out[f'mean_{c}'] = out[f'sum_{c}'] / np.where(n > 0, n, np.nan)
+        return out[out['count'] > 0].reset_index(drop=True)
+
+    def co_occurrence(self, mask=None):
+        """Genre x genre frame of how many rows list both genres (the diagonal: each genre's count)."""
+        counts = self._combo_sums(np.ones(self.n_rows, dtype=bool) if mask is None else np.asarray(mask, dtype=bool))
+        member = self.membership.astype(np.float64)
+        matrix = member.T @ (member * counts[:, None])
+        return pd.DataFrame(matrix.astype(np.int64), index=self.genres, columns=self.genres)
+
+    def rollup(self, df, dims, measures):
+        """A ``GroupCube`` rollup of ``df`` over ``dims`` + ``genre``, counting each row once per genre."""
+        groups = df.groupby(list(dims), observed=True, sort=False)
+        group_of_row = groups.ngroup().to_numpy()
+        keys = groups.size().index.to_frame(index=False)
+        keep = group_of_row >= 0  # rows with a missing key belong to no group
+        n_combos = len(self.membership)
+        pair, inverse = np.unique(group_of_row[keep].astype(np.int64) * n_combos + self.combo_of_row[keep],
+                                  return_inverse=True)
+        sums = {'count': np.bincount(inverse, minlength=len(pair))}
+        for m in measures:
+            weights = np.nan_to_num(df[m].to_numpy(dtype=np.float64)[keep])  # like pandas' sum, skip missing
+            sums[f'sum_{m}'] = np.bincount(inverse, weights=weights, minlength=len(pair))
+        # one output row per (group, combo, genre of the combo): a few per distinct combo, not per title
+        pair_group, pair_combo = pair // n_combos, pair % n_combos
+        which, genre = np.nonzero(self.membership[pair_combo])
+        out = keys.iloc[pair_group[which]].reset_index(drop=True)
+        out['genre'] = pd.Categorical.from_codes(genre, self.genres)
+        for name, values in sums.items():
+            out[name] = values[which]
+        value_cols = list(sums)
+        return out.groupby(list(dims) + ['genre'], observed=True)[value_cols].sum().reset_index()
+
+    def quantiles(self, values, qs=(0.25, 0.5, 0.75), mask=None):
+        """Per-genre quantiles (linear interpolation) of ``values``, one column per ``q``."""
+        values = np.asarray(values, dtype=np.float64)
+        genre_of_entry = np.repeat(np.arange(len(self.genres)), np.diff(self.indptr))
+        entry_values = values[self.row_ids]
+        keep = ~np.isnan(entry_values)
+        if mask is not None:
+            keep &= np.asarray(mask, dtype=bool)[self.row_ids]
+        genre_of_entry, entry_values = genre_of_entry[keep], entry_values[keep]
+        order = np.lexsort((entry_values, genre_of_entry))
+        entry_values = entry_values[order]
+        sizes = np.bincount(genre_of_entry, minlength=len(self.genres))
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        present = sizes > 0
+        out = pd.DataFrame({'genre': self.genres[present], 'count': sizes[present]})
+        for q in qs:
+            pos = (sizes[present] - 1) * q
+            lo, hi = np.floor(pos).astype(np.int64), np.ceil(pos).astype(np.int64)
+            low = entry_values[starts[present] + lo]
+            high = entry_values[starts[present] + hi]
+            out[q] = low + (high - low) * (pos - lo)
+        return out
@@ -0,0 +1,35 @@
+"""gunicorn settings for the combined dashboard (``gunicorn -c gunicorn.conf.py server:server``)."""
+
+import multiprocessing
+import os
+import signal
+
+bind = os.environ.get('DASHBOARD_BIND', '0.0.0.0:5050')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * multiprocessing.cpu_count() + 1, 8)))
+threads = int(os.environ.get('DASHBOARD_THREADS', 4))
+# Build datasets once in the master and share them with the forked workers (see server.py)
+preload_app = os.environ.get('DASHBOARD_PRELOAD', '1') == '1'
+timeout = 120
+
+
+def post_fork(server, worker):
+    # Start the feed follower in each worker on its first request, never in the preloading master
+    import datasets
+    datasets.START_THREADS = True
+
+
+def when_ready(server):
+    # One watcher for all workers, in the master. With preload_app it rebuilds a changed dataset once, in the
+    # copy the workers are forked from; a HUP then replaces the workers gracefully. Without preload_app the
+    # new workers simply load the new files.
+    if os.environ.get('DASHBOARD_WATCH', '1') == '1':
+        from watcher import watch
+        watch(on_change=_replace_workers)
+
+
+def _replace_workers(keys):
+    if preload_app:
+        import server as app
+        app.publish(keys)
+    print(f"Datasets changed ({', '.join(keys)}), replacing workers")
+    os.kill(os.getpid(), signal.SIGHUP)
@@ -1,57 +1,44 @@
-import pandas as pd
-import numpy as np
-import base64
-from io import BytesIO
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import plotly.express as px
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 
+from aggregation import store_map_figure
+from data_cache import read_excel_cached
+import profiling
+import wordclouds
+from token_index import token_index_for
+from pipelines import clean_mcdonalds
+
 # ========== Load and Clean Data ==========
-df = pd.read_excel("McDonald_s_Reviews.xlsx")
-df.columns = df.columns.str.strip()
-
-df['rating'] = df['rating'].astype(str).str.extract(r'(\d)').astype(float)
-df['rating_count'] = df['rating_count'].astype(str).str.replace(',', '').astype(float)
-df['sentiment'] = df['rating'].apply(lambda x: 1 if x >= 4 else (-1 if x <= 2 else 0))
-df['sentiment_label'] = df['sentiment'].map({1: 'Positive', 0: 'Neutral', -1: 'Negative'})
-
-def parse_review_time(text):
-    text = str(text)
-    if 'day' in text:
-        return 0.1
-    elif 'week' in text:
-        return 0.5
-    elif 'month' in text:
-        num = ''.join([s for s in text if s.isdigit()])
-        return int(num) if num else 1
-    elif 'year' in text:
-        num = ''.join([s for s in text if s.isdigit()])
-        return int(num)*12 if num else 12
-    return np.nan
-
-df['months_ago'] = df['review_time'].apply(parse_review_time)
-df_clean = df.dropna(subset=['rating', 'rating_count', 'latitude', 'longitude', 'months_ago'])
+profiling.start_run('mcdonaldsdashbaord')
+raw = read_excel_cached("McDonald_s_Reviews.xlsx")
+profiling.lap('read')
+required = ['rating', 'rating_count', 'latitude', 'longitude', 'months_ago']
+df_clean = clean_mcdonalds(raw, required=required)
+del raw  # free the uncleaned frame before building figures
+profiling.lap('clean')
 
 # ========== Visualizations ==========
 
 # Pie Chart: Sentiment
 pie_fig = px.pie(df_clean, names='sentiment_label', title='Sentiment Distribution')
 pie_fig.update_layout(height=800, title_font_size=24)
+profiling.lap('figure: Sentiment Distribution')
 
 # Store vs Sentiment
-store_sentiment = df_clean.groupby('store_address')['sentiment'].mean().reset_index()
+store_sentiment = df_clean.groupby('store_address', observed=True)['sentiment'].mean().reset_index()
 bar_sentiment = px.bar(store_sentiment, x='store_address', y='sentiment',
                        title='Store Address vs Avg Sentiment',
                        labels={'sentiment': 'Average Sentiment'})
 bar_sentiment.update_layout(height=1000, xaxis_tickangle=-45, title_font_size=24)
+profiling.lap('figure: Store Address vs Avg Sentiment')
 
 # Review Time vs Rating
 time_rating = df_clean.groupby('months_ago')['rating'].mean().reset_index()
 line_time_rating = px.line(time_rating.sort_values('months_ago'), x='months_ago', y='rating',
                            title='Review Time vs Average Rating')
 line_time_rating.update_layout(height=800, title_font_size=24)
+profiling.lap('figure: Review Time vs Average Rating')
 
 # Top Stores by Review Count
 top_stores = df_clean['store_address'].value_counts().nlargest(10).reset_index()
@@ -59,36 +46,35 @@ top_stores.columns = ['store_address', 'review_count']
 bar_top_stores = px.bar(top_stores, x='store_address', y='review_count',
                         title='Top 10 Stores by Review Count')
 bar_top_stores.update_layout(height=1000, xaxis_tickangle=-45, title_font_size=24)
+profiling.lap('figure: Top 10 Stores by Review Count')
 
 # Map: Ratings by Location
-scatter_map = px.scatter(df_clean, x='longitude', y='latitude', color='rating',
-                         title='Store Locations (Colored by Rating)',
-                         hover_data=['store_address'])
+scatter_map = store_map_figure(df_clean, title='Store Locations (Colored by Rating)')
 scatter_map.update_layout(height=600, title_font_size=24)
+profiling.lap('figure: Store Locations (Colored by Rating)')
 
 # Store vs Avg Rating Count
-rating_store = df_clean.groupby('store_address')['rating_count'].mean().reset_index()
+rating_store = df_clean.groupby('store_address', observed=True)['rating_count'].mean().reset_index()
 bar_rating_count = px.bar(rating_store.sort_values('rating_count', ascending=False).head(10),
                           x='store_address', y='rating_count',
                           title='Top 10 Stores by Avg Rating Count')
 bar_rating_count.update_layout(height=1000, xaxis_tickangle=-45, title_font_size=24)
+profiling.lap('figure: Top 10 Stores by Avg Rating Count')
 
 # Word Cloud
-text = ' '.join(df_clean['review'].dropna().astype(str).tolist())
-wordcloud = WordCloud(width=1600, height=700, background_color='white').generate(text)
-buffer = BytesIO()
-plt.figure(figsize=(16, 8))
-plt.imshow(wordcloud, interpolation='bilinear')
-plt.axis('off')
-plt.tight_layout(pad=0)
-plt.savefig(buffer, format='png')
-plt.close()
-encoded_wordcloud = base64.b64encode(buffer.getvalue()).decode()
+tokens = token_index_for('mcd_review', df_clean['review'], row_filter={'required': required})
+wordcloud_image, wordcloud_mimetype = wordclouds.render_wordcloud(frequencies=tokens.frequencies(), width=1600, height=700)
+wordcloud_url = wordclouds.publish('mcd', wordcloud_image, wordcloud_mimetype)
+profiling.lap('wordcloud')
+profiling.finish_run()
 
 # ========== Dash App ==========
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "McDonald's Review Dashboard"
+wordclouds.register_routes(app.server)
+profiling.register_routes(app.server)
+server = app.server  # WSGI entry point: gunicorn mcdonaldsdashbaord:server
 
 app.layout = dbc.Container(fluid=True, children=[
 
@@ -119,7 +105,7 @@ app.layout = dbc.Container(fluid=True, children=[
     dbc.Row([
         dbc.Col(html.Div([
             html.H3("Word Cloud of Reviews", className='text-center mt-4'),
-            html.Img(src='data:image/png;base64,{}'.format(encoded_wordcloud),
+            html.Img(src=wordcloud_url,
                      style={'width': '100%', 'border': '1px solid #ccc', 'margin-top': '10px'})
         ]), width=12),
     ]),
@@ -128,4 +114,4 @@ app.layout = dbc.Container(fluid=True, children=[
 ], style={'backgroundColor': '#ffffff', 'padding': '30px'})
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run()  # DASH_DEBUG=true enables the debugger and reloader
\ No newline at end of file
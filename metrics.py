@@ -0,0 +1,185 @@
+"""Request metrics for the Dash servers, in Prometheus text format.
+
+``register_routes(server)`` hooks every request on a Flask app
+(``dash_app.server``) and serves the collected metrics from ``/metrics``:
+
+- ``dashboard_requests_total`` - requests by route, callback, dashboard and status
+- ``dashboard_request_errors_total`` - requests that ended in a 5xx
+- ``dashboard_request_duration_seconds`` - latency histogram
+- ``dashboard_response_size_bytes`` - response body size histogram (figure
+  and word cloud bodies are stored compressed; callback responses are
+  measured before flask-compress)
+
+Dash callbacks all arrive on ``/_dash-update-component``; they are told apart
+by the callback's output id. The dashboard is the selected value among the
+callback's inputs or state, or the ``dataset`` of a pattern-matching id (per
+dataset panels and filters); ``/figures`` and ``/wordcloud`` requests carry it
+in the file name.
+
+The exporter is in-process and needs no client library. Each gunicorn worker
+keeps its own counters, so a scrape sees the worker that answered it.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, request
+
+ROUTE = '/metrics'
+SELECTOR_IDS = ('dashboard-selector', 'server-selection')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LABELS = ('route', 'callback', 'dashboard')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+
+
+class Registry:
+    """Counters and histograms keyed by label tuples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)  # LABELS + (status,) -> count
+        self.errors = defaultdict(int)
+        self.latency = {}
+        self.sizes = {}
+
+    def observe(self, labels, status, seconds, size):
+        with self._lock:
+            self.requests[labels + (str(status),)] += 1
+            if status >= 500:
+                self.errors[labels] += 1
+            if labels not in self.latency:
+                self.latency[labels] = Histogram(LATENCY_BUCKETS)
+                self.sizes[labels] = Histogram(SIZE_BUCKETS)
+            self.latency[labels].observe(seconds)
+            if size is not None:
+                self.sizes[labels].observe(size)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            _counter(lines, 'dashboard_requests_total', 'Requests handled.', LABELS + ('status',), self.requests)
+            _counter(lines, 'dashboard_request_errors_total', 'Requests that ended in a 5xx response.',
+                     LABELS, self.errors)
+            _histogram(lines, 'dashboard_request_duration_seconds', 'Request latency.', self.latency)
+            _histogram(lines, 'dashboard_response_size_bytes', 'Response body size.', self.sizes)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _counter(lines, name, help_text, names, values):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{_labels(names, labels)} {value}')
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, hist in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(hist.buckets + ('+Inf',), hist.counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f'{name}_bucket{_labels(LABELS, labels, le)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(LABELS, labels)} {_number(hist.sum)}')
+        lines.append(f'{name}_count{_labels(LABELS, labels)} {cumulative}')
+
+
+REGISTRY = Registry()
+
+
+def _selected_dashboard(payload):
+    for item in (payload.get('inputs') or []) + (payload.get('state') or []):
+        for entry in item if isinstance(item, list) else [item]:  # ALL inputs arrive as lists
+            if not isinstance(entry, dict):
+                continue
+            if entry.get('id') in SELECTOR_IDS:
+                return str(entry.get('value') or '')
+            if isinstance(entry.get('id'), dict) and 'dataset' in entry['id']:
+                return str(entry['id']['dataset'])
+    return ''
+
+
+def request_labels(dashboards=None, callbacks=None):
+    """(route, callback, dashboard) for the current request."""
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    callback = dashboard = ''
+    if request.path.endswith('/_dash-update-component'):
+        payload = request.get_json(silent=True) or {}  # already parsed (and cached) by Dash
+        callback = str(payload.get('output', ''))
+        dashboard = _selected_dashboard(payload)
+    elif request.view_args and 'filename' in request.view_args:
+        dashboard = request.view_args['filename'].split('.', 1)[0]
+    if callbacks is not None and callback not in callbacks:
+        callback = ''  # keep arbitrary client input out of the label set
+    if dashboards is not None and dashboard not in dashboards:
+        dashboard = ''
+    return route, callback, dashboard
+
+
+def register_routes(server, dashboards=None, callbacks=None, registry=REGISTRY):
+    """Instrument every request of a Flask app and serve ``/metrics``.
+
+    ``dashboards`` lists the valid dashboard keys and ``callbacks`` the valid
+    callback outputs (pass ``app.callback_map`` itself, it is read per
+    request); other values are recorded as an empty label.
+    """
+    dashboards = set(dashboards) if dashboards is not None else None
+
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    def observe(response):
+        start = g.pop('metrics_start', None)
+        if start is not None and request.path != ROUTE:
+            size = None if response.is_streamed else response.calculate_content_length()
+            registry.observe(request_labels(dashboards, callbacks), response.status_code,
+                             time.perf_counter() - start, size)
+        return response
+
+    def observe_unhandled(exc):
+        # Exceptions that propagate past Flask (e.g. PROPAGATE_EXCEPTIONS) skip after_request
+        start = g.pop('metrics_start', None)
+        if exc is not None and start is not None:
+            registry.observe(request_labels(dashboards, callbacks), 500, time.perf_counter() - start, None)
+
+    def serve_metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    server.before_request(start_timer)
+    server.after_request(observe)
+    server.teardown_request(observe_unhandled)
+    server.add_url_rule(ROUTE, 'metrics', serve_metrics)
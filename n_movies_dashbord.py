@@ -1,77 +1,87 @@
-import pandas as pd
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 
-# Load Excel data
-df = pd.read_excel("n_movies_coloured.xlsx")
+from aggregation import density_scatter, report_payload
+from data_cache import read_excel_cached
+from genre_index import GenreIndex
+from pipelines import clean_movies
+import profiling
 
-# Data Cleaning & Preparation
-df['year_clean'] = df['year'].str.extract(r'(\d{4})').astype(float)
-df['duration_min'] = df['duration'].str.extract(r'(\d+)').astype(float)
-df['genre_main'] = df['genre'].str.split(',').str[0]
-df['sentiment_label'] = df['sentiment'].map({1: 'Positive', 0: 'Neutral', -1: 'Negative'})
-
-df_clean = df.dropna(subset=['rating', 'votes', 'duration_min', 'year_clean', 'sentiment_score'])
+# Load Excel data, clean & prepare
+profiling.start_run('n_movies_dashbord')
+raw = read_excel_cached("n_movies_coloured.xlsx")
+profiling.lap('read')
+df_clean = clean_movies(raw,
+                        required=['rating', 'votes', 'duration_min', 'year_clean', 'sentiment_score'])
+del raw  # free the uncleaned frame before building figures
+profiling.lap('clean')
+genres = GenreIndex.build(df_clean['genre'])  # every listed genre of a title, not only genre_main
+profiling.lap('genres')
 
 # 1. IMDb Ratings Boxplot
 fig1 = go.Figure()
 fig1.add_trace(go.Box(y=df_clean['rating'], name='IMDb Ratings', boxmean=True))
 fig1.update_layout(title='Box Plot of IMDb Ratings')
+profiling.lap('figure: Box Plot of IMDb Ratings')
 
 # 2. Votes Distribution
 fig2 = go.Figure()
 fig2.add_trace(go.Histogram(x=df_clean['votes'], nbinsx=30))
 fig2.update_layout(title='Distribution of Votes', xaxis_title='Votes', yaxis_title='Count')
+profiling.lap('figure: Distribution of Votes')
 
 # 3. Ratings Over the Years
 fig3 = go.Figure()
-fig3.add_trace(go.Scatter(
-    x=df_clean['year_clean'],
-    y=df_clean['rating'],
-    mode='markers',
-    marker=dict(color=df_clean['sentiment_score'], colorscale='Viridis', showscale=True),
-    text=df_clean['title']
-))
+fig3.add_trace(density_scatter(df_clean, 'year_clean', 'rating', color='sentiment_score', text='title',
+                               marker=dict(colorscale='Viridis', showscale=True)))
 fig3.update_layout(title='Ratings Over the Years (Colored by Sentiment Score)',
                    xaxis_title='Year', yaxis_title='Rating')
+report_payload(fig3, 'Ratings Over the Years', len(df_clean))
+profiling.lap('figure: Ratings Over the Years (Colored by Sentiment Score)')
 
 # 4. Average Rating by Genre
-genre_rating = df_clean.groupby('genre_main')['rating'].mean().sort_values(ascending=False)
+genre_rating = genres.stats(df_clean, ['rating']).sort_values('mean_rating', ascending=False)
 fig4 = go.Figure()
-fig4.add_trace(go.Bar(x=genre_rating.index, y=genre_rating.values))
-fig4.update_layout(title='Average Rating by Main Genre', xaxis_title='Genre', yaxis_title='Average Rating')
+fig4.add_trace(go.Bar(x=genre_rating['genre'], y=genre_rating['mean_rating']))
+fig4.update_layout(title='Average Rating by Genre', xaxis_title='Genre', yaxis_title='Average Rating')
+profiling.lap('figure: Average Rating by Genre')
 
 # 5. Sentiment Pie
 sentiment_counts = df_clean['sentiment_label'].value_counts()
 fig5 = go.Figure()
 fig5.add_trace(go.Pie(labels=sentiment_counts.index, values=sentiment_counts.values))
 fig5.update_layout(title='Sentiment Distribution of Movies')
+profiling.lap('figure: Sentiment Distribution of Movies')
 
 # 6. Rating vs Duration
 fig6 = go.Figure()
-fig6.add_trace(go.Scatter(
-    x=df_clean['duration_min'],
-    y=df_clean['rating'],
-    mode='markers',
-    text=df_clean['title'],
-    marker=dict(color='orange')
-))
+fig6.add_trace(density_scatter(df_clean, 'duration_min', 'rating', text='title', marker=dict(color='orange')))
 fig6.update_layout(title='Rating vs. Duration', xaxis_title='Duration (min)', yaxis_title='Rating')
+report_payload(fig6, 'Rating vs. Duration', len(df_clean))
+profiling.lap('figure: Rating vs. Duration')
 
-# 7. Sentiment Score by Genre
+# 7. Sentiment Score by Genre (box statistics computed per genre, so no point is sent per title and genre)
+score_box = genres.quantiles(df_clean['sentiment_score'], (0, 0.25, 0.5, 0.75, 1)).merge(
+    genres.stats(df_clean, ['sentiment_score']), on=['genre', 'count'])
 fig7 = go.Figure()
-fig7.add_trace(go.Box(y=df_clean['sentiment_score'], x=df_clean['genre_main'], boxmean=True))
+fig7.add_trace(go.Box(x=score_box['genre'], lowerfence=score_box[0], q1=score_box[0.25], median=score_box[0.5],
+                      q3=score_box[0.75], upperfence=score_box[1], mean=score_box['mean_sentiment_score']))
 fig7.update_layout(title='Sentiment Score by Genre', xaxis_title='Genre', yaxis_title='Sentiment Score')
+profiling.lap('figure: Sentiment Score by Genre')
 
 # 8. Rating by Certificate
-rating_by_cert = df_clean.groupby('certificate')['rating'].mean().sort_values()
+rating_by_cert = df_clean.groupby('certificate', observed=True)['rating'].mean().sort_values()
 fig8 = go.Figure()
 fig8.add_trace(go.Bar(x=rating_by_cert.index, y=rating_by_cert.values))
 fig8.update_layout(title='Average Rating by Certificate', xaxis_title='Certificate', yaxis_title='Average Rating')
+profiling.lap('figure: Average Rating by Certificate')
+profiling.finish_run()
 
 # Initialize Dash app
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+server = app.server  # WSGI entry point: gunicorn n_movies_dashbord:server
+profiling.register_routes(server)
 
 # App Layout
 app.layout = dbc.Container([
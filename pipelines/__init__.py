@@ -0,0 +1,7 @@
+"""Shared, vectorized data-cleaning steps used by every dashboard."""
+
+from pipelines.mcdonalds import clean_mcdonalds, parse_review_time
+from pipelines.movies import clean_movies
+from pipelines.twitter import clean_twitter
+
+__all__ = ['clean_mcdonalds', 'clean_movies', 'clean_twitter', 'parse_review_time']
@@ -0,0 +1,53 @@
+"""Helpers shared by the per-dataset cleaning pipelines."""
+
+from typing import Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+SENTIMENT_LABELS = {1: 'Positive', 0: 'Neutral', -1: 'Negative'}
+SENTIMENT_ORDER = ['Negative', 'Neutral', 'Positive']
+
+
+def sentiment_labels(sentiment: pd.Series, labels: Mapping[int, str] = SENTIMENT_LABELS) -> pd.Series:
+    """Map -1/0/1 sentiment codes to an ordered categorical of labels."""
+    return sentiment.map(labels).astype(pd.CategoricalDtype(SENTIMENT_ORDER, ordered=True))
+
+
+def as_text(values: pd.Series) -> pd.Series:
+    """Return ``values`` unchanged if already string-typed, else ``astype(str)``."""
+    return values if pd.api.types.is_string_dtype(values) else values.astype(str)
+
+
+def to_category(values: pd.Series) -> pd.Series:
+    return values.astype('category')
+
+
+def downcast_numeric(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    """Downcast integer columns to the smallest int and floats to float32."""
+    for col in columns:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if pd.api.types.is_integer_dtype(s) or pd.api.types.is_bool_dtype(s):
+            df[col] = pd.to_numeric(s, downcast='integer')
+        elif pd.api.types.is_float_dtype(s):
+            df[col] = s.astype(np.float32)
+    return df
+
+
+def drop_incomplete(df: pd.DataFrame, required: Iterable[str]) -> pd.DataFrame:
+    """Drop rows missing any ``required`` column.
+
+    Returns an empty frame (after reporting it) when one of the columns
+    does not exist at all, matching what the dashboards did before.
+    """
+    required = list(required)
+    for col in required:
+        if col not in df.columns:
+            print(f"Missing column: {col}")
+            return pd.DataFrame()
+    df = df.dropna(subset=required)
+    for col in df.select_dtypes('category').columns:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
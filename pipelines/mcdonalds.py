@@ -0,0 +1,63 @@
+"""McDonald's reviews cleaning."""
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from pipelines.common import as_text, downcast_numeric, drop_incomplete, sentiment_labels, to_category
+
+# "Recent" bucket (minutes, hours, days) and a week, expressed in months
+RECENT_MONTHS = 0.1
+WEEK_MONTHS = 0.5
+
+REQUIRED_COLUMNS = ['rating', 'rating_count', 'latitude', 'longitude', 'months_ago',
+                    'store_address', 'review', 'sentiment_label', 'sentiment']
+
+
+def parse_review_time(review_time: pd.Series) -> pd.Series:
+    """Convert phrases like "3 months ago" / "a year ago" to months ago (float).
+
+    Minutes, hours and days map to 0.1, weeks to 0.5, months to N and years
+    to 12 * N ("a"/"an" counts as 1); matching is case-insensitive and
+    anything else becomes NaN. ``review_time`` has only a few dozen distinct
+    values, so the phrases are parsed once per unique value with
+    ``str.extract``/``np.select`` and broadcast back through the factorized
+    codes.
+    """
+    codes, uniques = pd.factorize(review_time)
+    text = pd.Series(uniques, dtype=object).astype(str).str.lower()
+    num = text.str.extract(r'(\d+)', expand=False).astype(float).fillna(1.0)
+    conditions = [
+        text.str.contains('day', regex=False),
+        text.str.contains('week', regex=False),
+        text.str.contains('month', regex=False),
+        text.str.contains('year', regex=False),
+        text.str.contains(r'hour|minute', regex=True),
+    ]
+    choices = [RECENT_MONTHS, WEEK_MONTHS, num, num * 12, RECENT_MONTHS]
+    months = np.append(np.select(conditions, choices, default=np.nan), np.nan)
+    # code -1 (missing value) picks the trailing NaN
+    return pd.Series(months[codes], index=review_time.index, name='months_ago')
+
+
+def clean_mcdonalds(df: pd.DataFrame, required: Iterable[str] = REQUIRED_COLUMNS) -> pd.DataFrame:
+    """Clean the raw McDonald_s_Reviews sheet.
+
+    Adds numeric ``rating``/``rating_count``, ``sentiment`` (1 for 4-5
+    stars, -1 for 1-2, else 0), ``sentiment_label`` and ``months_ago``,
+    then drops rows missing any ``required`` column.
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    df['rating'] = as_text(df['rating']).str.extract(r'(\d)', expand=False).astype(float)
+    df['rating_count'] = pd.to_numeric(as_text(df['rating_count']).str.replace(',', '', regex=False),
+                                       errors='coerce')
+    df['sentiment'] = np.select([df['rating'] >= 4, df['rating'] <= 2], [1, -1], 0).astype(np.int8)
+    df['sentiment_label'] = sentiment_labels(df['sentiment'])
+    df['months_ago'] = parse_review_time(df['review_time'])
+    for col in ('store_address', 'store_name', 'category'):
+        if col in df.columns:
+            df[col] = to_category(df[col])
+    df = downcast_numeric(df, ['reviewer_id', 'latitude', 'longitude', 'rating', 'rating_count', 'months_ago'])
+    return drop_incomplete(df, required)
@@ -0,0 +1,29 @@
+"""Movies dataset cleaning."""
+
+from typing import Iterable
+
+import pandas as pd
+
+from pipelines.common import as_text, downcast_numeric, drop_incomplete, sentiment_labels, to_category
+
+REQUIRED_COLUMNS = ['rating', 'votes', 'duration_min', 'year_clean', 'sentiment_score',
+                    'sentiment_label', 'genre_main', 'certificate']
+
+
+def clean_movies(df: pd.DataFrame, required: Iterable[str] = REQUIRED_COLUMNS) -> pd.DataFrame:
+    """Clean the raw n_movies sheet.
+
+    Adds ``year_clean`` (first 4-digit year), ``duration_min``, ``genre_main``
+    (first listed genre) and ``sentiment_label``, then drops rows missing
+    any ``required`` column.
+    """
+    df = df.copy()
+    df['year_clean'] = as_text(df['year']).str.extract(r'(\d{4})', expand=False).astype(float)
+    df['duration_min'] = as_text(df['duration']).str.extract(r'(\d+)', expand=False).astype(float)
+    genre_main = as_text(df['genre']).str.split(',', n=1).str[0].str.strip()
+    df['genre_main'] = to_category(genre_main.where(genre_main != ''))
+    df['certificate'] = to_category(df['certificate'])
+    df['sentiment_label'] = sentiment_labels(df['sentiment'])
+    df = downcast_numeric(df, ['rating', 'votes', 'sentiment', 'sentiment_percentage', 'sentiment_score',
+                               'year_clean', 'duration_min'])
+    return drop_incomplete(df, required)
@@ -0,0 +1,26 @@
+"""Twitter dataset cleaning."""
+
+from typing import Iterable
+
+import pandas as pd
+
+from pipelines.common import downcast_numeric, drop_incomplete, sentiment_labels
+
+REQUIRED_COLUMNS = ['Timestamp', 'sentiment', 'Likes', 'Retweets', 'Username',
+                    'sentiment_score', 'Text', 'Hour', 'Sentiment_Label']
+
+
+def clean_twitter(df: pd.DataFrame, required: Iterable[str] = REQUIRED_COLUMNS) -> pd.DataFrame:
+    """Clean the raw twitter_dataset sheet.
+
+    Parses ``Timestamp`` (unparseable rows are dropped), adds ``Hour`` and
+    ``Sentiment_Label``, then drops rows missing any ``required`` column.
+    """
+    df = df.copy()
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    df = df.dropna(subset=['Timestamp'])
+    df['Hour'] = df['Timestamp'].dt.hour.astype('int8')
+    df['Sentiment_Label'] = sentiment_labels(df['sentiment'])
+    df = downcast_numeric(df, ['Tweet_ID', 'Retweets', 'Likes', 'sentiment',
+                               'sentiment_percentage', 'sentiment_score'])
+    return drop_incomplete(df, required)
@@ -0,0 +1,171 @@
+"""Per-stage timing and memory instrumentation for the data pipelines.
+
+A *run* covers one pipeline execution (a dataset load, a standalone
+dashboard's startup). Inside it, ``lap(name)`` closes a stage: it records
+the wall time, RSS change and - with ``DASHBOARD_TRACEMALLOC=1`` - the
+change in Python allocations since the previous lap. Code outside a run
+can call ``lap`` freely; it is a no-op there, so shared helpers (e.g. the
+figure builders, which lap once per figure) cost nothing when a filter
+callback re-draws figures.
+
+Finished runs are kept in memory for the ``/debug/timings`` route and
+appended as JSON lines to ``TIMINGS_LOG``, so timings of successive data
+refreshes can be compared stage by stage.
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from flask import jsonify, request
+
+from data_cache import CACHE_DIR
+
+TIMINGS_LOG = os.environ.get('DASHBOARD_TIMINGS_LOG', os.path.join(CACHE_DIR, 'timings.jsonl'))
+KEEP_RUNS = int(os.environ.get('DASHBOARD_KEEP_RUNS', 100))
+ROUTE = '/debug/timings'
+
+if os.environ.get('DASHBOARD_TRACEMALLOC') == '1' and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+_runs = deque(maxlen=KEEP_RUNS)
+_runs_lock = threading.Lock()
+_local = threading.local()
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _mb(delta):
+    return None if delta is None else round(delta / 2 ** 20, 2)
+
+
+class Run:
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.pid = os.getpid()
+        self.stages = []
+        self.error = None
+        self._t0 = self._mark_time = time.perf_counter()
+        self._mark_rss = rss_bytes()
+        self._mark_alloc = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self.seconds = None
+
+    def lap(self, stage):
+        now, rss = time.perf_counter(), rss_bytes()
+        alloc = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self.stages.append({
+            'stage': stage,
+            'seconds': round(now - self._mark_time, 4),
+            'rss_delta_mb': _mb(None if rss is None or self._mark_rss is None else rss - self._mark_rss),
+            'alloc_delta_mb': _mb(None if alloc is None or self._mark_alloc is None else alloc - self._mark_alloc),
+        })
+        self._mark_time, self._mark_rss, self._mark_alloc = now, rss, alloc
+
+    def finish(self):
+        self.seconds = round(time.perf_counter() - self._t0, 4)
+
+    def as_dict(self):
+        return {'name': self.name, 'started': self.started, 'pid': self.pid, 'seconds': self.seconds,
+                'rss_mb': _mb(rss_bytes()), 'error': self.error, 'stages': self.stages}
+
+
+def current():
+    return getattr(_local, 'run', None)
+
+
+def start_run(name):
+    """Start a run in this thread (for linear scripts; see also ``run``)."""
+    _local.run = Run(name)
+    return _local.run
+
+
+def finish_run(record_it=True):
+    """Finish this thread's run and return it as a dict (recorded unless ``record_it=False``)."""
+    active = current()
+    if active is None:
+        return None
+    _local.run = None
+    active.finish()
+    report = active.as_dict()
+    if record_it:
+        record(report)
+    return report
+
+
+@contextmanager
+def run(name, record_it=True):
+    """``with run('mcd') as r: ...`` - a run around a block; ``r.as_dict()`` afterwards."""
+    previous = current()
+    active = start_run(name)
+    try:
+        yield active
+    finally:
+        _local.run = active
+        finish_run(record_it)
+        _local.run = previous
+
+
+def lap(stage):
+    active = current()
+    if active is not None:
+        active.lap(stage)
+
+
+def fail(error):
+    """Record ``error`` on the current run and print its traceback (call from an except block)."""
+    traceback.print_exc()
+    active = current()
+    if active is not None:
+        active.error = f'{type(error).__name__}: {error}'
+        active.lap('failed')
+
+
+def record(report):
+    """Keep a finished run for the route, append it to the log and print a summary."""
+    with _runs_lock:
+        _runs.append(report)
+    try:
+        os.makedirs(os.path.dirname(TIMINGS_LOG) or '.', exist_ok=True)
+        with open(TIMINGS_LOG, 'a') as fh:
+            fh.write(json.dumps(report) + '\n')
+    except OSError as e:
+        print(f"Could not write {TIMINGS_LOG}: {e}")
+    slowest = max(report['stages'], key=lambda s: s['seconds'], default=None)
+    summary = f", slowest: {slowest['stage']} {slowest['seconds']:.2f}s" if slowest else ''
+    status = f" FAILED ({report['error']})" if report['error'] else ''
+    print(f"[timings] {report['name']}: {report['seconds']:.2f}s{summary}{status}")
+
+
+def runs(name=None):
+    """Recorded runs, newest first, optionally only those called ``name``."""
+    with _runs_lock:
+        items = list(_runs)
+    return [r for r in reversed(items) if name is None or r['name'] == name]
+
+
+def serve_timings():
+    return jsonify(runs(request.args.get('name')))
+
+
+def register_routes(server):
+    """Attach ``/debug/timings`` to a Flask app (``dash_app.server``)."""
+    server.add_url_rule(ROUTE, 'debug_timings', serve_timings)
@@ -0,0 +1,194 @@
+"""Batch text sentiment scoring with a per-text result cache.
+
+The dashboards read the sentiment columns of the workbooks. A Twitter
+export or feed without them gets them from the text:
+``add_text_sentiment(df, text_column, name)`` scores ``text_column``
+(TextBlob polarity, -1 to 1) and fills in whichever of ``sentiment_score``,
+``sentiment`` (its sign) and ``sentiment_percentage`` are missing.
+
+Scores are cached by a 64-bit hash of the text in
+``<CACHE_DIR>/sentiment-<name>.npz``, so re-ingesting a refreshed workbook
+only scores rows whose text is new or changed. A ``TextScorer`` loads that
+cache once and writes it once, e.g. around a streamed workbook. Texts still
+to be scored are split into batches of ``BATCH_SIZE`` and scored across
+``SCORE_WORKERS`` processes (in-process for small jobs, single-core
+machines, or when already running inside a worker process).
+
+Requires ``textblob``; without it frames are returned unchanged.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR
+
+try:
+    import textblob
+    from textblob import TextBlob
+    HAVE_TEXTBLOB = True
+except ImportError:
+    HAVE_TEXTBLOB = False
+
+SCORE_WORKERS = int(os.environ.get('DASHBOARD_SCORE_WORKERS', os.cpu_count() or 1))
+MP_CONTEXT = os.environ.get('DASHBOARD_MP_CONTEXT', 'spawn')
+BATCH_SIZE = 2_000
+MIN_POOL_TEXTS = 5_000  # below this, starting the workers costs more than it saves
+SCORE_COLUMN = 'text_polarity'
+DERIVED_COLUMNS = ('sentiment_score', 'sentiment', 'sentiment_percentage')
+# Part of the cache file identity, so scores from another scorer version are not reused
+SCORER_ID = f'textblob-{textblob.__version__}' if HAVE_TEXTBLOB else ''
+
+
+def polarity(text):
+    return TextBlob(text).sentiment.polarity
+
+
+def _score_batch(texts, scorer):
+    return np.array([scorer(t) for t in texts], dtype=np.float32)
+
+
+def score_texts(texts, scorer=polarity, workers=None, batch_size=BATCH_SIZE):
+    """Scores of a list of texts, in order, across a process pool when it pays off."""
+    workers = SCORE_WORKERS if workers is None else workers
+    if multiprocessing.parent_process() is not None:
+        workers = 1  # e.g. a warm-up worker: its siblings already use the other cores
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if workers <= 1 or len(texts) < MIN_POOL_TEXTS:
+        parts = [_score_batch(batch, scorer) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                                 mp_context=multiprocessing.get_context(MP_CONTEXT)) as pool:
+            parts = list(pool.map(partial(_score_batch, scorer=scorer), batches))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.float32)
+
+
+def text_hashes(texts):
+    return pd.util.hash_pandas_object(texts, index=False).to_numpy()
+
+
+class ScoreCache:
+    """Scores keyed by text hash, kept as two sorted arrays."""
+
+    def __init__(self, keys=None, scores=None):
+        self.keys = keys if keys is not None else np.empty(0, dtype=np.uint64)
+        self.scores = scores if scores is not None else np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, hashes):
+        """(scores, found) for ``hashes``; ``scores`` is NaN where not found."""
+        pos = np.searchsorted(self.keys, hashes)
+        pos_ok = np.minimum(pos, max(len(self.keys) - 1, 0))
+        found = (pos < len(self.keys)) & (self.keys[pos_ok] == hashes) if len(self.keys) else \
+            np.zeros(len(hashes), dtype=bool)
+        scores = np.full(len(hashes), np.nan, dtype=np.float32)
+        scores[found] = self.scores[pos_ok[found]]
+        return scores, found
+
+    def add(self, hashes, scores):
+        keys, first = np.unique(np.concatenate([self.keys, hashes]), return_index=True)
+        self.scores = np.concatenate([self.scores, scores])[first]
+        self.keys = keys
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fh:
+            np.savez(fh, keys=self.keys, scores=self.scores)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as data:
+                return cls(data['keys'], data['scores'])
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+
+def cache_path(name, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, f'sentiment-{name}.{SCORER_ID}.npz')
+
+
+class TextScorer:
+    """Scores texts against the cache of ``name``, writing new scores back only on ``save``.
+
+    The cache is loaded on first use. As a context manager it saves on
+    exit, so a stream of chunks reads and writes the cache file once.
+    """
+
+    def __init__(self, name, scorer=polarity, cache_dir=None):
+        self.name = name
+        self.scorer = scorer
+        self.path = cache_path(name, cache_dir)
+        self._cache = None
+        self._dirty = False
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = ScoreCache.load(self.path)
+        return self._cache
+
+    def __call__(self, texts):
+        """Polarity of every text in ``texts`` (a Series), scoring only texts not cached yet."""
+        texts = texts.fillna('').astype(str)
+        hashes = text_hashes(texts)
+        scores, found = self.cache.lookup(hashes)
+        if not found.all():
+            missing_hashes, first = np.unique(hashes[~found], return_index=True)
+            missing_texts = texts.to_numpy()[~found][first].tolist()
+            new_scores = score_texts(missing_texts, self.scorer)
+            print(f"Scored {len(missing_texts)} new texts for {self.name} ({len(self.cache)} cached)")
+            self.cache.add(missing_hashes, new_scores)
+            self._dirty = True
+            scores, _ = self.cache.lookup(hashes)
+        return pd.Series(scores, index=texts.index, name=SCORE_COLUMN)
+
+    def save(self):
+        if self._dirty:
+            self.cache.save(self.path)
+            self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+
+def cached_scores(texts, name, scorer=polarity, cache_dir=None):
+    """Polarity of every text in ``texts`` (a Series), scoring only texts not cached under ``name``."""
+    text_scorer = TextScorer(name, scorer, cache_dir)
+    scores = text_scorer(texts)
+    text_scorer.save()
+    return scores
+
+
+def add_text_sentiment(df, text_column, name, scorer=None):
+    """``df`` with the ``DERIVED_COLUMNS`` it lacks filled in from ``text_column`` (else unchanged).
+
+    ``scorer`` is a ``TextScorer`` to use (and save) instead of ``name``'s cache, e.g. across chunks.
+    """
+    needed = any(c not in df.columns for c in DERIVED_COLUMNS)
+    if not HAVE_TEXTBLOB or not needed or text_column not in df.columns or df.empty:
+        return df
+    if scorer is None:
+        with TextScorer(name) as own:
+            scores = own(df[text_column])
+    else:
+        scores = scorer(df[text_column])
+    df = df.copy()
+    if 'sentiment_score' not in df.columns:
+        df['sentiment_score'] = scores.astype(float)
+    if 'sentiment' not in df.columns:
+        df['sentiment'] = np.sign(df['sentiment_score']).astype(np.int8)
+    if 'sentiment_percentage' not in df.columns:
+        df['sentiment_percentage'] = df['sentiment_score'] * 100
+    return df
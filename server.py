@@ -0,0 +1,55 @@
+"""WSGI entry point for the combined dashboard.
+
+    gunicorn -c gunicorn.conf.py server:server
+
+With ``preload_app`` (see gunicorn.conf.py) this module is imported once in
+the gunicorn master: every dataset is read from the Arrow cache, cleaned,
+aggregated and its figures serialized there, and the workers are forked
+afterwards, so they share those pages copy-on-write instead of each
+building its own copy. ``gc.freeze()`` then moves the preloaded objects out
+of the garbage collector's reach; otherwise a worker's first collection
+would write to (and so copy) every one of them.
+
+Set ``DASHBOARD_PRELOAD=0`` to load datasets lazily in each worker instead.
+When a workbook changes, the master's watcher rebuilds the dataset there and
+then replaces the workers gracefully (see gunicorn.conf.py).
+"""
+
+import gc
+import os
+
+import datasets
+import figure_store
+from combined_dashboard import server
+from datasets import DATASETS, warm_up
+
+__all__ = ['server']  # the WSGI callable gunicorn loads (``server:server``)
+
+PRELOAD = os.environ.get('DASHBOARD_PRELOAD', '1') == '1'
+
+
+def publish(keys=None):
+    """Serialize the figures of the loaded datasets among ``keys`` (default all) and refreeze the heap.
+
+    Also called by the master's watcher after a reload, before the workers are replaced
+    (gunicorn.conf.py), so the new workers share the rebuilt datasets too.
+    """
+    for key in keys or DATASETS:
+        dataset = DATASETS[key]
+        if dataset.loaded:
+            result = dataset.get()
+            if result.figs:
+                figure_store.publish(key, result.version, result.figs)
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def preload():
+    datasets.START_THREADS = False  # followers start in the forked workers (gunicorn.conf.py: post_fork)
+    warm_up(background=False)
+    publish()
+
+
+if PRELOAD:
+    preload()
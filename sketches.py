@@ -0,0 +1,190 @@
+"""Mergeable summaries for high-cardinality columns (e.g. Twitter usernames).
+
+An exact top-N needs one counter per distinct value. With
+``DASHBOARD_SKETCHES=1`` the Twitter views keep fixed-size summaries
+instead, built in one pass over chunks or feed batches:
+
+* ``TopK`` - Misra-Gries heavy hitters with ``capacity`` counters; every
+  count is an underestimate by at most ``error``, which never exceeds
+  ``n / (capacity + 1)`` for ``n`` values seen (``DASHBOARD_TOPK_ERROR``,
+  as a fraction of ``n``, sets the capacity);
+* ``HyperLogLog`` - distinct counts with a relative standard error of
+  ``1.04 / sqrt(2 ** precision)`` (``DASHBOARD_HLL_ERROR`` picks the
+  precision);
+* ``GroupedSketch`` - one of each per group (e.g. per sentiment label), so
+  a filter on the group merges the selected summaries.
+
+All three ``merge`` with a summary of other rows (another chunk or worker)
+with the same guarantees as summarizing the rows together.
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+SKETCHES = os.environ.get('DASHBOARD_SKETCHES', '0') == '1'
+TOPK_ERROR = float(os.environ.get('DASHBOARD_TOPK_ERROR', 0.001))
+HLL_ERROR = float(os.environ.get('DASHBOARD_HLL_ERROR', 0.01))
+
+
+def value_counts(values):
+    """Counts of the non-null values of a Series, indexed by plain (non-categorical) values."""
+    counts = values.value_counts(sort=False)
+    counts = counts[counts > 0]  # a categorical lists unobserved categories too
+    if isinstance(counts.index, pd.CategoricalIndex):
+        counts.index = counts.index.astype(object)
+    return counts.astype('int64')
+
+
+class TopK:
+    """Misra-Gries summary: at most ``capacity`` (value, count) pairs.
+
+    Counters are updated a batch at a time: batch counts are added, and when
+    more than ``capacity`` values are held the (capacity + 1)-th largest
+    count is subtracted from all of them and the values left at zero or
+    below are dropped. ``error`` sums those subtractions, so a value's true
+    count lies in ``[count, count + error]``, and any value seen more than
+    ``error`` times is kept.
+    """
+
+    def __init__(self, capacity=None, error=None):
+        self.capacity = capacity or math.ceil(1 / (error or TOPK_ERROR))
+        self.counts = pd.Series(dtype='int64')
+        self.n = 0
+        self.error = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _absorb(self, counts, n, error=0):
+        merged = self.counts.add(counts, fill_value=0).astype('int64') if len(self.counts) else counts
+        self.error += error
+        if len(merged) > self.capacity:
+            kth = int(merged.nlargest(self.capacity + 1).iloc[-1])
+            merged = merged[merged > kth] - kth
+            self.error += kth
+        self.counts = merged
+        self.n += n
+
+    def update(self, values):
+        """Count the values of a Series (one batch of the stream)."""
+        counts = value_counts(values)
+        self._absorb(counts, int(counts.sum()))
+        return self
+
+    def merge(self, other):
+        out = TopK(max(self.capacity, other.capacity))
+        out._absorb(self.counts, self.n, self.error)
+        out._absorb(other.counts, other.n, other.error)
+        return out
+
+    def top(self, k=10, name='value'):
+        """The ``k`` largest counters as a ``name``/``count``/``error`` frame."""
+        top = self.counts.nlargest(k)
+        return pd.DataFrame({name: top.index, 'count': top.to_numpy(), 'error': self.error})
+
+
+class HyperLogLog:
+    """Distinct-count estimate from ``2 ** precision`` 6-bit registers (one byte each here)."""
+
+    def __init__(self, precision=None, error=None):
+        if precision is None:
+            precision = math.ceil(math.log2((1.04 / (error or HLL_ERROR)) ** 2))
+        self.precision = min(max(precision, 4), 18)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values):
+        """Add the non-null values of a Series."""
+        values = values.dropna()
+        if values.empty:
+            return self
+        p = self.precision
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        buckets = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # bit length of ``rest``; frexp of the float may round up across a power of two
+        _, bits = np.frexp(rest.astype(np.float64))
+        bits = bits.astype(np.int64)
+        over = (rest > 0) & ((rest >> np.maximum(bits - 1, 0).astype(np.uint64)) == 0)
+        bits -= over
+        rank = (64 - p - bits + 1).astype(np.uint8)  # position of the first set bit
+        np.maximum.at(self.registers, buckets, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge HyperLogLog sketches of different precision')
+        out = HyperLogLog(self.precision)
+        out.registers = np.maximum(self.registers, other.registers)
+        return out
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small cardinalities
+        return float(raw)
+
+
+class GroupedSketch:
+    """A ``TopK`` and a ``HyperLogLog`` of one column per value of a group column."""
+
+    def __init__(self, topk_error=None, hll_error=None):
+        self.topk_error = topk_error
+        self.hll_error = hll_error
+        self.groups = {}
+
+    def _sketches(self, group):
+        if group not in self.groups:
+            self.groups[group] = (TopK(error=self.topk_error), HyperLogLog(error=self.hll_error))
+        return self.groups[group]
+
+    def update(self, values, groups):
+        """Add ``values`` (a Series) split by the aligned Series ``groups``."""
+        for group, part in values.groupby(groups, observed=True, sort=False):
+            top, distinct = self._sketches(group)
+            top.update(part)
+            distinct.update(part)
+        return self
+
+    def merge(self, other):
+        out = GroupedSketch(self.topk_error, self.hll_error)
+        for group in self.groups.keys() | other.groups.keys():
+            ours, theirs = self.groups.get(group), other.groups.get(group)
+            if ours is None or theirs is None:
+                out.groups[group] = ours or theirs
+            else:
+                out.groups[group] = (ours[0].merge(theirs[0]), ours[1].merge(theirs[1]))
+        return out
+
+    def _selected(self, groups):
+        if not groups:
+            return list(self.groups.values())
+        return [self.groups[g] for g in groups if g in self.groups]
+
+    def top(self, k=10, groups=None, name='value'):
+        """Top ``k`` values over the selected ``groups`` (all when empty)."""
+        selected = self._selected(groups)
+        if not selected:
+            return pd.DataFrame({name: [], 'count': [], 'error': []})
+        top = selected[0][0]
+        for other, _ in selected[1:]:
+            top = top.merge(other)
+        return top.top(k, name)
+
+    def distinct(self, groups=None):
+        """Estimated number of distinct values over the selected ``groups``."""
+        selected = self._selected(groups)
+        if not selected:
+            return 0.0
+        distinct = selected[0][1]
+        for _, other in selected[1:]:
+            distinct = distinct.merge(other)
+        return distinct.estimate()
@@ -0,0 +1,153 @@
+"""Grid index over point coordinates (the McDonald's stores).
+
+``GridIndex`` buckets points into ``CELL_DEG`` x ``CELL_DEG`` degree cells
+and keeps them sorted by cell key (column-major), so the points of one
+column of cells are a contiguous slice found by binary search. A bounding
+box query touches one slice per column it spans plus the points it
+returns, and a radius query is a bounding box query refined with the
+haversine distance, so latency follows the size of the answer rather than
+the number of points. ``cluster_points`` merges points on a coarser grid
+for zoomed-out map views.
+
+``register_routes`` serves ``/api/stores/nearby?lat=..&lon=..&km=..`` (or
+``&k=..`` for the k nearest) from an index.
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from flask import abort, jsonify, request
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+CELL_DEG = float(os.environ.get('DASHBOARD_GRID_CELL_DEG', 0.25))
+ROUTE = '/api/stores/nearby'
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Bounding box, radius and nearest-neighbour queries over ``points``.
+
+    ``points`` is a frame with ``lon``/``lat`` columns (plus anything else
+    to carry along, e.g. per-store aggregates); queries return rows of it.
+    """
+
+    def __init__(self, points, lon='longitude', lat='latitude', cell_deg=None):
+        self.points = points.reset_index(drop=True)
+        self.cell_deg = cell_deg or CELL_DEG
+        self.lon = self.points[lon].to_numpy(dtype=float)
+        self.lat = self.points[lat].to_numpy(dtype=float)
+        if len(self.points):
+            self.extent = (self.lon.min(), self.lon.max(), self.lat.min(), self.lat.max())
+        else:
+            self.extent = (0.0, 0.0, 0.0, 0.0)
+        self.n_cols = self._cell(self.extent[1], self.extent[0]) + 1
+        self.n_rows = self._cell(self.extent[3], self.extent[2]) + 1
+        keys = self._cell(self.lon, self.extent[0]) * self.n_rows + self._cell(self.lat, self.extent[2])
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, value, origin):
+        return np.floor_divide(np.subtract(value, origin), self.cell_deg).astype(np.int64)
+
+    def in_bbox(self, lon0, lon1, lat0, lat1):
+        """Positions (into ``points``) of the points inside the box, in ascending order."""
+        lon0, lon1 = sorted((lon0, lon1))
+        lat0, lat1 = sorted((lat0, lat1))
+        if not len(self.points) or lon1 < self.extent[0] or lon0 > self.extent[1] \
+                or lat1 < self.extent[2] or lat0 > self.extent[3]:
+            return np.empty(0, dtype=np.int64)
+        c0, c1 = (int(np.clip(self._cell(v, self.extent[0]), 0, self.n_cols - 1)) for v in (lon0, lon1))
+        r0, r1 = (int(np.clip(self._cell(v, self.extent[2]), 0, self.n_rows - 1)) for v in (lat0, lat1))
+        if c1 - c0 + 1 >= len(self.points):
+            candidates = np.arange(len(self.points))  # box wider than the data: one vectorized pass
+        else:
+            lo = np.searchsorted(self.keys, np.arange(c0, c1 + 1) * self.n_rows + r0, 'left')
+            hi = np.searchsorted(self.keys, np.arange(c0, c1 + 1) * self.n_rows + r1, 'right')
+            candidates = np.concatenate([self.order[a:b] for a, b in zip(lo, hi)])
+        inside = ((self.lon[candidates] >= lon0) & (self.lon[candidates] <= lon1)
+                  & (self.lat[candidates] >= lat0) & (self.lat[candidates] <= lat1))
+        return np.sort(candidates[inside])
+
+    def within_km(self, lon, lat, km):
+        """Points within ``km`` of (lon, lat), nearest first, with a ``distance_km`` column."""
+        # Exact bounding box of a spherical cap; the widest longitude is reached poleward of lat
+        r = km / EARTH_RADIUS_KM
+        dlat = math.degrees(r)
+        cos_lat = math.cos(math.radians(lat))
+        if abs(lat) + dlat >= 90 or math.sin(r) >= cos_lat:
+            dlon = 180.0
+        else:
+            dlon = math.degrees(math.asin(math.sin(r) / cos_lat))
+        lat0, lat1 = lat - dlat, lat + dlat
+        if dlon >= 180:
+            candidates = self.in_bbox(-180, 180, lat0, lat1)
+        else:
+            # a box crossing the antimeridian is queried as its two halves
+            lon0 = (lon - dlon + 180) % 360 - 180
+            lon1 = lon0 + 2 * dlon
+            candidates = self.in_bbox(lon0, min(lon1, 180), lat0, lat1)
+            if lon1 > 180:
+                candidates = np.concatenate([candidates, self.in_bbox(-180, lon1 - 360, lat0, lat1)])
+        distance = haversine_km(lon, lat, self.lon[candidates], self.lat[candidates])
+        keep = distance <= km
+        out = self.points.iloc[candidates[keep]].assign(distance_km=distance[keep])
+        return out.sort_values('distance_km', kind='stable')
+
+    def nearest(self, lon, lat, k=1):
+        """The ``k`` points nearest to (lon, lat), searching outwards ring by ring."""
+        if not len(self.points):
+            return self.points.assign(distance_km=pd.Series(dtype=float))
+        km = self.cell_deg * KM_PER_DEG_LAT
+        while True:
+            found = self.within_km(lon, lat, km)
+            if len(found) >= min(k, len(self.points)) or km > math.pi * EARTH_RADIUS_KM:
+                return found.head(k)
+            km *= 2
+
+
+def cluster_points(points, bbox, grid, weight='review_count', means=('rating',), label='store_address'):
+    """Merge ``points`` on a ``grid`` x ``grid`` raster of ``bbox`` (lon0, lon1, lat0, lat1).
+
+    Each cluster sits at the ``weight``-weighted centroid of its points, sums
+    ``weight``, averages ``means`` weighted by it and is labelled "N stores".
+    """
+    lon0, lon1, lat0, lat1 = bbox
+    w = points[weight].to_numpy(dtype=float)
+    cx = np.clip(((points['longitude'] - lon0) / max(lon1 - lon0, 1e-9) * grid).astype(int), 0, grid - 1)
+    cy = np.clip(((points['latitude'] - lat0) / max(lat1 - lat0, 1e-9) * grid).astype(int), 0, grid - 1)
+    weighted = pd.DataFrame({'cell': cx * grid + cy, 'n': 1, weight: w,
+                             **{c: points[c].to_numpy(dtype=float) * w for c in ('longitude', 'latitude', *means)}})
+    out = weighted.groupby('cell').sum()
+    for c in ('longitude', 'latitude', *means):
+        out[c] = out[c] / out[weight].where(out[weight] > 0)
+    out[label] = out['n'].map(lambda n: f'{n} stores')
+    return out.reset_index(drop=True)
+
+
+def register_routes(server, get_index):
+    """Serve radius and nearest-store queries; ``get_index()`` returns the current GridIndex (or None)."""
+    def nearby():
+        try:
+            lat, lon = float(request.args['lat']), float(request.args['lon'])
+            km = float(request.args.get('km', 10))
+            k = int(request.args['k']) if 'k' in request.args else None
+        except (KeyError, ValueError):
+            abort(400)
+        index = get_index()
+        if index is None:
+            abort(404)
+        found = index.nearest(lon, lat, k) if k else index.within_km(lon, lat, km)
+        return jsonify(found.to_dict(orient='records'))
+
+    server.add_url_rule(ROUTE, 'stores_nearby', nearby)
@@ -0,0 +1,101 @@
+"""Streaming ingestion for workbooks too large to load at once.
+
+``pd.read_excel`` materializes the whole sheet and cleaning makes further
+full-frame copies. In streaming mode a workbook is read ``CHUNK_ROWS``
+rows at a time - openpyxl in ``read_only`` mode for .xlsx, ``chunksize``
+for .csv - and each chunk is cleaned, rolled up into a ``GroupCube`` and
+tokenized for the word cloud before the next one is read. Partial cubes
+and token counts are merged as they arrive, so peak memory follows the
+chunk size and the size of the aggregates, not the size of the file.
+
+Loaders switch to streaming for files over ``STREAM_THRESHOLD_MB``;
+``DASHBOARD_STREAMING=1`` forces it and ``=0`` disables it.
+"""
+
+import os
+from collections import Counter
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from token_index import TokenIndex, count_tokens
+
+CHUNK_ROWS = int(os.environ.get('DASHBOARD_CHUNK_ROWS', 50_000))
+STREAM_THRESHOLD_MB = float(os.environ.get('DASHBOARD_STREAM_THRESHOLD_MB', 200))
+STREAMING = os.environ.get('DASHBOARD_STREAMING', 'auto')  # 'auto', '1' or '0'
+
+
+def should_stream(path):
+    if STREAMING in ('0', '1'):
+        return STREAMING == '1'
+    try:
+        return os.path.getsize(path) > STREAM_THRESHOLD_MB * 1024 * 1024
+    except OSError:
+        return False
+
+
+def iter_excel_chunks(path, chunk_rows=None, sheet=None):
+    """DataFrames of up to ``chunk_rows`` rows from the first (or ``sheet``) worksheet."""
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f'Unnamed: {i}' for i, c in enumerate(header)]
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue  # pd.read_excel skips blank rows too
+            batch.append(row[:len(columns)])
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        wb.close()
+
+
+def iter_csv_chunks(path, chunk_rows=None):
+    yield from pd.read_csv(path, chunksize=chunk_rows or CHUNK_ROWS)
+
+
+def iter_chunks(path, chunk_rows=None):
+    if path.lower().endswith('.csv'):
+        return iter_csv_chunks(path, chunk_rows)
+    return iter_excel_chunks(path, chunk_rows)
+
+
+def stream_aggregate(path, clean, build, finish=None, text_column=None, chunk_rows=None):
+    """Clean and aggregate ``path`` chunk by chunk.
+
+    ``clean`` and ``build`` are a dataset's cleaning function and cube
+    builder (which must produce mergeable cubes, e.g. fixed-grid bins, and
+    take a ``backend``); ``finish`` post-processes the merged cube. Chunk
+    cubes are merged in memory and only the result goes to the default
+    query backend (see backends.py). Returns ``(cube, tokens)``
+    where ``tokens`` is a TokenIndex over ``text_column`` (empty without
+    one); ``cube`` is None when no row survived cleaning.
+    """
+    cube = None
+    tokens = Counter()
+    n_rows = n_chunks = 0
+    for chunk in iter_chunks(path, chunk_rows):
+        df = clean(chunk)
+        n_chunks += 1
+        if df.empty:
+            continue
+        part = build(df, backend='pandas')
+        cube = part if cube is None else cube.merge(part)
+        if text_column:
+            tokens.update(count_tokens(df[text_column]))
+        n_rows += len(df)
+    print(f"Streamed {path}: {n_rows} rows in {n_chunks} chunks")
+    if cube is not None and finish is not None:
+        cube = finish(cube)
+    if cube is not None:
+        cube = cube.to_backend()
+    return cube, TokenIndex(tokens, n_rows if text_column else 0)
@@ -0,0 +1,68 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backends
+from cube import GroupCube
+
+
+def frame(n=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'label': pd.Categorical(rng.choice(['neg', 'neu', 'pos', None], n)),
+        'store': rng.choice(['a', 'b', 'c'], n),
+        'day': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 30, n), unit='D'),
+        'likes': rng.integers(0, 100, n),
+        'score': rng.normal(size=n),
+    })
+
+
+def test_store_reuses_and_prunes_files(tmp_path):
+    engine = backends.DuckDBBackend(directory=str(tmp_path), keep_seconds=60)
+    old = engine.store(frame(10))
+    assert engine.store(frame(10)) == old  # content-addressed
+    new = engine.store(frame(10, seed=1))
+    stray = tmp_path / 'x.parquet.123.456.tmp'
+    stray.write_bytes(b'')
+    past = time.time() - 120
+    for path in (old, new, stray):
+        os.utime(path, (past, past))
+    engine.prune(keep={new})
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(new)]
+    pd.testing.assert_frame_equal(engine.load(new), frame(10, seed=1))
+
+
+def test_prune_keeps_recent_files(tmp_path):
+    engine = backends.DuckDBBackend(directory=str(tmp_path), keep_seconds=60)
+    path = engine.store(frame(10))
+    engine.prune(keep=set())
+    assert os.path.exists(path)  # another process may still be reading it
+
+
+def comparable(out, by):
+    out = out.sort_values(by).reset_index(drop=True) if by else out
+    return out.astype({c: object for c in by})
+
+
+@pytest.mark.parametrize('by, filters', [
+    ([], None),
+    (['label'], None),
+    (['store', 'label'], {'label': ['pos', 'neg'], 'store': 'b'}),
+    (['day'], {'day': ('2024-01-05', '2024-01-20')}),
+    (['label'], {'day': (None, '2024-01-10'), 'store': ['a', 'c']}),
+])
+def test_duckdb_matches_pandas(tmp_path, monkeypatch, by, filters):
+    pytest.importorskip('duckdb')
+    monkeypatch.setitem(backends._backends, 'duckdb', backends.DuckDBBackend(directory=str(tmp_path)))
+    df = frame()
+    cubes = {name: GroupCube.build(df, ['label', 'store', 'day'], ['likes', 'score'], backend=name)
+             for name in ('pandas', 'duckdb')}
+    expected = comparable(cubes['pandas'].query(by, filters), by)
+    actual = comparable(cubes['duckdb'].query(by, filters), by)
+    assert actual['count'].dtype == expected['count'].dtype == np.int64
+    assert actual['sum_likes'].dtype.kind == expected['sum_likes'].dtype.kind == 'i'
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_categorical=False)
+    assert cubes['duckdb'].values('store') == cubes['pandas'].values('store')
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import GroupCube
+from cube_figures import _coarsen_bins, _grid_bins
+
+
+def frame(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'label': pd.Categorical(rng.choice(['neg', 'neu', 'pos'], n)),
+        'day': rng.integers(0, 20, n),
+        'score': rng.normal(size=n),
+        'likes': rng.integers(0, 100, n).astype(float),
+    })
+
+
+def build(df):
+    df = df.assign(score_bin=_grid_bins(df['score'], 0.01))
+    return GroupCube.build(df, ['label', 'day'], ['likes'], extra_dims={'scores': ['score_bin']},
+                           attrs={'step': 0.01}, backend='pandas')
+
+
+def sorted_query(cube, **kwargs):
+    out = cube.query(**kwargs)
+    by = list(kwargs.get('by', ()))
+    if by:
+        out = out.sort_values(by).reset_index(drop=True)
+    out[by] = out[by].astype(object)
+    return out
+
+
+@pytest.mark.parametrize('query', [
+    {},
+    {'by': ['label']},
+    {'by': ['day'], 'filters': {'label': ['pos', 'neg'], 'day': (3, 12)}},
+    {'by': ['score_bin'], 'filters': {'day': (None, 5)}, 'rollup': 'scores'},
+])
+def test_merged_chunks_match_whole_frame(query):
+    df = frame()
+    merged = build(df.iloc[:700]).merge(build(df.iloc[700:1500])).merge(build(df.iloc[1500:]))
+    pd.testing.assert_frame_equal(sorted_query(merged, **query), sorted_query(build(df), **query),
+                                  check_dtype=False)
+
+
+def test_merge_combines_lookup_attrs():
+    a = GroupCube.build(frame(10), ['label'], ['likes'], attrs={'names': pd.DataFrame({'k': [1, 2], 'v': 'a'})})
+    b = GroupCube.build(frame(10, 1), ['label'], ['likes'], attrs={'names': pd.DataFrame({'k': [2, 3], 'v': 'b'})})
+    names = a.merge(b).attrs['names']
+    assert names['k'].tolist() == [1, 2, 3]
+    assert names['v'].tolist() == ['a', 'a', 'b']  # the first cube wins on duplicate keys
+
+
+def test_coarsen_bins_keeps_totals():
+    df = frame()
+    cube = build(df)
+    coarse = _coarsen_bins(cube, 'scores', 'score_bin', 'step', bins=30)
+    out = coarse.frame('scores')
+    assert out['score_bin'].nunique() <= 30
+    assert coarse.attrs['step'] == pytest.approx((df['score'].max() - df['score'].min() + 0.01) / 30, abs=0.01)
+    for by in (['label'], ['label', 'day']):
+        fine = cube.query(by=by, rollup='scores').sort_values(by).reset_index(drop=True)
+        pd.testing.assert_frame_equal(coarse.query(by=by, rollup='scores').sort_values(by).reset_index(drop=True),
+                                      fine, check_dtype=False)
+    # every row falls in the coarse bin around it
+    edges_lo = out['score_bin'].min() - coarse.attrs['step'] / 2
+    assert edges_lo <= df['score'].min()
+    pd.testing.assert_frame_equal(coarse.frame(), cube.frame())  # other rollups are untouched
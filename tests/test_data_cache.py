@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_cache
+from data_cache import cache_paths, read_excel_cached
+
+pytestmark = pytest.mark.skipif(not data_cache.HAVE_ARROW, reason='needs pyarrow')
+
+
+def write_workbook(path, **sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+
+def test_entries_keyed_by_path_and_read_arguments(tmp_path):
+    cache = str(tmp_path / 'cache')
+    for folder, value in (('a', 1), ('b', 2)):
+        os.makedirs(tmp_path / folder)
+        write_workbook(tmp_path / folder / 'data.xlsx', first=pd.DataFrame({'x': [value]}),
+                       second=pd.DataFrame({'x': [value * 10]}))
+    a, b = str(tmp_path / 'a' / 'data.xlsx'), str(tmp_path / 'b' / 'data.xlsx')
+    assert len({cache_paths(a, cache), cache_paths(b, cache),
+                cache_paths(a, cache, {'sheet_name': 'second'})}) == 3
+    for _ in range(2):  # convert, then read the entries back
+        assert read_excel_cached(a, cache)['x'].tolist() == [1]
+        assert read_excel_cached(b, cache)['x'].tolist() == [2]
+        assert read_excel_cached(a, cache, sheet_name='second')['x'].tolist() == [10]
+
+
+def test_no_entry_for_a_workbook_changed_while_read(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data.xlsx')
+    write_workbook(path, first=pd.DataFrame({'x': [1]}))
+    read_excel = pd.read_excel
+
+    def read_then_touch(*args, **kwargs):
+        df = read_excel(*args, **kwargs)
+        os.utime(path, ns=(0, 0))  # e.g. a copy finishing mid-read
+        return df
+
+    monkeypatch.setattr(data_cache.pd, 'read_excel', read_then_touch)
+    assert read_excel_cached(path, str(tmp_path / 'cache'))['x'].tolist() == [1]
+    data_path, meta_path = cache_paths(path, str(tmp_path / 'cache'))
+    assert not os.path.exists(data_path) and not os.path.exists(meta_path)
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube_figures import build_movies_cube, movies_filters
+from genre_index import GenreIndex
+
+GENRES = ['Action', 'Comedy', 'Drama', 'Horror', 'Romance', 'Sci-Fi']
+
+
+@pytest.fixture(scope='module')
+def movies():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    lists = [', '.join(rng.choice(GENRES, rng.integers(1, 4), replace=False)) for _ in range(n)]
+    lists[:3] = ['', None, 'Drama']  # titles without genres
+    rating = rng.uniform(1, 10, n).round(1)
+    rating[::50] = np.nan
+    return pd.DataFrame({'genre': lists, 'rating': rating, 'votes': rng.integers(0, 1_000, n),
+                         'certificate': rng.choice(['PG', 'R'], n)})
+
+
+@pytest.fixture(scope='module')
+def index(movies):
+    return GenreIndex.build(movies['genre'])
+
+
+@pytest.fixture(scope='module')
+def exploded(movies):
+    genre = movies['genre'].fillna('').str.split(',').explode().str.strip()
+    return movies.drop(columns='genre').join(genre).query("genre != ''")
+
+
+def test_genres_and_rows(movies, index, exploded):
+    assert index.genres.tolist() == GENRES
+    assert index.n_rows == len(movies)
+    for genre in GENRES:
+        assert index.rows_of(genre).tolist() == sorted(exploded.index[exploded['genre'] == genre])
+    assert len(index.rows_of('Western')) == 0
+
+
+def test_stats_match_explode(movies, index, exploded):
+    out = index.stats(movies, ['rating', 'votes']).set_index('genre')
+    grouped = exploded.groupby('genre')
+    assert out['count'].to_dict() == grouped.size().to_dict()
+    assert out['sum_votes'].to_numpy() == pytest.approx(grouped['votes'].sum().to_numpy())
+    assert out['mean_rating'].to_numpy() == pytest.approx(grouped['rating'].mean().to_numpy())
+
+
+def test_stats_with_mask(movies, index, exploded):
+    mask = index.mask(all_of=['Action', 'Comedy'])
+    both = movies['genre'].fillna('').map(lambda g: {'Action', 'Comedy'} <= {x.strip() for x in g.split(',')})
+    assert mask.tolist() == both.tolist()
+    out = index.stats(movies, ['rating'], mask=mask).set_index('genre')
+    expected = exploded[both.reindex(exploded.index)].groupby('genre')['rating'].mean()
+    assert out['mean_rating'].to_dict() == pytest.approx(expected.to_dict())
+    assert not index.mask(all_of=['Action', 'Western']).any()
+    any_of = index.mask(any_of=['Horror', 'Western'])
+    assert any_of.sum() == (exploded['genre'] == 'Horror').sum()
+
+
+def test_co_occurrence(movies, index, exploded):
+    matrix = index.co_occurrence()
+    counts = exploded.groupby('genre').size()
+    assert np.diag(matrix).tolist() == counts.tolist()
+    rows = set(exploded.index[exploded['genre'] == 'Drama']) & set(exploded.index[exploded['genre'] == 'Sci-Fi'])
+    assert matrix.loc['Drama', 'Sci-Fi'] == matrix.loc['Sci-Fi', 'Drama'] == len(rows)
+
+
+def test_rollup_matches_explode(movies, index, exploded):
+    out = index.rollup(movies, ['certificate'], ['votes', 'rating'])
+    out = out.astype({'genre': str}).set_index(['certificate', 'genre']).sort_index()
+    grouped = exploded.groupby(['certificate', 'genre'])
+    assert out['count'].tolist() == grouped.size().tolist()
+    assert out['sum_votes'].tolist() == pytest.approx(grouped['votes'].sum().tolist())
+    assert out['sum_rating'].tolist() == pytest.approx(grouped['rating'].sum().tolist())
+
+
+def test_quantiles_match_explode(movies, index, exploded):
+    qs = (0, 0.25, 0.5, 0.9, 1)
+    out = index.quantiles(movies['rating'], qs).set_index('genre')
+    expected = exploded.dropna(subset=['rating']).groupby('genre')['rating']
+    assert out['count'].to_dict() == expected.size().to_dict()
+    for q in qs:
+        assert out[q].to_numpy() == pytest.approx(expected.quantile(q).to_numpy())
+
+
+def test_spellings_of_a_list_share_a_combo():
+    index = GenreIndex.build(pd.Series(['Action,Comedy', 'Action, Comedy', ' Comedy ', None]))
+    assert index.labels.tolist() == ['Action, Comedy', 'Comedy', '']
+    assert index.combo_of_row.tolist() == [0, 0, 1, 2]
+    assert index.row_labels().tolist() == ['Action, Comedy', 'Action, Comedy', 'Comedy', '']
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'duckdb'])
+def test_cube_genre_filter_matches_mask(movies, index, backend):
+    if backend == 'duckdb':
+        pytest.importorskip('duckdb')
+    rated = movies['rating'].notna().to_numpy()
+    df = movies[rated].assign(sentiment_score=0.0, sentiment_label='Neutral', year_clean=2000.0)
+    cube = build_movies_cube(df, backend=backend)
+    selected = ['Horror', 'Romance']
+    filters = movies_filters(cube, {'genre': selected, 'certificate': ['R']})
+    kept = df[index.mask(any_of=selected)[rated] & (df['certificate'] == 'R').to_numpy()]
+    assert cube.query(filters=filters)['count'].iloc[0] == len(kept)
+    # the per-genre chart counts the same titles, once per listed genre
+    by_genre = cube.query(['genre'], filters, rollup='genres').astype({'genre': str}).set_index('genre')['count']
+    listed = kept['genre'].str.split(',').explode().str.strip().value_counts()
+    assert by_genre.sort_index().to_dict() == listed.sort_index().to_dict()
+    assert cube.query(filters=movies_filters(cube, {'genre': ['Western']}))['count'].iloc[0] == 0
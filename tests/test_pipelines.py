@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipelines import parse_review_time
+
+
+def legacy_parse_review_time(text):
+    # The per-row parser both dashboards used with Series.apply before parse_review_time
+    text = str(text).lower()
+    if 'day' in text: return 0.1
+    elif 'week' in text: return 0.5
+    elif 'month' in text:
+        num = ''.join([s for s in text if s.isdigit()])
+        return int(num) if num else 1
+    elif 'year' in text:
+        num = ''.join([s for s in text if s.isdigit()])
+        return int(num)*12 if num else 12
+    return np.nan
+
+
+LEGACY_CASES = [
+    'a day ago', '1 day ago', '3 days ago', 'a week ago', '2 weeks ago', 'a month ago', '1 month ago',
+    '11 months ago', 'a year ago', '1 year ago', '12 years ago', 'A Month Ago', '2 Years ago', 'A WEEK AGO',
+    '5 DAYS AGO', 'yesterday', 'just now', 'a fortnight ago', '', '   ', None, np.nan,
+]
+
+
+def assert_same(actual, expected):
+    expected = pd.Series(expected, dtype=float)
+    assert actual.isna().tolist() == expected.isna().tolist()
+    assert np.allclose(actual[actual.notna()], expected[expected.notna()])
+
+
+def test_matches_legacy_parser():
+    values = pd.Series(LEGACY_CASES, dtype=object)
+    assert_same(parse_review_time(values), [legacy_parse_review_time(v) for v in LEGACY_CASES])
+
+
+def test_matches_legacy_parser_with_repeats_and_index():
+    # parsed once per distinct phrase and broadcast back: order, repeats and the index must survive
+    values = pd.Series(LEGACY_CASES * 3, index=np.arange(len(LEGACY_CASES) * 3)[::-1], dtype=object)
+    out = parse_review_time(values)
+    assert out.index.equals(values.index)
+    assert out.name == 'months_ago'
+    assert_same(out.reset_index(drop=True), [legacy_parse_review_time(v) for v in values])
+
+
+@pytest.mark.parametrize('phrase, months', [
+    ('an hour ago', 0.1), ('21 hours ago', 0.1), ('a minute ago', 0.1), ('45 Minutes ago', 0.1),
+])
+def test_hours_and_minutes_are_recent(phrase, months):
+    # the legacy parser returned NaN for these
+    assert parse_review_time(pd.Series([phrase])).tolist() == [months]
+
+
+@pytest.mark.parametrize('values', [[], [None, np.nan], ['']])
+def test_missing_and_empty(values):
+    out = parse_review_time(pd.Series(values, dtype=object))
+    assert len(out) == len(values)
+    assert out.isna().all()
+
+
+def test_categorical_input():
+    values = pd.Series(['a year ago', '3 months ago', None, 'a year ago'], dtype='category')
+    assert_same(parse_review_time(values), [12, 3, np.nan, 12])
+
+
+def test_matches_legacy_parser_on_workbook():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'McDonald_s_Reviews.xlsx')
+    if not os.path.exists(path):
+        pytest.skip(f'{path} not found')
+    phrases = pd.Series(pd.read_excel(path, usecols=['review_time'])['review_time'].unique(), dtype=object)
+    legacy_known = phrases[~phrases.astype(str).str.contains(r'hour|minute')]
+    assert_same(parse_review_time(legacy_known).reset_index(drop=True),
+                [legacy_parse_review_time(v) for v in legacy_known])
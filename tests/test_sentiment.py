@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sentiment
+from sentiment import DERIVED_COLUMNS, ScoreCache, TextScorer, add_text_sentiment, text_hashes
+
+
+def fake_polarity(text):
+    return (len(text) % 5 - 2) / 2  # -1 .. 1, no TextBlob needed
+
+
+class CountingScorer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return fake_polarity(text)
+
+
+@pytest.fixture
+def textblob(monkeypatch):
+    monkeypatch.setattr(sentiment, 'HAVE_TEXTBLOB', True)
+
+
+def test_cache_lookup_empty():
+    scores, found = ScoreCache().lookup(np.array([1, 2], dtype=np.uint64))
+    assert not found.any()
+    assert np.isnan(scores).all()
+
+
+def test_cache_partial_hits_and_duplicates():
+    cache = ScoreCache()
+    cache.add(np.array([30, 10], dtype=np.uint64), np.array([0.3, 0.1], dtype=np.float32))
+    scores, found = cache.lookup(np.array([10, 20, 30, 10, 40], dtype=np.uint64))
+    assert found.tolist() == [True, False, True, True, False]
+    assert scores[found].tolist() == pytest.approx([0.1, 0.3, 0.1])
+
+    cache.add(np.array([20, 20, 10], dtype=np.uint64), np.array([0.2, 0.9, 0.5], dtype=np.float32))
+    assert cache.keys.tolist() == [10, 20, 30]  # sorted, one entry per hash, first score kept
+    assert cache.scores.tolist() == pytest.approx([0.1, 0.2, 0.3])
+
+
+def test_cache_save_load(tmp_path):
+    cache = ScoreCache()
+    cache.add(np.array([5, 1], dtype=np.uint64), np.array([0.5, -0.5], dtype=np.float32))
+    path = str(tmp_path / 'scores.npz')
+    cache.save(path)
+    loaded = ScoreCache.load(path)
+    assert loaded.keys.tolist() == [1, 5]
+    assert loaded.scores.tolist() == [-0.5, 0.5]
+    assert len(ScoreCache.load(str(tmp_path / 'missing.npz'))) == 0
+
+
+def test_scorer_scores_uncached_texts_once_and_saves_once(tmp_path, monkeypatch):
+    saves = []
+    save = ScoreCache.save
+    monkeypatch.setattr(ScoreCache, 'save', lambda self, path: saves.append(path) or save(self, path))
+    counting = CountingScorer()
+    with TextScorer('tweets', counting, cache_dir=str(tmp_path)) as scorer:
+        first = scorer(pd.Series(['good', 'bad', 'good', None]))
+        second = scorer(pd.Series(['bad', 'meh'], index=[7, 8]))
+    assert sorted(counting.calls) == ['', 'bad', 'good', 'meh']
+    assert first.tolist() == [fake_polarity(t) for t in ['good', 'bad', 'good', '']]
+    assert second.index.tolist() == [7, 8]
+    assert len(saves) == 1
+
+    counting.calls.clear()
+    with TextScorer('tweets', counting, cache_dir=str(tmp_path)) as scorer:
+        scorer(pd.Series(['good', 'meh']))
+    assert counting.calls == []
+    assert len(saves) == 1  # nothing new to write
+
+
+def test_fills_only_missing_columns(textblob, tmp_path):
+    texts = pd.Series(['great', 'awful news', 'ok'])
+    scorer = TextScorer('fill', fake_polarity, cache_dir=str(tmp_path))
+    out = add_text_sentiment(pd.DataFrame({'Text': texts}), 'Text', 'fill', scorer=scorer)
+    expected = np.array([fake_polarity(t) for t in texts])
+    assert out['sentiment_score'].tolist() == pytest.approx(expected)
+    assert out['sentiment'].tolist() == np.sign(expected).astype(int).tolist()
+    assert out['sentiment_percentage'].tolist() == pytest.approx(expected * 100)
+
+    partial = pd.DataFrame({'Text': texts, 'sentiment_score': [0.5, -0.25, 0.0]})
+    out = add_text_sentiment(partial, 'Text', 'fill', scorer=scorer)
+    assert out['sentiment_score'].tolist() == [0.5, -0.25, 0.0]  # kept, derived columns follow it
+    assert out['sentiment'].tolist() == [1, -1, 0]
+    assert 'sentiment_score' in partial and 'sentiment' not in partial  # input left alone
+
+    complete = out
+    assert add_text_sentiment(complete, 'Text', 'fill', scorer=scorer) is complete
+
+
+def test_unchanged_without_textblob(monkeypatch):
+    monkeypatch.setattr(sentiment, 'HAVE_TEXTBLOB', False)
+    df = pd.DataFrame({'Text': ['hello']})
+    out = add_text_sentiment(df, 'Text', 'none')
+    assert out is df and not set(DERIVED_COLUMNS) & set(out.columns)
+
+
+def test_text_hashes_ignore_index():
+    a = text_hashes(pd.Series(['x', 'y'], index=[0, 1]))
+    b = text_hashes(pd.Series(['x', 'y'], index=[5, 9]))
+    assert a.tolist() == b.tolist()
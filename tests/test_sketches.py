@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import GroupedSketch, HyperLogLog, TopK
+
+
+def zipf_values(n, n_users=5_000, seed=0):
+    ranks = np.random.default_rng(seed).zipf(1.3, n) % n_users
+    return pd.Series(pd.Categorical.from_codes(ranks, [f'user{i}' for i in range(n_users)]))
+
+
+def batches(values, size):
+    return [values.iloc[i:i + size] for i in range(0, len(values), size)]
+
+
+def check_topk(top, values, k=10):
+    exact = values.astype(str).value_counts()
+    assert top.n == len(values)
+    assert top.error <= top.n / (top.capacity + 1)
+    found = top.top(k)
+    for value, count, error in zip(found['value'], found['count'], found['error']):
+        assert count <= exact[value] <= count + error
+    # every value seen more than ``error`` times is kept
+    assert set(exact[exact > top.error].index) <= set(top.counts.index)
+
+
+def test_topk_error_bound():
+    values = zipf_values(100_000)
+    top = TopK(capacity=200)
+    for batch in batches(values, 7_000):
+        top.update(batch)
+    assert len(top) <= 200
+    check_topk(top, values)
+
+
+def test_topk_exact_below_capacity():
+    values = pd.Series(list('aaabbc'))
+    top = TopK(capacity=10).update(values)
+    assert top.error == 0
+    assert dict(zip(top.top(2)['value'], top.top(2)['count'])) == {'a': 3, 'b': 2}
+
+
+def test_topk_merge_keeps_bound():
+    values = zipf_values(60_000, seed=1)
+    a = TopK(capacity=150).update(values.iloc[:25_000])
+    b = TopK(capacity=150).update(values.iloc[25_000:])
+    check_topk(a.merge(b), values)
+
+
+@pytest.mark.parametrize('n_distinct', [50, 3_000, 200_000])
+def test_hll_estimate_within_error(n_distinct):
+    values = pd.Series(np.arange(n_distinct).astype(str)).sample(frac=1.5, replace=True, random_state=0)
+    values = pd.concat([values, pd.Series(np.arange(n_distinct).astype(str))])  # every value at least once
+    hll = HyperLogLog(error=0.01)
+    for batch in batches(values, 50_000):
+        hll.update(batch)
+    assert hll.estimate() == pytest.approx(n_distinct, rel=4 * hll.relative_error)
+
+
+def test_hll_merge_equals_union():
+    a = pd.Series([f'a{i}' for i in range(20_000)])
+    b = pd.Series([f'a{i}' for i in range(10_000, 40_000)])
+    merged = HyperLogLog(12).update(a).merge(HyperLogLog(12).update(b))
+    together = HyperLogLog(12).update(pd.concat([a, b]))
+    assert np.array_equal(merged.registers, together.registers)
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+
+
+def test_hll_ignores_missing():
+    assert HyperLogLog(10).update(pd.Series([None, np.nan], dtype=object)).estimate() == 0
+
+
+def test_grouped_sketch_selects_groups():
+    users = pd.Series(['u1', 'u1', 'u2', 'u3', 'u3', 'u3', 'u4'])
+    labels = pd.Series(['pos', 'pos', 'neg', 'pos', 'neg', 'neg', 'neu'])
+    sketch = GroupedSketch(topk_error=0.01).update(users.iloc[:4], labels.iloc[:4])
+    sketch = sketch.merge(GroupedSketch(topk_error=0.01).update(users.iloc[4:], labels.iloc[4:]))
+    top = sketch.top(2, ['neg'])
+    assert dict(zip(top['value'], top['count'])) == {'u3': 2, 'u2': 1}
+    assert dict(zip(sketch.top(1)['value'], sketch.top(1)['count'])) == {'u3': 3}
+    assert sketch.distinct(['pos']) == pytest.approx(2, abs=0.1)
+    assert sketch.distinct() == pytest.approx(4, abs=0.1)
+    assert sketch.top(3, ['missing']).empty
+    assert sketch.distinct(['missing']) == 0
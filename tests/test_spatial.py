@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial import GridIndex, cluster_points, haversine_km
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(0)
+    n = 3_000
+    lon = np.concatenate([rng.uniform(-125, -65, n - 200), rng.uniform(170, 180, 100), rng.uniform(-180, -170, 100)])
+    lat = np.concatenate([rng.uniform(24, 50, n - 200), rng.uniform(-20, 20, 200)])
+    return pd.DataFrame({'store': [f's{i}' for i in range(n)], 'longitude': lon, 'latitude': lat})
+
+
+@pytest.fixture(scope='module')
+def index(points):
+    return GridIndex(points, cell_deg=0.5)
+
+
+def test_haversine_known_distance():
+    # Paris - London, about 344 km
+    assert haversine_km(2.3522, 48.8566, -0.1276, 51.5072) == pytest.approx(343.5, abs=1.0)
+
+
+@pytest.mark.parametrize('box', [(-100, -90, 30, 40), (-90, -100, 40, 30), (-200, 200, -90, 90), (0, 10, 0, 10)])
+def test_in_bbox_matches_scan(points, index, box):
+    lon0, lon1 = sorted(box[:2])
+    lat0, lat1 = sorted(box[2:])
+    expected = np.flatnonzero(points['longitude'].between(lon0, lon1) & points['latitude'].between(lat0, lat1))
+    assert index.in_bbox(*box).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize('lon, lat, km', [(-95, 37, 300), (-70, 45, 1500), (179.5, 0, 400), (-179.9, 10, 800)])
+def test_within_km_matches_brute_force(points, index, lon, lat, km):
+    distance = haversine_km(lon, lat, points['longitude'].to_numpy(), points['latitude'].to_numpy())
+    expected = set(points['store'][distance <= km])
+    found = index.within_km(lon, lat, km)
+    assert set(found['store']) == expected
+    assert found['distance_km'].is_monotonic_increasing
+    assert (found['distance_km'] <= km).all()
+
+
+@pytest.mark.parametrize('lon, lat', [(-95, 37), (0, 0), (179.9, -5)])
+def test_nearest_matches_brute_force(points, index, lon, lat):
+    distance = haversine_km(lon, lat, points['longitude'].to_numpy(), points['latitude'].to_numpy())
+    found = index.nearest(lon, lat, k=5)
+    assert found['distance_km'].to_numpy() == pytest.approx(np.sort(distance)[:5])
+
+
+def test_empty_index():
+    index = GridIndex(pd.DataFrame({'longitude': [], 'latitude': []}))
+    assert len(index.in_bbox(-10, 10, -10, 10)) == 0
+    assert index.nearest(0, 0, k=3).empty
+
+
+def test_cluster_points_weighted_centroids():
+    stores = pd.DataFrame({'longitude': [0.1, 0.3, 5.0], 'latitude': [0.1, 0.1, 5.0],
+                           'review_count': [1, 3, 2], 'rating': [2.0, 4.0, 5.0], 'store_address': list('abc')})
+    out = cluster_points(stores, (0, 10, 0, 10), grid=2).sort_values('longitude').reset_index(drop=True)
+    assert out['store_address'].tolist() == ['2 stores', '1 stores']
+    assert out['review_count'].tolist() == [4, 2]
+    assert out.loc[0, 'longitude'] == pytest.approx(0.25)
+    assert out.loc[0, 'rating'] == pytest.approx(3.5)
@@ -0,0 +1,129 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipelines import clean_twitter
+from twitter_feed import FeedFollower, TwitterAggregates
+
+
+def tweets(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    score = rng.uniform(-1, 1, n).round(3)
+    return pd.DataFrame({
+        'Timestamp': (pd.Timestamp('2024-03-01') + pd.to_timedelta(rng.integers(0, 10 * 24 * 60, n), unit='min'))
+                     .astype(str),
+        'Username': rng.choice([f'user{i}' for i in range(40)], n, p=np.arange(40, 0, -1) / 820),
+        'Text': 'tweet',
+        'Likes': rng.integers(0, 50, n),
+        'Retweets': rng.integers(0, 20, n),
+        'sentiment_score': score,
+        'sentiment': np.sign(score).astype(int),
+    })
+
+
+def batches(df, size):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def test_batches_match_full_frame():
+    raw = tweets()
+    feed = TwitterAggregates(sketch=False)
+    assert sum(feed.add(batch) for batch in batches(raw, 70)) == len(raw) == feed.n_rows
+    df = clean_twitter(raw)
+
+    per_day = feed.per_day().sort_values('date').reset_index(drop=True)
+    expected = df.groupby(df['Timestamp'].dt.normalize()).size()
+    assert per_day['date'].tolist() == expected.index.tolist()
+    assert per_day['count'].tolist() == expected.tolist()
+    assert feed.hourly()['count'].tolist() == np.bincount(df['Hour'], minlength=24).tolist()
+
+    by_sentiment = feed.by_sentiment().set_index('Sentiment_Label')
+    grouped = df.groupby('Sentiment_Label', observed=True).agg(count=('Likes', 'size'), sum_Likes=('Likes', 'sum'))
+    assert by_sentiment['count'].to_dict() == grouped['count'].to_dict()
+    assert by_sentiment['sum_Likes'].to_dict() == grouped['sum_Likes'].to_dict()
+    assert by_sentiment['mean_Likes'].to_dict() == pytest.approx((grouped['sum_Likes'] / grouped['count']).to_dict())
+
+    top = feed.top_users(5)
+    assert dict(zip(top['Username'], top['count'])) == df['Username'].value_counts().head(5).to_dict()
+    assert feed.distinct_users() == df['Username'].nunique()
+    assert feed.score_histogram()['count'].sum() == len(df)
+
+
+def test_sketch_mode_bounds_top_users():
+    raw = tweets(2_000)
+    feed = TwitterAggregates(sketch=True)
+    for batch in batches(raw, 300):
+        feed.add(batch)
+    exact = raw['Username'].value_counts()
+    top = feed.top_users(5)
+    for name, count, error in zip(top['Username'], top['count'], top['error']):
+        assert count <= exact[name] <= count + error
+    assert feed.distinct_users() == pytest.approx(raw['Username'].nunique(), rel=0.05)
+
+
+def write_jsonl(path, rows, tail=''):
+    with open(path, 'a') as fh:
+        fh.writelines(json.dumps(row) + '\n' for row in rows)
+        fh.write(tail)
+
+
+def test_follower_reads_complete_lines_only(tmp_path):
+    rows = tweets(6).to_dict('records')
+    path = tmp_path / 'feed.jsonl'
+    write_jsonl(path, rows[:3], tail=json.dumps(rows[3])[:20])  # a line still being written
+    follower = FeedFollower(str(path), TwitterAggregates(sketch=False))
+    assert follower.poll() == 3
+    write_jsonl(path, [], tail=json.dumps(rows[3])[20:] + '\n')
+    write_jsonl(path, rows[4:])
+    assert follower.poll() == 3
+    assert follower.poll() == 0
+    assert follower.aggregates.n_rows == 6
+
+
+def test_follower_keeps_lines_of_a_failed_batch(tmp_path, monkeypatch):
+    path = tmp_path / 'feed.csv'
+    raw = tweets(8)
+    raw.iloc[:5].to_csv(path, index=False)
+    updates = []
+    follower = FeedFollower(str(path), TwitterAggregates(sketch=False), on_update=updates.append)
+    add = follower.aggregates.add
+    monkeypatch.setattr(follower.aggregates, 'add', lambda batch: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        follower.poll()
+    assert (follower.offset, follower.header) == (0, None)
+    monkeypatch.setattr(follower.aggregates, 'add', add)
+    raw.iloc[5:].to_csv(path, mode='a', header=False, index=False)
+    assert follower.poll() == 8  # the failed lines and the new ones, once each
+    assert follower.aggregates.n_rows == 8
+    assert len(updates) == 1
+
+
+def test_follower_skips_malformed_lines(tmp_path):
+    rows = tweets(4).to_dict('records')
+    path = tmp_path / 'feed.jsonl'
+    write_jsonl(path, rows[:2], tail='{"Username": "broken"\n[1, 2]\n')
+    write_jsonl(path, rows[2:])
+    follower = FeedFollower(str(path), TwitterAggregates(sketch=False))
+    assert follower.poll() == 4
+    assert follower.offset == path.stat().st_size
+    assert follower.poll() == 0
+
+
+def test_failed_add_leaves_aggregates_unchanged():
+    feed = TwitterAggregates(sketch=False)
+    feed.add(tweets(50))
+    before = (feed.n_rows, dict(feed.daily), feed.hourly_counts.copy(), dict(feed.users),
+              feed.sentiment.copy(), feed.score_counts.copy())
+    bad = tweets(20, seed=1)
+    bad['sentiment_score'] = bad['sentiment_score'].astype(object)
+    bad.loc[bad.index[-1], 'sentiment_score'] = 'n/a'  # passes cleaning, fails at the histogram
+    with pytest.raises((TypeError, ValueError)):
+        feed.add(clean_twitter(bad), cleaned=True)
+    assert feed.n_rows == before[0]
+    assert dict(feed.daily) == before[1]
+    assert feed.hourly_counts.tolist() == before[2].tolist()
+    assert dict(feed.users) == before[3]
+    pd.testing.assert_frame_equal(feed.sentiment, before[4])
+    assert feed.score_counts.tolist() == before[5].tolist()
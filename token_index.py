@@ -0,0 +1,118 @@
+"""Token-frequency index for the word clouds.
+
+Instead of joining every review/tweet into one huge string and letting
+``WordCloud.generate`` re-tokenize it on each run, token counts are built
+in a streaming, chunked pass and persisted next to the data cache. When a
+workbook only gains rows, the stored counts are reused and just the new
+rows are tokenized, so word cloud cost follows vocabulary size rather than
+corpus size.
+
+Tokens follow WordCloud's defaults (``\\w[\\w']*``, stopwords and bare
+numbers removed, trailing "'s" stripped) but are lowercased and counted as
+unigrams, i.e. without WordCloud's collocation bigrams.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import Counter
+
+import pandas as pd
+from wordcloud import STOPWORDS
+
+from data_cache import CACHE_DIR
+
+TOKEN_PATTERN = r"\w[\w']*"
+CHUNK_SIZE = 20_000
+INDEX_FORMAT_VERSION = 1
+
+
+def count_tokens(texts, stopwords=STOPWORDS, chunk_size=CHUNK_SIZE):
+    """Count tokens over a Series of texts, ``chunk_size`` rows at a time."""
+    counts = Counter()
+    texts = texts.dropna().astype(str)
+    for start in range(0, len(texts), chunk_size):
+        tokens = texts.iloc[start:start + chunk_size].str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+        tokens = tokens.str.replace(r"'s$", '', regex=True)
+        tokens = tokens[(tokens.str.len() > 0) & ~tokens.isin(stopwords) & ~tokens.str.isdigit()]
+        counts.update(tokens.value_counts().to_dict())
+    return counts
+
+
+def _fingerprint(texts):
+    hashed = pd.util.hash_pandas_object(texts.astype(str), index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+
+class TokenIndex:
+    """Token counts over the first ``n_rows`` rows of a text column."""
+
+    def __init__(self, counts=None, n_rows=0, fingerprint=None):
+        self.counts = counts if counts is not None else Counter()
+        self.n_rows = n_rows
+        self.fingerprint = fingerprint or _fingerprint(pd.Series([], dtype=object))
+
+    def covers_prefix_of(self, texts):
+        return self.n_rows <= len(texts) and _fingerprint(texts.iloc[:self.n_rows]) == self.fingerprint
+
+    def update(self, texts):
+        """Fold rows appended after ``n_rows`` into the counts.
+
+        ``texts`` is the full column; it must start with the rows already
+        indexed (check with ``covers_prefix_of``).
+        """
+        new_rows = texts.iloc[self.n_rows:]
+        if len(new_rows):
+            self.counts.update(count_tokens(new_rows))
+            self.n_rows = len(texts)
+            self.fingerprint = _fingerprint(texts)
+        return self
+
+    def frequencies(self, max_words=200):
+        return dict(self.counts.most_common(max_words))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'  # concurrent savers never share a tmp file
+        with open(tmp, 'wb') as fh:
+            pickle.dump({'version': INDEX_FORMAT_VERSION, 'counts': self.counts,
+                         'n_rows': self.n_rows, 'fingerprint': self.fingerprint}, fh)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'rb') as fh:
+                state = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if state.get('version') != INDEX_FORMAT_VERSION:
+            return None
+        return cls(state['counts'], state['n_rows'], state['fingerprint'])
+
+
+def index_path(name, cache_dir=None, row_filter=None):
+    if row_filter is not None:
+        # the same column cleaned with different row filters gets its own index instead of evicting the other
+        name = f'{name}.{hashlib.sha1(repr(row_filter).encode()).hexdigest()[:12]}'
+    return os.path.join(cache_dir or CACHE_DIR, f'{name}.tokens.pkl')
+
+
+def token_index_for(name, texts, cache_dir=None, row_filter=None):
+    """Return an up-to-date TokenIndex for ``texts``, persisted under ``name``.
+
+    ``row_filter`` describes how the rows of ``texts`` were selected (e.g.
+    the ``required`` columns of the cleaning step) and is part of the key.
+    Reuses the stored index when ``texts`` only has rows appended since it
+    was built, and rebuilds it from scratch otherwise.
+    """
+    texts = texts.reset_index(drop=True)
+    path = index_path(name, cache_dir, row_filter)
+    index = TokenIndex.load(path)
+    if index is None or not index.covers_prefix_of(texts):
+        index = TokenIndex()
+    if index.n_rows != len(texts) or not os.path.exists(path):
+        index.update(texts)
+        index.save(path)
+    return index
@@ -1,65 +1,72 @@
-import pandas as pd
 import plotly.express as px
 from dash import Dash, html, dcc
 import base64
-from wordcloud import WordCloud
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import dash_bootstrap_components as dbc
 import os # Import os module to check for file existence
 
+from data_cache import read_excel_cached
+import profiling
+import wordclouds
+from token_index import token_index_for
+from pipelines import clean_twitter
+from pipelines.twitter import REQUIRED_COLUMNS
+
 # Load dataset
-df = pd.read_excel("twitter_dataset_1.xlsx")
-df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%Y-%m-%d %H:%M:%S')
-df['Hour'] = df['Timestamp'].dt.hour
-df['Sentiment_Label'] = df['sentiment'].map({1: 'Positive', -1: 'Negative', 0: 'Neutral'})
+profiling.start_run('twitter_dashboard')
+raw = read_excel_cached("twitter_dataset_1.xlsx")
+profiling.lap('read')
+df = clean_twitter(raw)
+del raw  # free the uncleaned frame before building figures
+profiling.lap('clean')
 
 # 1. Pie Chart - Sentiment Distribution
 sentiment_counts = df['Sentiment_Label'].value_counts()
 fig1 = px.pie(values=sentiment_counts.values, names=sentiment_counts.index,
               title='Tweet Sentiment Distribution', height=800)
+profiling.lap('figure: Tweet Sentiment Distribution')
 
 # 2. Line Chart - Tweets Over Time
 tweets_per_day = df.groupby(df['Timestamp'].dt.date).size().reset_index(name='Tweet Count')
 fig2 = px.line(tweets_per_day, x='Timestamp', y='Tweet Count', title='Tweets Over Time', height=800)
+profiling.lap('figure: Tweets Over Time')
 
 # 3. Bar Chart - Likes by Sentiment
-likes_by_sentiment = df.groupby('Sentiment_Label')['Likes'].mean().reset_index()
+likes_by_sentiment = df.groupby('Sentiment_Label', observed=True)['Likes'].mean().reset_index()
 fig3 = px.bar(likes_by_sentiment, x='Sentiment_Label', y='Likes',
               title='Average Likes by Sentiment', height=800)
+profiling.lap('figure: Average Likes by Sentiment')
 
 # 4. Bar Chart - Retweets by Sentiment
-retweets_by_sentiment = df.groupby('Sentiment_Label')['Retweets'].mean().reset_index()
+retweets_by_sentiment = df.groupby('Sentiment_Label', observed=True)['Retweets'].mean().reset_index()
 fig4 = px.bar(retweets_by_sentiment, x='Sentiment_Label', y='Retweets',
               title='Average Retweets by Sentiment', height=800)
+profiling.lap('figure: Average Retweets by Sentiment')
 
 # 5. Bar Chart - Top 10 Active Users
 top_users = df['Username'].value_counts().head(10)
 fig5 = px.bar(x=top_users.index, y=top_users.values,
               title='Top 10 Most Active Users',
               labels={'x': 'Username', 'y': 'Number of Tweets'}, height=800)
+profiling.lap('figure: Top 10 Most Active Users')
 
 # 6. Histogram - Sentiment Score Distribution
 fig6 = px.histogram(df, x='sentiment_score', nbins=30,
                     title='Sentiment Score Distribution', height=800)
+profiling.lap('figure: Sentiment Score Distribution')
 
 # 7. Bar Chart - Hourly Tweet Activity
 hourly_counts = df.groupby('Hour').size().reset_index(name='Tweet Count')
 fig7 = px.bar(hourly_counts, x='Hour', y='Tweet Count', title='Hourly Tweet Activity', height=800)
+profiling.lap('figure: Hourly Tweet Activity')
 
 # 8. Word Cloud
-text = " ".join(str(tweet) for tweet in df['Text'].dropna())
-wordcloud = WordCloud(width=1500, height=1000, background_color='white').generate(text)
-wordcloud_path = "wordcloud.png"
-plt.figure(figsize=(10, 5))
-plt.imshow(wordcloud, interpolation='bilinear')
-plt.axis("off")
-plt.tight_layout(pad=0)
-plt.savefig(wordcloud_path)
-plt.close()
-
-# Encode logo and word cloud
+tokens = token_index_for('twitter_text', df['Text'], row_filter={'required': REQUIRED_COLUMNS})
+wordcloud_image, wordcloud_mimetype = wordclouds.render_wordcloud(frequencies=tokens.frequencies(), width=1500, height=1000)
+wordcloud_url = wordclouds.publish('twitter', wordcloud_image, wordcloud_mimetype)
+profiling.lap('wordcloud')
+profiling.finish_run()
+
+# Encode logo
 logo_path = "assets/3.png"  # Replace with your actual logo path
 
 # --- Add dummy logo for testing if it doesn't exist ---
@@ -74,12 +81,11 @@ if not os.path.exists(logo_path):
     print(f"Dummy logo created at: {logo_path}")
 # --- End of dummy logo creation ---
 
-# Ensure logo_path and wordcloud_path exist before encoding
+# Ensure logo_path exists before encoding
 try:
     encoded_logo = base64.b64encode(open(logo_path, 'rb').read()).decode()
-    encoded_wc = base64.b64encode(open(wordcloud_path, 'rb').read()).decode()
 except FileNotFoundError as e:
-    print(f"Error: Make sure '{e.filename}' exists. Please check your `logo_path` and `wordcloud_path`.")
+    print(f"Error: Make sure '{e.filename}' exists. Please check your `logo_path`.")
     # Exit or handle gracefully if files are missing
     exit()
 
@@ -87,6 +93,9 @@ except FileNotFoundError as e:
 # Dash App Layout
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "Twitter Sentiment Dashboard"
+wordclouds.register_routes(app.server)
+profiling.register_routes(app.server)
+server = app.server  # WSGI entry point: gunicorn twitter_dashboard:server
 
 app.layout = html.Div([
     dbc.Row([
@@ -116,10 +125,10 @@ app.layout = html.Div([
 
     html.H2("Word Cloud of Tweets", style={'text-align': 'center'}),
     html.Div([
-        html.Img(src=f'data:image/png;base64,{encoded_wc}',
+        html.Img(src=wordcloud_url,
                  style={'display': 'block', 'margin': '0 auto', 'max-width': '100%'})
     ])
 ])
 
 if __name__ == '__main__':
-    app.run(port=5050, debug=True)
\ No newline at end of file
+    app.run(port=5050)  # DASH_DEBUG=true enables the debugger and reloader
\ No newline at end of file
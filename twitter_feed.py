@@ -0,0 +1,247 @@
+"""Incremental ingestion for a growing Twitter feed.
+
+``TwitterAggregates`` keeps the running state behind the Twitter views -
+tweets per day and per hour, per-sentiment counts and like/retweet sums, a
+per-user counter (read back through a top-k heap; with ``sketch`` a
+fixed-size ``TopK`` plus a ``HyperLogLog`` of distinct users, see
+sketches.py) and a fixed-bin sentiment score histogram. ``add`` folds one cleaned batch into that state
+in O(batch) time, so the views follow a feed without recomputing anything
+over the rows seen before.
+
+Batches come from CSV or JSONL files (``csv_batches``/``jsonl_batches``),
+from a ``queue.Queue`` of tweet dicts standing in for a message broker
+(``queue_batches``), or from a file that keeps growing (``FeedFollower``).
+"""
+
+import heapq
+import io
+import json
+import os
+import queue
+import threading
+from collections import Counter
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from pipelines import clean_twitter
+from pipelines.common import SENTIMENT_ORDER
+from sentiment import add_text_sentiment
+from sketches import SKETCHES, HyperLogLog, TopK
+
+FEED_COLUMNS = ['Timestamp', 'sentiment', 'Likes', 'Retweets', 'Username', 'sentiment_score']
+BATCH_SIZE = int(os.environ.get('TWITTER_FEED_BATCH', 5_000))
+FOLLOW_INTERVAL = float(os.environ.get('TWITTER_FEED_INTERVAL', 2.0))
+
+# Fixed histogram bins: TextBlob polarity lies in [-1, 1]
+SCORE_RANGE = (-1.0, 1.0)
+SCORE_BINS = 40
+
+
+class TwitterAggregates:
+    """Running aggregates over every tweet ingested so far."""
+
+    def __init__(self, score_range=SCORE_RANGE, score_bins=SCORE_BINS, sketch=None):
+        self.n_rows = 0
+        self.daily = Counter()  # normalized Timestamp -> tweets
+        self.hourly_counts = np.zeros(24, dtype=np.int64)
+        self.sketch = SKETCHES if sketch is None else sketch
+        self.users = TopK() if self.sketch else Counter()
+        self.distinct = HyperLogLog() if self.sketch else None
+        self.sentiment = pd.DataFrame(0, index=pd.Index(SENTIMENT_ORDER, name='Sentiment_Label'),
+                                      columns=['count', 'sum_Likes', 'sum_Retweets'], dtype='int64')
+        self.score_edges = np.linspace(score_range[0], score_range[1], score_bins + 1)
+        self.score_counts = np.zeros(score_bins, dtype=np.int64)
+
+    @property
+    def score_bin_width(self):
+        return float(self.score_edges[1] - self.score_edges[0])
+
+    def add(self, batch, cleaned=False):
+        """Fold a batch of raw tweets (or ``cleaned=True`` output of ``clean_twitter``) in.
+
+        Raw tweets without sentiment columns are scored from ``Text`` when
+        TextBlob is available (see sentiment.py). Returns the number of rows kept.
+        """
+        if not cleaned:
+            if 'sentiment_score' not in batch.columns:
+                batch = add_text_sentiment(batch, 'Text', 'twitter_feed')
+            batch = clean_twitter(batch, required=FEED_COLUMNS)
+        if batch.empty:
+            return 0
+        # Work out every delta before touching the state, so a batch that fails is not half applied
+        daily = batch['Timestamp'].dt.normalize().value_counts().to_dict()
+        hourly = np.bincount(batch['Hour'].to_numpy(), minlength=24)[:24]
+        usernames = batch['Username'].astype(str)
+        user_counts = None if self.sketch else usernames.value_counts().to_dict()
+        grouped = (batch.groupby('Sentiment_Label', observed=True)
+                        .agg(count=('Likes', 'size'), sum_Likes=('Likes', 'sum'), sum_Retweets=('Retweets', 'sum')))
+        sentiment = self.sentiment.add(grouped.astype('int64'), fill_value=0).astype('int64')
+        scores = np.clip(batch['sentiment_score'].to_numpy(dtype=float), self.score_edges[0], self.score_edges[-1])
+        score_counts = np.histogram(scores, bins=self.score_edges)[0]
+
+        self.daily.update(daily)
+        self.hourly_counts += hourly
+        if self.sketch:
+            self.users.update(usernames)
+            self.distinct.update(usernames)
+        else:
+            self.users.update(user_counts)
+        self.sentiment = sentiment
+        self.score_counts += score_counts
+        self.n_rows += len(batch)
+        return len(batch)
+
+    # Frames shaped like GroupCube.query results, so cube_figures can draw them
+
+    def per_day(self):
+        return pd.DataFrame({'date': pd.to_datetime(list(self.daily)), 'count': list(self.daily.values())})
+
+    def hourly(self):
+        return pd.DataFrame({'Hour': np.arange(24), 'count': self.hourly_counts})
+
+    def by_sentiment(self):
+        out = self.sentiment[self.sentiment['count'] > 0].reset_index()
+        for m in ('Likes', 'Retweets'):
+            out[f'mean_{m}'] = out[f'sum_{m}'] / out['count']
+        return out
+
+    def top_users(self, k=10):
+        if self.sketch:
+            return self.users.top(k, name='Username')
+        top = heapq.nlargest(k, self.users.items(), key=itemgetter(1))
+        return pd.DataFrame(top, columns=['Username', 'count'])
+
+    def distinct_users(self):
+        return self.distinct.estimate() if self.sketch else len(self.users)
+
+    def score_histogram(self):
+        centers = (self.score_edges[:-1] + self.score_edges[1:]) / 2
+        return pd.DataFrame({'score_bin': centers, 'count': self.score_counts})
+
+
+# ---------------- Batch sources ----------------
+
+def csv_batches(path, batch_size=BATCH_SIZE):
+    yield from pd.read_csv(path, chunksize=batch_size)
+
+
+def jsonl_batches(path, batch_size=BATCH_SIZE):
+    yield from pd.read_json(path, lines=True, chunksize=batch_size)
+
+
+def queue_batches(q, batch_size=BATCH_SIZE, timeout=1.0):
+    """Drain tweet dicts from ``q`` into DataFrames of up to ``batch_size`` rows.
+
+    Stops at a ``None`` sentinel, or once the queue stays empty for ``timeout`` seconds.
+    """
+    rows = []
+    while True:
+        try:
+            item = q.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        if item is not None:
+            rows.append(item)
+        if rows and (item is None or len(rows) >= batch_size):
+            yield pd.DataFrame(rows)
+            rows = []
+        if item is None:
+            return
+
+
+def ingest(aggregates, batches):
+    """Fold every batch of an iterable into ``aggregates``; returns rows kept."""
+    return sum(aggregates.add(batch) for batch in batches)
+
+
+class FeedFollower:
+    """Tails a CSV or JSONL file that is being appended to.
+
+    Every ``poll`` reads the complete lines added since the previous one,
+    folds them into ``aggregates`` and calls ``on_update(aggregates)`` when
+    anything was added. Malformed lines (bad JSON, CSV rows with extra
+    fields) are logged and skipped; the others only count as read once their
+    batch has been applied, so a poll that fails reads them again. ``start``
+    polls every ``interval`` seconds in a daemon thread.
+    """
+
+    def __init__(self, path, aggregates, on_update=None, interval=None):
+        self.path = path
+        self.aggregates = aggregates
+        self.on_update = on_update
+        self.interval = FOLLOW_INTERVAL if interval is None else interval
+        self.is_csv = path.lower().endswith('.csv')
+        self.offset = 0
+        self.header = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def _read_new(self):
+        """Complete lines after ``offset`` and the offset just past them (``offset`` is not moved)."""
+        try:
+            with open(self.path, 'rb') as fh:
+                if os.fstat(fh.fileno()).st_size < self.offset:
+                    self.offset, self.header = 0, None  # truncated or replaced
+                fh.seek(self.offset)
+                data = fh.read()
+        except OSError:
+            return b'', self.offset
+        end = data.rfind(b'\n') + 1  # leave a partially written last line for the next poll
+        return data[:end], self.offset + end
+
+    def _parse_jsonl(self, data):
+        """Tweet dicts of the JSONL lines in ``data``; malformed lines are logged and skipped."""
+        rows = []
+        for number, line in enumerate(data.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('not a JSON object')
+            except ValueError as e:
+                print(f"Skipping line {number} after byte {self.offset} of {self.path}: {e}")
+                continue
+            rows.append(row)
+        return rows
+
+    def poll(self):
+        data, end = self._read_new()
+        if not data:
+            return 0
+        header = self.header
+        if self.is_csv:
+            if header is None:
+                header, _, data = data.partition(b'\n')
+            batch = (pd.read_csv(io.BytesIO(header + b'\n' + data), on_bad_lines='warn')
+                     if data.strip() else pd.DataFrame())
+        else:
+            batch = pd.DataFrame(self._parse_jsonl(data))
+        added = self.aggregates.add(batch) if len(batch) else 0
+        self.offset, self.header = end, header  # consumed only once applied
+        if added and self.on_update is not None:
+            self.on_update(self.aggregates)
+        return added
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error reading feed {self.path}: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='twitter-feed', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,100 @@
+"""Reload datasets when their source workbooks change.
+
+A daemon thread polls the (size, mtime) signature of every file listed in a
+dataset's ``sources`` every ``WATCH_INTERVAL`` seconds. Once a changed file
+has kept the same signature for one more poll (so a workbook that is still
+being written is not read half-way), the affected dataset is rebuilt with
+``LazyDataset.reload`` in that thread and swapped in; the server keeps
+answering from the previous result meanwhile. Datasets that have not been
+loaded yet are skipped - their first ``get()`` reads the new file anyway.
+
+``on_change(keys)`` is called after each poll that found changes, with the
+keys of the datasets reloaded and of those not loaded. Under gunicorn one
+watcher runs in the master and uses it to replace the workers (see
+gunicorn.conf.py), so a change is rebuilt once rather than once per worker.
+
+Polling needs no extra dependency and works on network drives, where
+inotify-style events are unreliable.
+"""
+
+import os
+import threading
+
+from data_cache import file_signature
+from datasets import DATASETS
+
+WATCH_INTERVAL = float(os.environ.get('DASHBOARD_WATCH_INTERVAL', 2.0))
+
+
+def _signature(path):
+    try:
+        return file_signature(path)
+    except OSError:
+        return None  # missing or being replaced
+
+
+class FileWatcher:
+    """Polls the sources of ``datasets`` (a key -> LazyDataset mapping)."""
+
+    def __init__(self, datasets, interval=None, on_change=None):
+        self.datasets = datasets
+        self.interval = WATCH_INTERVAL if interval is None else interval
+        self.on_change = on_change
+        self._seen = {path: _signature(path) for ds in datasets.values() for path in ds.sources}
+        self._pending = {}  # path -> signature observed on the previous poll
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Check every source once; returns the keys of the datasets reloaded."""
+        changed = set()
+        for path, seen in self._seen.items():
+            sig = _signature(path)
+            if sig is None or sig == seen:
+                self._pending.pop(path, None)
+                continue
+            if self._pending.get(path) != sig:
+                self._pending[path] = sig  # wait until the file stops changing
+                continue
+            del self._pending[path]
+            self._seen[path] = sig
+            changed.add(path)
+
+        reloaded, unloaded = [], []
+        for key, dataset in self.datasets.items():
+            if not changed.intersection(dataset.sources):
+                continue
+            if not dataset.loaded:
+                unloaded.append(key)
+                continue
+            print(f"--- {', '.join(sorted(changed.intersection(dataset.sources)))} changed, reloading ---")
+            try:
+                if dataset.reload():
+                    reloaded.append(key)
+            except Exception as e:
+                print(f"Error reloading {dataset.label}: {e}")
+        if (reloaded or unloaded) and self.on_change is not None:
+            self.on_change(reloaded + unloaded)
+        return reloaded
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error watching datasets: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='dataset-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def watch(datasets=None, interval=None, on_change=None):
+    """Start watching ``datasets`` (default: every registered dataset)."""
+    return FileWatcher(DATASETS if datasets is None else datasets, interval, on_change).start()
@@ -0,0 +1,121 @@
+"""Word cloud rendering and serving.
+
+``render_wordcloud`` encodes the WordCloud bitmap straight to PNG/WebP
+bytes via ``WordCloud.to_image()``, with no matplotlib figure in between.
+Rendered word clouds are published into an in-process registry and served
+by a Flask route on the Dash server under a content-hashed filename, e.g.
+``/wordcloud/mcd.3f2a9c1b7d04.png``. The layout only carries that URL, so
+callback payloads stay small and browsers/proxies can cache the image
+forever (a new image always gets a new URL).
+"""
+
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+from flask import Response, abort, redirect, request
+from wordcloud import WordCloud
+
+ROUTE_PREFIX = '/wordcloud'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_images = {}  # name -> (digest, data, mimetype, extension)
+_previous = {}  # name -> entry replaced by the last publish, still served for in-flight pages
+_lock = threading.Lock()
+
+_EXTENSIONS = {'image/png': 'png', 'image/webp': 'webp', 'image/jpeg': 'jpg'}
+
+# Encoding defaults, overridable per call or through the environment
+IMAGE_FORMAT = os.environ.get('WORDCLOUD_FORMAT', 'png')  # 'png' or 'webp'
+PNG_COMPRESS_LEVEL = int(os.environ.get('WORDCLOUD_PNG_LEVEL', 6))  # 0 (fast) .. 9 (small)
+WEBP_QUALITY = int(os.environ.get('WORDCLOUD_WEBP_QUALITY', 80))
+# Fixed layout seed: the same words give the same image (and content-hash URL) in every process
+RANDOM_STATE = int(os.environ.get('WORDCLOUD_RANDOM_STATE', 0))
+
+
+def render_wordcloud(text=None, frequencies=None, width=1600, height=700, fmt=None,
+                     compress_level=None, quality=None, background_color='white', **wc_kwargs):
+    """Render a word cloud and return ``(image_bytes, mimetype)``.
+
+    Pass either raw ``text`` or a ``frequencies`` mapping. Returns
+    ``(b'', '')`` when there is nothing to draw.
+    """
+    fmt = (fmt or IMAGE_FORMAT).lower()
+    wc_kwargs.setdefault('random_state', RANDOM_STATE)
+    wc = WordCloud(width=width, height=height, background_color=background_color, **wc_kwargs)
+    if frequencies is not None:
+        if not frequencies:
+            return b'', ''
+        wc.generate_from_frequencies(frequencies)
+    else:
+        if not text or not text.strip():
+            return b'', ''
+        wc.generate(text)
+
+    buf = BytesIO()
+    image = wc.to_image()
+    if fmt == 'webp':
+        image.save(buf, format='WEBP', quality=WEBP_QUALITY if quality is None else quality, method=4)
+        return buf.getvalue(), 'image/webp'
+    level = PNG_COMPRESS_LEVEL if compress_level is None else compress_level
+    image.save(buf, format='PNG', compress_level=level)
+    return buf.getvalue(), 'image/png'
+
+
+def publish(name, data, mimetype='image/png'):
+    """Store image bytes under ``name`` and return their public URL."""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    ext = _EXTENSIONS.get(mimetype, 'bin')
+    with _lock:
+        current = _images.get(name)
+        if current is not None and current[0] != digest:
+            _previous[name] = current
+        _images[name] = (digest, data, mimetype, ext)
+    return f'{ROUTE_PREFIX}/{name}.{digest}.{ext}'
+
+
+def url_for(name):
+    """Current URL of a published image, or '' if there is none."""
+    entry = _images.get(name)
+    if entry is None:
+        return ''
+    digest, _, _, ext = entry
+    return f'{ROUTE_PREFIX}/{name}.{digest}.{ext}'
+
+
+def serve(filename, load=None):
+    try:
+        name, digest, _ext = filename.rsplit('.', 2)
+    except ValueError:
+        abort(404)
+    entry = _images.get(name)
+    if entry is None and load is not None:
+        load(name)  # published by another process (e.g. a lazily loading gunicorn worker)
+        entry = _images.get(name)
+    if entry is None:
+        abort(404)
+    if digest != entry[0] and digest == _previous.get(name, ('',))[0]:
+        entry = _previous[name]
+    current, data, mimetype, _ = entry
+    if digest != current:
+        # Stale link from an old layout - point at the current image
+        return redirect(url_for(name), code=302)
+    etag = f'"{current}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        resp = Response(status=304)
+    else:
+        resp = Response(data, mimetype=mimetype)
+    resp.headers['ETag'] = etag
+    resp.headers['Cache-Control'] = CACHE_CONTROL
+    return resp
+
+
+def register_routes(server, load=None):
+    """Attach the word cloud route to a Flask app (``dash_app.server``).
+
+    ``load(name)`` publishes ``name`` in this process when it has nothing
+    under that name yet, so a URL handed out by another worker still resolves.
+    """
+    server.add_url_rule(f'{ROUTE_PREFIX}/<path:filename>', 'wordcloud_image',
+                        lambda filename: serve(filename, load))